@@ -0,0 +1,6 @@
+# Run by Houdini once its UI is up: Houdini looks for pythonX.Ylibs/uiready.py in every
+# HOUDINI_PATH entry, this package's root is one through "path" in MKE_Tools.json.
+# One copy per Python build of Houdini (20.0: 3.9/3.10, 20.5: 3.11).
+import mkeWarmup
+
+mkeWarmup.start()
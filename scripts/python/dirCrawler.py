@@ -0,0 +1,191 @@
+import fnmatch
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Directory mtimes of network shares are this coarse: a cached listing taken within it
+# of the directory's mtime may miss a change made in the same tick, it is not trusted
+MTIME_GRANULARITY = 2.0
+
+# Duck-types the part of os.stat_result the tools rely on
+CrawlEntry = namedtuple("CrawlEntry", ["path", "st_size", "st_mtime"])
+
+
+class DirCrawler(object):
+    """
+    Parallel directory crawler built on os.scandir.
+    - Several directories are listed at once, which hides the per-directory
+      round trip of network shares.
+    - File/dir type comes from the DirEntry, so no extra stat per entry to
+      tell them apart (file stats are taken in the listing threads).
+    - exclude patterns prune whole subtrees before they are listed, include
+      patterns filter the files that are yielded. Patterns are fnmatch globs
+      tested against the entry name and its path relative to the root.
+    - With a cache_path, each directory's mtime, files and subdirectories are
+      saved; a directory whose mtime did not change is not listed again,
+      unless the listing was taken within MTIME_GRANULARITY of that mtime.
+      A directory mtime only changes when entries are added, removed or
+      renamed, so files overwritten in place keep their cached size/mtime
+      unless restat is True: pass it whenever the stats decide anything.
+    """
+
+    def __init__(self, root, recursive=True, include=None, exclude=None, max_workers=8,
+                 cache_path=None, restat=False):
+        self.root = os.path.abspath(root)
+        self.recursive = recursive
+        self.include = list(include or [])
+        self.exclude = list(exclude or [])
+        self.max_workers = max(1, max_workers)
+        self.cache_path = cache_path
+        self.restat = restat
+        self.errors = []
+        self.listed_count = 0
+        self.cached_count = 0
+        self._cache = {}
+        self._new_cache = {}
+        self._lock = threading.Lock()
+
+    def _rel(self, path):
+        rel = os.path.relpath(path, self.root).replace(os.sep, "/")
+        return "" if rel == "." else rel
+
+    def _matches(self, patterns, name, rel):
+        return any(fnmatch.fnmatch(name, p) or fnmatch.fnmatch(rel, p) for p in patterns)
+
+    def is_excluded(self, path):
+        rel = self._rel(path)
+        return bool(rel) and self._matches(self.exclude, os.path.basename(path), rel)
+
+    def is_included(self, path):
+        if not self.include:
+            return True
+        return self._matches(self.include, os.path.basename(path), self._rel(path))
+
+    def crawl(self):
+        # yield a CrawlEntry for every matching file, in no particular order
+        for _, files, _ in self.crawl_dirs():
+            for entry in files:
+                yield entry
+
+    def crawl_dirs(self):
+        """
+        Yield (directory, [CrawlEntry] of its matching files, normcased names
+        of all its files) per directory: the names tell which files exist
+        next to a match (e.g. its converted output) without another stat.
+        """
+        self._load_cache()
+        pending = set()
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            pending.add(executor.submit(self._list_dir, self.root))
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path, files, subdirs, names = future.result()
+                    if self.recursive:
+                        for subdir in subdirs:
+                            pending.add(executor.submit(self._list_dir, subdir))
+                    yield path, files, names
+        finally:
+            # an abandoned crawl must not wait for the directories still queued
+            executor.shutdown(wait=False, cancel_futures=True)
+        self._save_cache()
+
+    def _list_dir(self, path):
+        # returns (path, [CrawlEntry], [subdir paths], file names) for one directory
+        rel = self._rel(path)
+        try:
+            dir_mtime = os.stat(path).st_mtime
+        except OSError as e:
+            with self._lock:
+                self.errors.append((path, e))
+            return path, [], [], frozenset()
+
+        listed_at = time.time()
+        cached = self._cache.get(rel)
+        if (cached is not None and cached["mtime"] == dir_mtime
+                and cached.get("listed_at", 0.0) - dir_mtime > MTIME_GRANULARITY):
+            with self._lock:
+                self.cached_count += 1
+                self._new_cache[rel] = cached
+            files = []
+            for name, size, mtime in cached["files"]:
+                file_path = os.path.join(path, name)
+                if self.restat:
+                    try:
+                        st = os.stat(file_path)
+                    except OSError:
+                        continue
+                    size, mtime = st.st_size, st.st_mtime
+                files.append(CrawlEntry(file_path, size, mtime))
+            subdirs = [os.path.join(path, name) for name in cached["dirs"]]
+            return self._filter(path, files, subdirs)
+
+        files = []
+        subdirs = []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.is_file():
+                            st = entry.stat()
+                            files.append(CrawlEntry(entry.path, st.st_size, st.st_mtime))
+                    except OSError as e:
+                        with self._lock:
+                            self.errors.append((entry.path, e))
+        except OSError as e:
+            with self._lock:
+                self.errors.append((path, e))
+            return path, [], [], frozenset()
+
+        with self._lock:
+            self.listed_count += 1
+            if self.cache_path:
+                self._new_cache[rel] = {
+                    "mtime": dir_mtime,
+                    "listed_at": listed_at,
+                    "files": [[os.path.basename(f.path), f.st_size, f.st_mtime] for f in files],
+                    "dirs": [os.path.basename(d) for d in subdirs],
+                }
+        return self._filter(path, files, subdirs)
+
+    def _filter(self, path, files, subdirs):
+        names = frozenset(os.path.normcase(os.path.basename(f.path)) for f in files)
+        files = [f for f in files if not self.is_excluded(f.path) and self.is_included(f.path)]
+        subdirs = [d for d in subdirs if not self.is_excluded(d)]
+        return path, files, subdirs, names
+
+    def _load_cache(self):
+        self._cache = {}
+        self._new_cache = {}
+        if not self.cache_path:
+            return
+        try:
+            with open(self.cache_path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        # a cache made for another root is useless
+        if data.get("root") == self.root:
+            self._cache = data.get("dirs", {})
+
+    def _save_cache(self):
+        if not self.cache_path:
+            return
+        tmp_path = f"{self.cache_path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"root": self.root, "dirs": self._new_cache}, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"Could not write directory cache {self.cache_path}: {e}")
+
+
+def crawl(root, recursive=True, include=None, exclude=None, max_workers=8, cache_path=None):
+    # shortcut for one-off crawls
+    return DirCrawler(root, recursive, include, exclude, max_workers, cache_path).crawl()
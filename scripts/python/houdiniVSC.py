@@ -1,13 +1,200 @@
-import sys
-import pathlib
+import argparse
+import hashlib
 import json
+import os
+import re
+import sys
+
+# Written next to settings.json, what the last run generated
+STATE_FILE_NAME = ".houdiniVSC.json"
+INTERPRETER_KEY = "python.defaultInterpreterPath"
+EXTRA_PATHS_KEY = "python.analysis.extraPaths"
+STUB_PATH_KEY = "python.analysis.stubPath"
+# Large introspected modules given stubs from the shelf, when importable
+SHELF_STUB_MODULES = ("hou",)
+
+
+# ENVIRONMENT
+def interpreter_path(prefix=None, platform=None):
+    """
+    Python executable of this interpreter, for the IDE. In Houdini
+    sys.executable is houdini / hython, the Python binary lives in sys.prefix:
+    python.exe on Windows, bin/python3.X on Linux and macOS.
+    """
+    prefix = prefix or sys.prefix
+    platform = platform or sys.platform
+    if os.path.basename(sys.executable).lower().startswith("python"):
+        return sys.executable
+    version = f"{sys.version_info[0]}.{sys.version_info[1]}"
+    if platform == "win32":
+        candidates = ["python.exe", os.path.join("bin", "python.exe")]
+    else:
+        candidates = [os.path.join("bin", f"python{version}"), os.path.join("bin", f"python{sys.version_info[0]}"),
+                      os.path.join("bin", "python")]
+    for candidate in candidates:
+        path = os.path.join(prefix, candidate)
+        if os.path.isfile(path):
+            return path
+    return sys.executable
+
+
+def pruned_paths(paths):
+    # existing sys.path entries, resolved, each once, in import order; "" (the working directory) is dropped
+    result, seen = [], set()
+    for path in paths:
+        if not path:
+            continue
+        path = os.path.realpath(path)
+        key = os.path.normcase(path)
+        if key in seen or not os.path.exists(path):
+            continue
+        seen.add(key)
+        result.append(path)
+    return result
+
+
+def fingerprint(interpreter, paths, stub_modules):
+    # changes with the interpreter, its version, the raw sys.path or the stubs asked for
+    data = json.dumps([interpreter, sys.version, list(paths), sorted(stub_modules)])
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+# SETTINGS
+def load_jsonc(path):
+    """
+    settings.json as VS Code writes it: JSON with // and /* */ comments and
+    trailing commas. {} when the file does not exist. Comments are lost
+    when the settings are written back.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+    except FileNotFoundError:
+        return {}
+    # strings are matched first so a // inside a path is kept
+    text = re.sub(r'("(?:\\.|[^"\\])*")|//[^\n]*|/\*.*?\*/', lambda m: m.group(1) or "", text, flags=re.S)
+    text = re.sub(r'("(?:\\.|[^"\\])*")|,(\s*[}\]])', lambda m: m.group(1) or m.group(2), text)
+    return json.loads(text) if text.strip() else {}
+
+
+def write_json(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def merge_settings(settings, state, interpreter, paths, stub_path):
+    """
+    Settings with the generated values, the user's own are kept: extra paths
+    added by hand stay (after the generated ones), only the paths of the
+    previous generation are replaced.
+    """
+    settings = dict(settings)
+    previous = {os.path.normcase(p) for p in state.get("extra_paths", [])}
+    generated = {os.path.normcase(p) for p in paths}
+    own = [p for p in settings.get(EXTRA_PATHS_KEY, [])
+           if os.path.normcase(p) not in previous and os.path.normcase(p) not in generated]
+    settings[INTERPRETER_KEY] = interpreter
+    settings[EXTRA_PATHS_KEY] = list(paths) + own
+    if stub_path:
+        settings[STUB_PATH_KEY] = stub_path
+    elif state.get("stub_path") and settings.get(STUB_PATH_KEY) == state["stub_path"]:
+        settings.pop(STUB_PATH_KEY)
+    return settings
+
+
+def export_settings(workspace, stub_modules=(), stub_cache=None, force=False, paths=None):
+    """
+    Write this interpreter's settings into workspace/.vscode/settings.json.
+    - sys.path is pruned of missing and duplicate entries.
+    - Nothing is written when the fingerprint of the interpreter, sys.path
+      and stub modules matches the last run and the settings still hold
+      the generated values (unless force).
+    - stub_modules get cached .pyi stubs (see stubGenerator), and the
+      settings' stubPath points to them.
+    Returns (settings path, True when written).
+    """
+    vscode_dir = os.path.join(os.path.abspath(workspace), ".vscode")
+    settings_path = os.path.join(vscode_dir, "settings.json")
+    state_path = os.path.join(vscode_dir, STATE_FILE_NAME)
+    interpreter = interpreter_path()
+    raw_paths = list(sys.path if paths is None else paths)
+    print_key = fingerprint(interpreter, raw_paths, stub_modules)
+
+    settings = load_jsonc(settings_path)
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = {}
+    # unchanged: not even sys.path is resolved again
+    previous_paths = state.get("extra_paths", [])
+    if (not force and state.get("fingerprint") == print_key
+            and settings.get(INTERPRETER_KEY) == interpreter
+            and settings.get(EXTRA_PATHS_KEY, [])[:len(previous_paths)] == previous_paths
+            and settings.get(STUB_PATH_KEY) == state.get("stub_path")):
+        return settings_path, False
+
+    paths = pruned_paths(raw_paths)
+    stub_path = None
+    if stub_modules:
+        from stubGenerator import write_stubs
+        stub_path = write_stubs(stub_modules, stub_cache)
+    settings = merge_settings(settings, state, interpreter, paths, stub_path)
+    os.makedirs(vscode_dir, exist_ok=True)
+    write_json(settings_path, settings)
+    write_json(state_path, {"fingerprint": print_key, "extra_paths": paths, "stub_path": stub_path})
+    return settings_path, True
+
+
+# COMMAND LINE
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Export this Python's interpreter and sys.path to a VS Code workspace. "
+                    "Run it with hython for Houdini's environment.")
+    parser.add_argument("workspace", nargs="?", default=os.getcwd(), help="VS Code workspace folder")
+    parser.add_argument("--stubs", action="append", default=[], metavar="MODULE",
+                        help="write cached .pyi stubs of a module (e.g. hou), repeatable")
+    parser.add_argument("--stub-cache", help="stub cache folder, per user by default")
+    parser.add_argument("--force", action="store_true", help="write even when nothing changed")
+    parser.add_argument("--print", action="store_true", help="only print the settings, write nothing")
+    return parser
+
 
-vscode_settings = {}
+def main(argv=None):
+    # shelf entry point: asks for the workspace and adds the hou stubs
+    hou = sys.modules.get("hou")
+    if argv is None and hou is not None and hou.isUIAvailable():
+        workspace = hou.ui.selectFile(start_directory=hou.getenv("JOB") or hou.getenv("HIP"),
+                                      title="VS Code workspace", file_type=hou.fileType.Directory)
+        if not workspace:
+            return None
+        try:
+            settings_path, written = export_settings(hou.expandString(workspace), SHELF_STUB_MODULES)
+        except (ImportError, OSError, ValueError) as e:
+            hou.ui.displayMessage(f"Error: {e}", severity=hou.severityType.Error)
+            return None
+        hou.ui.displayMessage(f"{'Written' if written else 'Up to date'}: {settings_path}")
+        return None
 
-pythonexe_path = pathlib.Path(sys.prefix).resolve().joinpath("python.exe")
-vscode_settings['python.defaultInterpreterPath'] = pythonexe_path.as_posix()
+    args = build_parser().parse_args(argv)
+    if args.print:
+        settings = merge_settings({}, {}, interpreter_path(), pruned_paths(sys.path), None)
+        print(json.dumps(settings, indent=4))
+        return 0
+    try:
+        settings_path, written = export_settings(args.workspace, args.stubs, args.stub_cache, args.force)
+    except (ImportError, OSError, ValueError) as e:
+        sys.stderr.write(f"{e}\n")
+        return 1
+    print(f"{'Written' if written else 'Up to date'}: {settings_path}")
+    return 0
 
-sys_paths = [pathlib.Path(p).resolve() for p in sys.path]
-vscode_settings['python.analysis.extraPaths'] = [p.as_posix() for p in sys_paths]
 
-print(json.dumps(vscode_settings, indent=4))
+# Old shelf definitions still exec() the file, Houdini must not exit then
+if __name__ == "__main__":
+    status = main()
+    if status is not None:
+        sys.exit(status)
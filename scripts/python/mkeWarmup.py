@@ -0,0 +1,21 @@
+# Imports the heavy tool modules in the background once Houdini's UI is up, so the
+# first click on the RAT Converter does not pay for them. Started by the package's
+# python3.Xlibs/uiready.py. Set MKETOOLS_WARMUP=0 to turn it off.
+import os
+import threading
+
+# Modules imported ahead of the first click
+WARMUP_MODULES = ("ui.ratConverterUI",)
+
+
+def warm_up(modules=WARMUP_MODULES):
+    for name in modules:
+        try:
+            __import__(name)
+        except Exception as e:
+            print(f"MKE Tools warm-up: could not import {name}: {e}")
+
+
+def start():
+    if os.environ.get("MKETOOLS_WARMUP", "1") != "0":
+        threading.Thread(target=warm_up, name="MKEToolsWarmup", daemon=True).start()
@@ -0,0 +1,291 @@
+import argparse
+import csv
+import json
+import os
+import posixpath
+import string
+import sys
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# Templates shipped with the tools, config/templates of the package
+TEMPLATES_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..",
+                                              "config", "templates"))
+# Directories listed / created at once, network shares hide their latency behind many requests
+DEFAULT_WORKERS = 16
+
+# Exit codes of the command line
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+Template = namedtuple("Template", ["name", "description", "variables", "folders"])
+# created / existing: absolute directories, failed: (directory, error) pairs
+ScaffoldResult = namedtuple("ScaffoldResult", ["root", "created", "existing", "failed", "listed", "dry_run"])
+
+
+# TEMPLATES
+def template_names(templates_dir=TEMPLATES_DIR):
+    try:
+        return sorted(os.path.splitext(n)[0] for n in os.listdir(templates_dir) if n.endswith(".json"))
+    except OSError:
+        return []
+
+
+def load_template(name_or_path, templates_dir=TEMPLATES_DIR):
+    """
+    Read a JSON template, by path or by name in templates_dir:
+        {"description": "...", "variables": {"seq": "MAIN"},
+         "folders": ["SHOTS/{seq}/{shot}/3D/SCENES", ...]}
+    - folders: paths relative to the scaffolded root, with {variable} fields.
+    - variables: default values, overridden by the caller's.
+    """
+    path = name_or_path
+    if not os.path.isfile(path):
+        path = os.path.join(templates_dir, f"{name_or_path}.json")
+    if not os.path.isfile(path):
+        raise ValueError(f"Unknown template '{name_or_path}', expected a file or one of {template_names(templates_dir)}")
+    with open(path, "r") as f:
+        data = json.load(f)
+    folders = data.get("folders")
+    if not isinstance(folders, list) or not all(isinstance(folder, str) for folder in folders):
+        raise ValueError(f"{path}: 'folders' must be a list of paths")
+    return Template(os.path.splitext(os.path.basename(path))[0], data.get("description", ""),
+                    dict(data.get("variables", {})), folders)
+
+
+def template_fields(template):
+    # variables the folders use, the ones without a default must be given
+    fields = set()
+    for folder in template.folders:
+        fields.update(name for _, name, _, _ in string.Formatter().parse(folder) if name)
+    return sorted(fields)
+
+
+def expand_template(template, variables=None, items=None):
+    """
+    Relative folders of a template, in template order and without duplicates.
+    - variables: values for every folder, over the template defaults.
+    - items: one variables dict per shot/asset, the folders are expanded
+      once per item (over variables), e.g. [{"shot": "SH010"}, {"shot": "SH020"}].
+    """
+    base = dict(template.variables)
+    base.update(variables or {})
+    folders, seen = [], set()
+    for item in items or [{}]:
+        values = dict(base)
+        values.update(item)
+        for folder in template.folders:
+            try:
+                path = folder.format_map(values)
+            except KeyError as e:
+                raise ValueError(f"Template '{template.name}' needs a value for {e}") from None
+            # forward slashes on every platform, as written in the templates
+            path = posixpath.normpath(path.strip().replace("\\", "/"))
+            if path != "." and path not in seen:
+                seen.add(path)
+                folders.append(path)
+    return folders
+
+
+def read_items(path):
+    # per shot/asset variables: a JSON list of objects, or a CSV file with a header line
+    with open(path, "r", newline="") as f:
+        if path.lower().endswith(".csv"):
+            return [{k.strip(): (v or "").strip() for k, v in row.items() if k} for row in csv.DictReader(f)]
+        items = json.load(f)
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        raise ValueError(f"{path}: expected a list of objects")
+    return [{k: str(v) for k, v in item.items()} for item in items]
+
+
+# SCAFFOLDING
+class Scaffolder(object):
+    """
+    Creates a folder tree under a root, concurrently and idempotently.
+    - Existing folders are found with one listing of each existing parent
+      (os.scandir, in parallel), never with a check per path; the subtree of
+      a missing folder is known to be missing without any listing.
+    - Missing folders are created depth by depth, one mkdir each, the
+      folders of a depth all at once. A folder created meanwhile by someone
+      else counts as existing, so two runs on the same root are harmless.
+    - dry_run lists what would be created without touching the disk.
+    No Qt and no hou, the dialogs of projectSetup and the command line sit on top.
+    """
+
+    def __init__(self, max_workers=DEFAULT_WORKERS):
+        self.max_workers = max(1, max_workers)
+
+    def scaffold(self, root, folders, dry_run=False):
+        root = os.path.abspath(root)
+        wanted = self._tree(root, folders)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            existing, listed = self._existing(root, wanted, executor)
+            missing = sorted(set(wanted) - existing, key=lambda path: (path.count(os.sep), path))
+            if dry_run:
+                return ScaffoldResult(root, missing, sorted(existing), [], listed, True)
+            created, failed = self._create(missing, existing, executor)
+        return ScaffoldResult(root, created, sorted(existing), failed, listed, False)
+
+    def _tree(self, root, folders):
+        # every folder to exist, parents included: path -> names of its wanted children
+        wanted = {root: set()}
+        for folder in folders:
+            path = os.path.normpath(os.path.join(root, folder))
+            if os.path.commonpath([root, path]) != root:
+                raise ValueError(f"'{folder}' is outside {root}")
+            # add the folder and its parents, up to the first one already known (the root at worst)
+            child = None
+            while True:
+                known = path in wanted
+                children = wanted.setdefault(path, set())
+                if child is not None:
+                    children.add(child)
+                if known:
+                    break
+                child = os.path.basename(path)
+                path = os.path.dirname(path)
+        return wanted
+
+    def _existing(self, root, wanted, executor):
+        # wanted folders already on disk, walking down from the root through existing ones only
+        if not os.path.isdir(root):
+            return set(), 0
+        existing = {root}
+        level, listed = [root], 0
+        while level:
+            listings = list(executor.map(self._subdirs, level))
+            listed += len(level)
+            next_level = []
+            for parent, names in zip(level, listings):
+                for name in wanted[parent]:
+                    if os.path.normcase(name) in names:
+                        path = os.path.join(parent, name)
+                        existing.add(path)
+                        if wanted[path]:
+                            next_level.append(path)
+            level = next_level
+        return existing, listed
+
+    def _subdirs(self, path):
+        try:
+            with os.scandir(path) as entries:
+                return {os.path.normcase(entry.name) for entry in entries if entry.is_dir()}
+        except OSError:
+            return set()
+
+    def _create(self, missing, existing, executor):
+        created, failed = [], []
+        failed_paths = set()
+        by_depth = defaultdict(list)
+        for path in missing:
+            by_depth[path.count(os.sep)].append(path)
+        for depth in sorted(by_depth):
+            level = []
+            for path in by_depth[depth]:
+                if os.path.dirname(path) in failed_paths:
+                    # nothing to create in a folder that could not be created
+                    failed_paths.add(path)
+                    failed.append((path, "parent folder not created"))
+                else:
+                    level.append(path)
+            for path, error in zip(level, executor.map(self._mkdir, level)):
+                if error is None:
+                    created.append(path)
+                elif error is FileExistsError:
+                    existing.add(path)
+                else:
+                    failed_paths.add(path)
+                    failed.append((path, error))
+        return created, failed
+
+    def _mkdir(self, path):
+        # None when created, FileExistsError when it already was, the error message otherwise
+        try:
+            os.mkdir(path)
+        except FileExistsError:
+            return FileExistsError if os.path.isdir(path) else f"a file named {os.path.basename(path)} is in the way"
+        except FileNotFoundError:
+            # the root itself or one of its parents is missing
+            try:
+                os.makedirs(path)
+            except OSError as e:
+                return str(e)
+        except OSError as e:
+            return str(e)
+        return None
+
+
+def scaffold_template(root, template, variables=None, items=None, dry_run=False, max_workers=DEFAULT_WORKERS):
+    # load (by name or path), expand and scaffold a template in one call
+    if not isinstance(template, Template):
+        template = load_template(template)
+    folders = expand_template(template, variables, items)
+    return Scaffolder(max_workers).scaffold(root, folders, dry_run)
+
+
+def format_result(result):
+    # dry-run plan or report, one line per created folder
+    lines = []
+    for path in result.created:
+        lines.append(f"{'would create' if result.dry_run else 'created'}: {os.path.relpath(path, result.root)}")
+    for path, error in result.failed:
+        lines.append(f"failed: {os.path.relpath(path, result.root)} ({error})")
+    verb = "to create" if result.dry_run else "created"
+    lines.append(f"{len(result.created)} folders {verb}, {len(result.existing)} already existing, "
+                 f"{len(result.failed)} failed, {result.listed} folders listed in {result.root}")
+    return "\n".join(lines)
+
+
+# COMMAND LINE
+def parse_assignments(values):
+    # ["shot=SH010", "seq=SQ01"] -> {"shot": "SH010", "seq": "SQ01"}
+    result = {}
+    for value in values:
+        name, sep, setting = value.partition("=")
+        if not sep:
+            raise ValueError(f"expected NAME=VALUE, got '{value}'")
+        result[name.strip()] = setting
+    return result
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Create project, shot or asset folders from a JSON template.",
+        epilog="e.g. projectScaffold.py /show --template shot --var seq=SQ010 --each shot=SH010,SH020,SH030")
+    parser.add_argument("root", help="folder the template paths are relative to")
+    parser.add_argument("--template", default="project",
+                        help=f"template name ({', '.join(template_names()) or 'none found'}) or JSON file")
+    parser.add_argument("--var", action="append", default=[], metavar="NAME=VALUE",
+                        help="variable for every folder, repeatable")
+    parser.add_argument("--each", action="append", default=[], metavar="NAME=V1,V2,...",
+                        help="expand the template once per value, e.g. shot=SH010,SH020")
+    parser.add_argument("--items", metavar="FILE",
+                        help="per shot/asset variables, JSON list of objects or CSV with a header")
+    parser.add_argument("--dry-run", action="store_true", help="print the folders to create, create nothing")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="folders listed / created at once")
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        template = load_template(args.template)
+        variables = parse_assignments(args.var)
+        items = read_items(args.items) if args.items else [{}]
+        for name, values in parse_assignments(args.each).items():
+            items = [dict(item, **{name: value.strip()}) for item in items for value in values.split(",")]
+        result = scaffold_template(args.root, template, variables, items, args.dry_run, args.workers)
+    except (OSError, ValueError) as e:
+        sys.stderr.write(f"{e}\n")
+        return EXIT_USAGE
+    if args.json:
+        print(json.dumps(result._asdict(), indent=4))
+    else:
+        print(format_result(result))
+    return EXIT_FAILED if result.failed else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,4 @@
 import os
-import hou
 from PySide2.QtWidgets import QFileDialog, QDialog, QVBoxLayout, QCheckBox, QPushButton, QLabel, QApplication, QLineEdit, QHBoxLayout, QComboBox
 
 class FolderSelectionDialog(QDialog):
@@ -126,92 +125,96 @@ class CachePathDialog(QDialog):
     def get_cache_path(self):
         return self.cache_input.text().strip()
 
-# 1. Demander à l'utilisateur le chemin du projet
-project_path = QFileDialog.getExistingDirectory(None, "Choisir le dossier du projet")
+def create_structure(base_path, folders):
+    # folders relative to base_path, or outside it (absolute / ../ cache): (created or existing paths, failures)
+    from projectScaffold import Scaffolder
+    outside = [f for f in folders if os.path.isabs(f) or os.path.normpath(f).startswith("..")]
+    result = Scaffolder().scaffold(base_path, [f for f in folders if f not in outside])
+    created = result.created + result.existing
+    failed = list(result.failed)
+    for folder in outside:
+        full_path = os.path.join(base_path, folder)
+        try:
+            os.makedirs(full_path, exist_ok=True)
+            created.append(full_path)
+        except Exception as e:
+            failed.append((full_path, str(e)))
+    return created, failed
+
+
+def main():
+    # shelf entry point, hou and the scaffolding engine are imported on use
+    import hou
+    from projectScaffold import expand_template, load_template
+
+    # 1. Demander à l'utilisateur le chemin du projet
+    project_path = QFileDialog.getExistingDirectory(None, "Choisir le dossier du projet")
+    if not project_path:
+        hou.ui.displayMessage("Aucun dossier choisi. Action annulée.")
+        return
 
-if not project_path:
-    hou.ui.displayMessage("Aucun dossier choisi. Action annulée.")
-else:
     # 2. Fenêtre pour nom + type de projet
     app = QApplication.instance() or QApplication([])
     info_dlg = ProjectInfoDialog()
     if not info_dlg.exec_():
         hou.ui.displayMessage("Action annulée.")
-    else:
-        project_name, project_type = info_dlg.get_project_info()
-        if not project_name:
-            hou.ui.displayMessage("Nom du projet vide. Action annulée.")
-        else:
-            base_path = os.path.join(project_path, project_name)
-
-            # Demander le chemin du dossier cache
-            default_cache = "3D/CACHES"
-            cache_dlg = CachePathDialog(default_cache)
-            if not cache_dlg.exec_():
-                hou.ui.displayMessage("Action annulée.")
-            else:
-                cache_path = cache_dlg.get_cache_path()
-                if not cache_path:
-                    cache_path = default_cache
-                cache_path = cache_path.strip()
-
-                # Définir les variables d'environnement $JOB, $HIP, $CACHE
-                hou.putenv("JOB", base_path)
-                hou.putenv("HIP", base_path)
-                hou.putenv("CACHE", os.path.join(base_path, cache_path))
-
-                folders = [
-                    cache_path,
-                    "3D/SCENES",
-                    "USD",
-                    "PIPELINE",
-                    "REFERENCES",
-                    "_DAILIES",
-                    "IN/ASSETS",
-                    "IN/PROPS",
-                    "IN/CHARACTERS",
-                    "IN/ENVIRONMENT",
-                    "IN/CAMERAS",
-                    "IN/TEXTURES",
-                    f"OUT/{project_type}",
-                ]
-
-                # Si le chemin cache n'est pas le défaut, retirer "3D/CACHES" de la liste
-                if cache_path != default_cache and default_cache in folders:
-                    folders.remove(default_cache)
-
-                # Afficher la boîte de dialogue de sélection
-                dlg = FolderSelectionDialog(folders)
-                if dlg.exec_():
-                    selected_folders = dlg.get_selected_folders()
-                    created = []
-                    for folder in selected_folders:
-                        full_path = os.path.join(base_path, folder)
-                        try:
-                            os.makedirs(full_path, exist_ok=True)
-                            created.append(full_path)
-                        except Exception as e:
-                            hou.ui.displayMessage(f"Erreur lors de la création de {folder} : {str(e)}")
-
-                    # Save first version of the .hip file
-                    import getpass
-                    user_name = getpass.getuser()
-                    hip_name = f"{project_name}_{project_type}_{user_name}_v0001.hip"
-                    hip_path = os.path.join(base_path, "3D", "SCENES", hip_name)
-                    try:
-                        hou.hipFile.save(hip_path)
-                        
-                    except Exception as e:
-                        hou.ui.displayMessage(f"Erreur lors de la sauvegarde du fichier .hip : {str(e)}")
-
-                    hou.ui.displayMessage(
-                            f"Structure créée dans :\n{base_path}\n({len(created)} dossiers)"
-                            f"Projet initialisé !\n\n"
-                            f"$JOB = {base_path}\n"
-                            f"$HIP = {base_path}\n"
-                            f"$CACHE = {os.path.join(base_path, cache_path)}\n"
-                            f"Fichier .hip sauvegardé dans :\n{hip_path}"
-                        )
-                else:
-                    hou.ui.displayMessage("Action annulée.")
-
+        return
+    project_name, project_type = info_dlg.get_project_info()
+    if not project_name:
+        hou.ui.displayMessage("Nom du projet vide. Action annulée.")
+        return
+    base_path = os.path.join(project_path, project_name)
+
+    # Demander le chemin du dossier cache
+    default_cache = "3D/CACHES"
+    cache_dlg = CachePathDialog(default_cache)
+    if not cache_dlg.exec_():
+        hou.ui.displayMessage("Action annulée.")
+        return
+    cache_path = cache_dlg.get_cache_path()
+    if not cache_path:
+        cache_path = default_cache
+    cache_path = cache_path.strip()
+
+    # Définir les variables d'environnement $JOB, $HIP, $CACHE
+    hou.putenv("JOB", base_path)
+    hou.putenv("HIP", base_path)
+    hou.putenv("CACHE", os.path.join(base_path, cache_path))
+
+    # Dossiers du template config/templates/project.json ({cache_path}, {project_type})
+    template = load_template("project")
+    folders = expand_template(template, {"project_type": project_type, "cache_path": cache_path})
+
+    # Afficher la boîte de dialogue de sélection
+    dlg = FolderSelectionDialog(folders)
+    if not dlg.exec_():
+        hou.ui.displayMessage("Action annulée.")
+        return
+    created, failed = create_structure(base_path, dlg.get_selected_folders())
+    if failed:
+        errors = "\n".join(f"{os.path.relpath(path, base_path)} : {error}" for path, error in failed)
+        hou.ui.displayMessage(f"Erreur lors de la création des dossiers :\n{errors}")
+
+    # Save first version of the .hip file
+    import getpass
+    user_name = getpass.getuser()
+    hip_name = f"{project_name}_{project_type}_{user_name}_v0001.hip"
+    hip_path = os.path.join(base_path, "3D", "SCENES", hip_name)
+    try:
+        hou.hipFile.save(hip_path)
+    except Exception as e:
+        hou.ui.displayMessage(f"Erreur lors de la sauvegarde du fichier .hip : {str(e)}")
+
+    hou.ui.displayMessage(
+            f"Structure créée dans :\n{base_path}\n({len(created)} dossiers)"
+            f"Projet initialisé !\n\n"
+            f"$JOB = {base_path}\n"
+            f"$HIP = {base_path}\n"
+            f"$CACHE = {os.path.join(base_path, cache_path)}\n"
+            f"Fichier .hip sauvegardé dans :\n{hip_path}"
+        )
+
+
+# Old shelf definitions still exec() the file
+if __name__ == "__main__":
+    main()
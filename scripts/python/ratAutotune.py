@@ -0,0 +1,124 @@
+import os
+import threading
+import time
+
+# Seconds of measurement behind each concurrency decision
+TUNE_INTERVAL = 3.0
+# Throughput changes smaller than this are treated as noise
+TOLERANCE = 0.05
+# Load average per core above which concurrency is reduced
+HIGH_LOAD_PER_CORE = 1.5
+# Stable intervals before probing one more worker
+PROBE_AFTER = 3
+
+
+def load_per_core():
+    # 1 minute load average per core, None where the OS does not provide it (Windows)
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        return None
+
+
+class ConcurrencyLimiter(object):
+    """
+    Semaphore whose size can change while threads wait on it.
+    Lowering the limit never interrupts running work, it only delays the
+    next acquire until enough slots are released.
+    """
+
+    def __init__(self, limit):
+        self._condition = threading.Condition()
+        self._limit = max(1, limit)
+        self._in_use = 0
+
+    @property
+    def limit(self):
+        return self._limit
+
+    def set_limit(self, limit):
+        with self._condition:
+            self._limit = max(1, limit)
+            self._condition.notify_all()
+
+    def acquire(self, timeout=None):
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._in_use < self._limit, timeout):
+                return False
+            self._in_use += 1
+            return True
+
+    def release(self):
+        with self._condition:
+            self._in_use -= 1
+            self._condition.notify()
+
+
+class ConcurrencyTuner(object):
+    """
+    Hill-climbs the number of concurrent conversions between min_workers and
+    max_workers from the completion throughput measured every interval:
+    keep going while throughput improves, turn back when it drops, probe one
+    more worker after a few stable intervals, and back off when the machine
+    is overloaded. Every change is kept in history as
+    (time, limit, files/s, load per core).
+    """
+
+    def __init__(self, limiter, min_workers, max_workers, interval=TUNE_INTERVAL, log=None):
+        self.limiter = limiter
+        self.min_workers = max(1, min_workers)
+        self.max_workers = max(self.min_workers, max_workers)
+        self.interval = interval
+        self.log = log
+        self.history = []
+        self._direction = 1
+        self._stable = 0
+        self._last_throughput = None
+        self._last_time = time.time()
+        self._last_done = 0
+        self.limiter.set_limit(min(max(self.limiter.limit, self.min_workers), self.max_workers))
+
+    def update(self, done):
+        # call regularly with the number of files completed so far
+        now = time.time()
+        elapsed = now - self._last_time
+        if elapsed < self.interval:
+            return self.limiter.limit
+        completed = done - self._last_done
+        self._last_time = now
+        self._last_done = done
+        if completed <= 0:
+            # nothing finished (scan still starting, or long files): no signal to act on
+            return self.limiter.limit
+
+        throughput = completed / elapsed
+        load = load_per_core()
+        limit = self.limiter.limit
+        last = self._last_throughput
+        if load is not None and load > HIGH_LOAD_PER_CORE and limit > self.min_workers:
+            self._direction = -1
+            limit -= 1
+        elif last is None or throughput > last * (1 + TOLERANCE):
+            limit += self._direction
+        elif throughput < last * (1 - TOLERANCE):
+            self._direction = -self._direction
+            limit += self._direction
+        else:
+            self._stable += 1
+            if self._stable >= PROBE_AFTER:
+                self._stable = 0
+                self._direction = 1
+                limit += 1
+        if limit < self.min_workers or limit > self.max_workers:
+            limit = min(max(limit, self.min_workers), self.max_workers)
+            self._direction = -self._direction
+        self._last_throughput = throughput
+
+        self.history.append((now, limit, throughput, load))
+        if limit != self.limiter.limit:
+            self._stable = 0
+            self.limiter.set_limit(limit)
+            if self.log:
+                load_text = f", load {load:.2f}/core" if load is not None else ""
+                self.log(f"Concurrency -> {limit} (measured {throughput:.1f} files/s{load_text})")
+        return limit
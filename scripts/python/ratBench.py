@@ -0,0 +1,252 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from dirCrawler import DirCrawler
+from ratEngine import VALID_EXTENSIONS, ConversionCallbacks, ConversionEngine
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
+
+STUB_ICONVERT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stubIconvert.py")
+# in-process stand-in for the pool backend, configured through the STUB_ICONVERT_* variables
+STUB_CONVERTER = "stubIconvert:convert_from_env"
+DEFAULT_MIX = "exr=0.4,jpg=0.3,png=0.2,tif=0.1"
+SIZE_DISTRIBUTIONS = ("fixed", "uniform", "lognormal")
+
+
+def parse_mix(text):
+    # "exr=0.4,jpg=0.6" -> [(".exr", 0.4), (".jpg", 0.6)]
+    mix = []
+    for part in text.split(","):
+        ext, _, weight = part.partition("=")
+        ext = "." + ext.strip().lstrip(".").lower()
+        if ext not in VALID_EXTENSIONS:
+            raise ValueError(f"{ext} is not converted by the RAT converter")
+        mix.append((ext, float(weight or 1.0)))
+    return mix
+
+
+def random_size(rng, distribution, mean_size):
+    if distribution == "fixed":
+        return mean_size
+    if distribution == "uniform":
+        return rng.randint(1, 2 * mean_size)
+    # lognormal: mostly small maps and a long tail of big ones
+    return max(1, int(rng.lognormvariate(0, 1.0) * mean_size / 1.65))
+
+
+def generate_tree(root, files, depth=3, fanout=8, distribution="lognormal", mean_size=64 * 1024,
+                  mix=DEFAULT_MIX, seed=0, sparse=True):
+    """
+    Fill root with a synthetic texture library and return (file count, total bytes).
+    Files are spread over fanout**depth leaf folders. Sparse files are created
+    by truncation, so a million-file tree costs inodes, not disk space.
+    """
+    rng = random.Random(seed)
+    extensions, weights = zip(*parse_mix(mix))
+    leaves = [""]
+    for _ in range(depth):
+        leaves = [os.path.join(leaf, f"d{i:03d}") for leaf in leaves for i in range(fanout)]
+    total_bytes = 0
+    for index in range(files):
+        folder = os.path.join(root, leaves[index % len(leaves)])
+        if index < len(leaves):
+            os.makedirs(folder, exist_ok=True)
+        ext = rng.choices(extensions, weights)[0]
+        size = random_size(rng, distribution, mean_size)
+        with open(os.path.join(folder, f"tex_{index:07d}{ext}"), "wb") as f:
+            if sparse:
+                f.truncate(size)
+            else:
+                f.write(os.urandom(size))
+        total_bytes += size
+    return files, total_bytes
+
+
+def peak_rss_mb():
+    # high-water mark of the whole process: only meaningful per phase in run_phase's child processes
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class BenchCallbacks(ConversionCallbacks):
+    # times the scan and the cost of the progress callbacks themselves
+    def __init__(self, start):
+        self.start = start
+        self.scan_seconds = None
+        self.callback_count = 0
+        self.callback_seconds = 0.0
+
+    def scan_complete(self, queued):
+        self.scan_seconds = time.time() - self.start
+
+    def stats(self, stats):
+        begin = time.perf_counter()
+        self.callback_count += 1
+        json.dumps(stats)
+        self.callback_seconds += time.perf_counter() - begin
+
+    def log(self, message):
+        pass
+
+
+def stub_command(latency, cpu):
+    return [sys.executable, STUB_ICONVERT, "--latency", str(latency), "--cpu", str(cpu)]
+
+
+def run_engine(root, workers, iconvert, incremental=True, cancel_after=None, **engine_options):
+    start = time.time()
+    callbacks = BenchCallbacks(start)
+    engine = ConversionEngine(root, True, workers, incremental=incremental, iconvert=iconvert,
+                              callbacks=callbacks, **engine_options)
+    if cancel_after is not None:
+        timer = threading.Timer(cancel_after, engine.cancel)
+        timer.daemon = True
+        timer.start()
+    summary = engine.run()
+    elapsed = time.time() - start
+    handled = summary["converted"] + summary["failed"]
+    schedule = summary["schedule"]
+    return {
+        "elapsed": round(elapsed, 3),
+        "scan_seconds": round(callbacks.scan_seconds, 3) if callbacks.scan_seconds is not None else None,
+        "queued": summary["queued"],
+        "skipped": summary["skipped"],
+        "converted": summary["converted"],
+        "failed": summary["failed"],
+        "files_per_sec": round(handled / elapsed, 2) if elapsed else 0.0,
+        "callback_count": callbacks.callback_count,
+        "callback_seconds": round(callbacks.callback_seconds, 4),
+        # wall time not explained by the conversions themselves: scan, queueing, spawn, signals
+        "overhead_seconds": round(elapsed - schedule["actual_conversion_seconds"] / max(workers, 1), 3),
+        "cancel_latency": summary["cancel_latency"],
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_phase(root, workers, iconvert, **options):
+    # run_engine in a fresh process, so its peak_rss_mb belongs to this phase alone
+    # and not to every phase before it (ru_maxrss never goes down)
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(run_engine, root, workers, iconvert, **options).result()
+
+
+def run_benchmark(args):
+    root = args.root or tempfile.mkdtemp(prefix="ratbench_")
+    os.makedirs(root, exist_ok=True)
+    results = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "params": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+    }
+    try:
+        begin = time.time()
+        files, total_bytes = generate_tree(root, args.files, args.depth, args.fanout, args.size_dist,
+                                           args.mean_size, args.mix, args.seed, not args.dense)
+        results["tree"] = {"files": files, "bytes": total_bytes, "generate_seconds": round(time.time() - begin, 3)}
+
+        # raw crawl speed, without the conversion pipeline
+        begin = time.time()
+        crawled = sum(1 for _ in DirCrawler(root, max_workers=args.crawl_workers).crawl())
+        results["crawl"] = {"files": crawled, "seconds": round(time.time() - begin, 3)}
+
+        iconvert = stub_command(args.latency, args.cpu)
+        options = {"use_manifest": not args.no_manifest, "crawl_workers": args.crawl_workers,
+                   "schedule": args.schedule}
+        results["full_run"] = run_phase(root, args.workers, iconvert, **options)
+        results["full_run"]["mb_per_sec"] = round(
+            total_bytes / (1024 * 1024) / results["full_run"]["elapsed"], 2) if results["full_run"]["elapsed"] else 0.0
+        # nothing changed: how long the incremental check of the whole tree takes
+        results["incremental_rerun"] = run_phase(root, args.workers, iconvert, **options)
+        # forced reconversion cancelled midway
+        results["cancel_run"] = run_phase(root, args.workers, iconvert, incremental=False,
+                                          cancel_after=args.cancel_after, **options)
+        if args.compare_backends:
+            # same forced reconversion, one process per file vs. persistent converter processes
+            os.environ["STUB_ICONVERT_LATENCY"] = str(args.latency)
+            os.environ["STUB_ICONVERT_CPU"] = str(args.cpu)
+            results["backends"] = {
+                backend: run_phase(root, args.workers, iconvert, incremental=False, backend=backend,
+                                   converter=STUB_CONVERTER, **options)
+                for backend in ("spawn", "pool")
+            }
+    finally:
+        if not args.keep and not args.root:
+            shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+def compare(previous, current, path=""):
+    # print numeric fields that moved between two result files
+    for key, value in current.items():
+        name = f"{path}{key}"
+        old = previous.get(key) if isinstance(previous, dict) else None
+        if isinstance(value, dict):
+            compare(old or {}, value, name + ".")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and isinstance(old, (int, float)):
+            if old and value != old:
+                print(f"{name}: {old} -> {value} ({(value - old) / old * 100.0:+.1f}%)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m ratBench",
+                                     description="Benchmark the RAT conversion pipeline with a stub iconvert.")
+    parser.add_argument("--files", type=int, default=1000, help="texture count (1k to 1M)")
+    parser.add_argument("--depth", type=int, default=3, help="folder depth")
+    parser.add_argument("--fanout", type=int, default=8, help="subfolders per folder")
+    parser.add_argument("--size-dist", choices=SIZE_DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--mean-size", type=int, default=64 * 1024, help="mean file size in bytes")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"extension weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dense", action="store_true", help="write random bytes instead of sparse files")
+    parser.add_argument("--latency", type=float, default=0.01, help="stub iconvert wait per file, in seconds")
+    parser.add_argument("--cpu", type=float, default=0.0, help="stub iconvert CPU time per file, in seconds")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--crawl-workers", type=int, default=8)
+    parser.add_argument("--schedule", choices=("largest_first", "fifo"), default="largest_first")
+    parser.add_argument("--no-manifest", action="store_true")
+    parser.add_argument("--compare-backends", action="store_true",
+                        help="also time a full reconversion with the spawn and the pool backends")
+    parser.add_argument("--cancel-after", type=float, default=1.0, help="seconds before the cancel run is cancelled")
+    parser.add_argument("--root", help="generate the tree here instead of a temp folder (kept)")
+    parser.add_argument("--keep", action="store_true", help="keep the temp tree")
+    parser.add_argument("-o", "--output", help="write the JSON results to this file")
+    parser.add_argument("--compare", help="previous results file to compare with")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    results = run_benchmark(args)
+    text = json.dumps(results, indent=4)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, "r") as f:
+            compare(json.load(f), results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
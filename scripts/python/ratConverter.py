@@ -1,99 +1,104 @@
-import os
-import subprocess
-import sys
 import time
-from concurrent.futures import ThreadPoolExecutor
 
 from PySide2 import QtCore
 
+from ratEngine import ConversionCallbacks, ConversionEngine
+from ratPlanner import LISTED_FILES
+
 # WORKER Signal
 class WorkerSignals(QtCore.QObject):
     """
     Define signals for the worker thread.
-    - scan_complete: Emits total file count after scanning.
+    - scan_progress: Emits the file count queued so far while the scan is still running.
+    - scan_complete: Emits total file count queued for conversion once the scan is over.
     - progress_update: Emits the number of files converted so far.
     - status_update: Emits a string for the status label ui.
+    - counts_update: Emits (queued, skipped, converted) file counts.
+    - stats_update: Emits a ratProgress snapshot (files/s, MB/s, ETA, active workers, failures).
     - finished: Signals the entire process is done.
     """
+    scan_progress = QtCore.Signal(int)
     scan_complete = QtCore.Signal(int)
     progress_update = QtCore.Signal(int)
     status_update = QtCore.Signal(str)
+    counts_update = QtCore.Signal(int, int, int)
+    stats_update = QtCore.Signal(dict)
     finished = QtCore.Signal()
 
 
+class SignalCallbacks(ConversionCallbacks):
+    # forwards the engine callbacks to the Qt signals
+    def __init__(self, signals):
+        self.signals = signals
+
+    def status(self, message):
+        self.signals.status_update.emit(message)
+
+    def scan_progress(self, queued):
+        self.signals.scan_progress.emit(queued)
+
+    def scan_complete(self, queued):
+        self.signals.scan_complete.emit(queued)
+
+    def stats(self, stats):
+        self.signals.progress_update.emit(stats["done"])
+        self.signals.counts_update.emit(stats["queued"], stats["skipped"], stats["converted"])
+        self.signals.stats_update.emit(stats)
+
+
 # WORKER
 class RatConversionWorker(QtCore.QObject):
-    def __init__(self, folder, use_subfolders, max_workers):
+    """
+    Qt adapter over ratEngine.ConversionEngine, meant to be moved to a QThread.
+    Keyword arguments are passed through to the engine.
+    """
+
+    def __init__(self, folder, use_subfolders, max_workers, **engine_options):
         super(RatConversionWorker, self).__init__()
         self.signals = WorkerSignals()
-        self.folder = folder
-        self.use_subfolders = use_subfolders
-        self.max_workers = max_workers
-        self.is_cancelled = False
+        self.engine = ConversionEngine(folder, use_subfolders, max_workers,
+                                       callbacks=SignalCallbacks(self.signals), **engine_options)
+        self.result = None
+
+    @property
+    def is_cancelled(self):
+        return self.engine.is_cancelled
 
     @QtCore.Slot()
     def run(self):
-        # Scan root and return the number of files
-        self.signals.status_update.emit("Scanning for image files...")
-        image_files = self._find_files()
-        total_files = len(image_files)
-        self.signals.scan_complete.emit(total_files)
-
-        if self.is_cancelled:
-            self.signals.finished.emit()
-            return
-            
-        if not image_files:
-            self.signals.status_update.emit("No new image files found to convert.")
+        self.result = self.engine.run()
+        # leave the final status readable before the window closes
+        if not self.engine.is_cancelled:
             time.sleep(1.5)
-            self.signals.finished.emit()
-            return
-
-        # STAGE 2: Convert files and report progress for each one.
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # enumerate the count of completed tasks
-            for i, _ in enumerate(executor.map(self._convert_single_file, image_files)):
-                if self.is_cancelled:
-                    self.signals.status_update.emit(f"Cancelled. Processed {i} of {total_files} files.")
-                    break
-                # number of files done
-                self.signals.progress_update.emit(i + 1)
-        
-        if not self.is_cancelled:
-            self.signals.status_update.emit(f"Successfully converted {total_files} files.")
-        
-        time.sleep(1.5)
         self.signals.finished.emit()
 
-    def _find_files(self):
-        # find files based on extension (with or without subfolder process)
-        valid_extensions = (".exr", ".tif", ".tiff", ".png", ".jpg", ".jpeg")
-        files_to_process = []
-        if self.use_subfolders:
-            for root, _, files in os.walk(self.folder):
-                for f in files:
-                    if f.lower().endswith(valid_extensions):
-                        files_to_process.append(os.path.join(root, f))
-        else:
-            for f in os.listdir(self.folder):
-                path = os.path.join(self.folder, f)
-                if os.path.isfile(path) and f.lower().endswith(valid_extensions):
-                    files_to_process.append(path)
-        return files_to_process
-
-    def _convert_single_file(self, image_path):
-        # convert process
-        if self.is_cancelled:
-            return
-        base_name = os.path.basename(image_path)
-        self.signals.status_update.emit(f"Converting: {base_name}")
-        rat_path = f"{os.path.splitext(image_path)[0]}.rat"
-        cmd = ["iconvert", image_path, rat_path]
-        try:
-            creation_flags = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
-            subprocess.run(cmd, check=True, creationflags=creation_flags, capture_output=True, text=True)
-        except subprocess.CalledProcessError as e:
-            print(f"Error converting {base_name}: {e.stderr}")
-        except FileNotFoundError:
-            self.signals.status_update.emit("'iconvert' not found")
-            self.is_cancelled = True
\ No newline at end of file
+    def cancel(self):
+        # Called directly from the UI thread, not through a queued slot.
+        self.engine.cancel()
+
+
+class RatPlanWorker(QtCore.QObject):
+    """
+    Dry run of a conversion (ratEngine.ConversionEngine.plan), meant to be
+    moved to a QThread; same arguments as RatConversionWorker.
+    - finished: emits the plan summary (ratPlanner.ConversionPlan.summary)
+      listing the first LISTED_FILES files of each status, and the PlanItems
+      to convert, for the run to take as planned instead of scanning again.
+    """
+    finished = QtCore.Signal(dict, list)
+
+    def __init__(self, folder, use_subfolders, max_workers, **engine_options):
+        super(RatPlanWorker, self).__init__()
+        self.engine = ConversionEngine(folder, use_subfolders, max_workers, **engine_options)
+
+    @QtCore.Slot()
+    def run(self):
+        plan = self.engine.plan()
+        self.finished.emit(plan.summary(listed=LISTED_FILES), plan.to_convert)
+
+    @property
+    def is_cancelled(self):
+        return self.engine.is_cancelled
+
+    def cancel(self):
+        self.engine.cancel()
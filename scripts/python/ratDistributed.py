@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+
+LEASE_DIR_NAME = ".ratconverter_leases"
+STATUS_DIR_NAME = ".ratconverter_nodes"
+STATUS_FILE_NAME = ".ratconverter_status.json"
+# A lease not refreshed for this long belongs to a dead node
+DEFAULT_LEASE_TTL = 120.0
+# Node status files are rewritten at most this often
+STATUS_INTERVAL = 2.0
+# Fields of the progress snapshot that add up across nodes
+SUMMED_FIELDS = ("converted", "linked", "failed", "active", "bytes_done", "files_per_sec", "mb_per_sec")
+# Only meaningful while the node is running
+LIVE_FIELDS = ("active", "files_per_sec", "mb_per_sec")
+
+
+def default_node_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def write_json_atomic(path, data):
+    # readers on other machines never see a half written file
+    tmp_path = f"{path}.{default_node_id()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=4)
+    os.replace(tmp_path, path)
+
+
+class LeaseClaimer(object):
+    """
+    Claims files of a texture root for this node with lease files, so several
+    converters started on the same root share the work without any server.
+    - claim() is atomic across machines as long as the share honours
+      exclusive create (O_EXCL), which SMB and NFSv3+ do.
+    - Held leases are refreshed; a lease left by a crashed node expires after
+      lease_ttl seconds and is taken over. The lease renamed away is checked
+      again, so a node acting on a stale check gives back a fresh lease.
+    - write_status() publishes this node's progress and the sum of all nodes
+      in STATUS_FILE_NAME at the root.
+    Try it locally with the stub converter, from scripts/python:
+        python -m ratEngine ROOT --distributed --iconvert "python stubIconvert.py --latency 0.05" &
+        python -m ratEngine ROOT --distributed --iconvert "python stubIconvert.py --latency 0.05" &
+    """
+
+    def __init__(self, root, node_id=None, lease_ttl=DEFAULT_LEASE_TTL):
+        self.root = os.path.abspath(root)
+        self.node_id = node_id or default_node_id()
+        self.lease_ttl = lease_ttl
+        self.lease_dir = os.path.join(self.root, LEASE_DIR_NAME)
+        self.status_dir = os.path.join(self.root, STATUS_DIR_NAME)
+        os.makedirs(self.lease_dir, exist_ok=True)
+        os.makedirs(self.status_dir, exist_ok=True)
+        self.expired_count = 0
+        self._held = set()
+        self._lock = threading.Lock()
+        self._last_status = 0.0
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+    def _lease_path(self, path):
+        rel = os.path.relpath(os.path.abspath(path), self.root).replace(os.sep, "/")
+        return os.path.join(self.lease_dir, hashlib.sha1(rel.encode("utf-8")).hexdigest() + ".lease")
+
+    def start(self):
+        # refresh the leases we hold so long conversions do not expire
+        self._prune_status()
+        self._stop.clear()
+        self._heartbeat = threading.Thread(target=self._refresh_loop, name="RatLeaseHeartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+            self._heartbeat = None
+        with self._lock:
+            held = list(self._held)
+        for lease_path in held:
+            self._remove(lease_path)
+
+    def claim(self, path):
+        # True when this node now owns path
+        lease_path = self._lease_path(path)
+        if self._create(lease_path, path):
+            return True
+        if not self._is_expired(lease_path):
+            return False
+        # take over a dead node's lease
+        tombstone = f"{lease_path}.{self.node_id}.expired"
+        try:
+            os.rename(lease_path, tombstone)
+        except OSError:
+            return False
+        if not self._is_expired(tombstone):
+            # another node took it over since our check, what we renamed is its fresh lease
+            try:
+                os.rename(tombstone, lease_path)
+            except OSError:
+                self._remove(tombstone)
+            return False
+        self._remove(tombstone)
+        self.expired_count += 1
+        return self._create(lease_path, path)
+
+    def release(self, path):
+        lease_path = self._lease_path(path)
+        with self._lock:
+            self._held.discard(lease_path)
+        self._remove(lease_path)
+
+    def _create(self, lease_path, path):
+        try:
+            fd = os.open(lease_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w") as f:
+            json.dump({"node": self.node_id, "path": path, "claimed_at": time.time()}, f)
+        with self._lock:
+            self._held.add(lease_path)
+        return True
+
+    def _is_expired(self, lease_path):
+        try:
+            return time.time() - os.stat(lease_path).st_mtime > self.lease_ttl
+        except OSError:
+            # released in the meantime, let the next claim retry
+            return False
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.lease_ttl / 3.0):
+            with self._lock:
+                held = list(self._held)
+            for lease_path in held:
+                try:
+                    os.utime(lease_path, None)
+                except OSError:
+                    pass
+
+    def _prune_status(self):
+        # forget the nodes of previous runs
+        now = time.time()
+        try:
+            names = os.listdir(self.status_dir)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.status_dir, name)
+            try:
+                if now - os.stat(path).st_mtime > self.lease_ttl:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def write_status(self, stats, force=False):
+        # publish this node's progress and refresh the root's aggregated status
+        now = time.time()
+        if not force and now - self._last_status < STATUS_INTERVAL:
+            return
+        self._last_status = now
+        node_status = dict(stats, node=self.node_id, updated_at=now)
+        try:
+            write_json_atomic(os.path.join(self.status_dir, f"{self.node_id}.json"), node_status)
+            write_json_atomic(os.path.join(self.root, STATUS_FILE_NAME), aggregate_status(self.root))
+        except OSError as e:
+            print(f"Could not write distributed status: {e}")
+
+
+def aggregate_status(root, stale_after=DEFAULT_LEASE_TTL):
+    # sum the progress of every node that reported on this root
+    status_dir = os.path.join(os.path.abspath(root), STATUS_DIR_NAME)
+    totals = dict.fromkeys(("done",) + SUMMED_FIELDS, 0)
+    nodes = []
+    now = time.time()
+    try:
+        names = os.listdir(status_dir)
+    except OSError:
+        names = []
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(status_dir, name), "r") as f:
+                node_status = json.load(f)
+        except (OSError, ValueError):
+            continue
+        running = not node_status.get("finished") and now - node_status.get("updated_at", 0) < stale_after
+        # files another node handled are in that node's own count
+        done = node_status.get("done", 0) - node_status.get("elsewhere", 0)
+        totals["done"] += done
+        nodes.append({
+            "node": node_status.get("node"),
+            "done": done,
+            "failed": node_status.get("failed", 0),
+            "running": running,
+            "updated_at": node_status.get("updated_at"),
+        })
+        for field in SUMMED_FIELDS:
+            if field in LIVE_FIELDS and not running:
+                continue
+            totals[field] += node_status.get(field, 0)
+    totals["nodes"] = nodes
+    totals["running_nodes"] = sum(1 for node in nodes if node["running"])
+    totals["updated_at"] = now
+    return totals
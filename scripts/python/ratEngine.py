@@ -0,0 +1,1321 @@
+import argparse
+import hashlib
+import json
+import os
+import queue
+import shlex
+import shutil
+import signal
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from dirCrawler import CrawlEntry, DirCrawler
+from ratAutotune import ConcurrencyLimiter, ConcurrencyTuner
+from ratManifest import MANIFEST_FILE_NAME, ConversionManifest
+from ratPlanner import NEW, SKIPPED, STALE, UP_TO_DATE, ConversionPlan, PlanItem, format_plan
+from ratDistributed import DEFAULT_LEASE_TTL, LEASE_DIR_NAME, STATUS_DIR_NAME, LeaseClaimer
+from ratFailures import (DEFAULT_RETRIES, DEFAULT_RETRY_DELAY, MISSING_TOOL, TRANSIENT, UNKNOWN, FailureLog,
+                         classify_failure, failure_entry, retry_delay)
+from ratProgress import ProgressAggregator, format_duration, format_stats
+from ratScheduler import ConversionScheduler, CostModel
+from ratStaging import DEFAULT_WRITEBACK_BATCH, ScratchStager, default_scratch_dir
+from ratTargets import IMAGE_EXTENSIONS, TARGETS, RatTarget, create_target, output_suffixes
+from ratTrace import ConversionTracer
+from ratWorkerPool import STATUS_FALLBACK, STATUS_OK, ConverterProcessPool, default_python
+
+# Inputs of the default .rat target
+VALID_EXTENSIONS = IMAGE_EXTENSIONS
+HASH_CHUNK_SIZE = 1024 * 1024
+# Directory listings cached between runs when cache_listings is on
+DIR_CACHE_FILE_NAME = ".ratconverter_dirs.json"
+# Files waiting between the scanner and the converters, per worker thread
+QUEUE_SIZE_PER_WORKER = 64
+# Queue depth in largest_first mode: the window the ordering applies to
+SCHEDULE_LOOKAHEAD = 20000
+# Progress callbacks fire at this period (10 Hz) rather than per file
+PROGRESS_INTERVAL = 0.1
+# Seconds a terminated iconvert gets to exit before it is killed
+CANCEL_GRACE_PERIOD = 2.0
+# "spawn": one iconvert process per file, "pool": persistent converter processes (see ratWorkerPool)
+BACKENDS = ("spawn", "pool")
+# In-process converter of the pool backend: a COP network in hython workers (see ratHouConverter)
+DEFAULT_CONVERTER = "ratHouConverter:convert"
+
+
+# One output to make from a scanned file; path and st_size make it a scheduler entry
+ConversionJob = namedtuple("ConversionJob", ["path", "st_size", "st_mtime", "target"])
+
+
+def file_digest(path):
+    # sha1 of the file content, read in chunks
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Exit codes of the command line
+EXIT_OK = 0
+EXIT_FAILURES = 1
+EXIT_USAGE = 2
+EXIT_TOOL_MISSING = 3
+# The engine itself raised, nothing or part of the files were converted
+EXIT_ERROR = 4
+EXIT_CANCELLED = 130
+
+# CALLBACKS
+class ConversionCallbacks(object):
+    """
+    Receives the engine's progress. Subclass and override what you need.
+    - status: a short message for a status line.
+    - scan_progress: file count queued so far while the scan is still running.
+    - scan_complete: total file count queued once the scan is over.
+    - stats: a ratProgress snapshot, at most PROGRESS_INTERVAL apart.
+    - log: errors and diagnostics.
+    Every method is called from the thread running ConversionEngine.run,
+    except log which can come from pool threads.
+    """
+
+    def status(self, message):
+        pass
+
+    def scan_progress(self, queued):
+        pass
+
+    def scan_complete(self, queued):
+        pass
+
+    def stats(self, stats):
+        pass
+
+    def log(self, message):
+        print(message)
+
+
+# ENGINE
+class ConversionEngine(object):
+    """
+    Scan a texture root and convert stale images to .rat with iconvert.
+    Pure Python: progress goes through a ConversionCallbacks object, so the
+    same engine drives the Qt worker, the command line and farm jobs.
+    With several targets (see ratTargets) one scan queues a job per target
+    and stale output, each output tracked on its own in the manifest.
+    """
+
+    def __init__(self, folder, use_subfolders=True, max_workers=4, incremental=True, verify_hash=False,
+                 use_manifest=True, dedupe=False, extra_args=None, exclude=None, crawl_workers=8,
+                 cache_listings=False, iconvert="iconvert", distributed=False, node_id=None,
+                 lease_ttl=DEFAULT_LEASE_TTL, autotune=False, min_workers=1, schedule="largest_first",
+                 priority_paths=None, lookahead=SCHEDULE_LOOKAHEAD, trace=False, trace_prefix=None,
+                 backend="spawn", converter=None, worker_python=None, scratch_dir=None, bandwidth_limit=None,
+                 writeback_batch=DEFAULT_WRITEBACK_BATCH, files=None, scan_rest=False, planned=None, targets=None,
+                 retries=DEFAULT_RETRIES, retry_delay=DEFAULT_RETRY_DELAY, failed_only=False, callbacks=None):
+        self.callbacks = callbacks or ConversionCallbacks()
+        self.folder = folder
+        self.use_subfolders = use_subfolders
+        # files: check and convert only these paths of the folder instead of scanning it (watch mode),
+        # scan_rest: then scan the rest of the folder (scene textures first, see ratSceneTextures)
+        self.files = files
+        self.scan_rest = scan_rest
+        # planned: PlanItems to convert (ConversionPlan.to_convert of a confirmed plan), their stat and
+        # state are the plan's: nothing is scanned, stat-ed or checked again
+        self.planned = planned
+        self.max_workers = max_workers
+        # autotune: vary the running iconvert count between min_workers and max_workers
+        # from the measured throughput and system load (see ratAutotune)
+        self.autotune = autotune
+        self.min_workers = min(min_workers, max_workers)
+        initial = min(max(self.min_workers, (os.cpu_count() or 2) // 2), max_workers) if autotune else max_workers
+        self.limiter = ConcurrencyLimiter(initial)
+        self.tuner = None
+        # schedule: "largest_first" or "fifo"; files under priority_paths go first (see ratScheduler)
+        self.scheduler = ConversionScheduler(schedule, priority_paths)
+        self.lookahead = lookahead
+        self._first_conversion_at = None
+        self._last_conversion_at = None
+        # trace: record per-file spans (see ratTrace), exported to trace_prefix.* when given
+        self.tracer = ConversionTracer() if trace or trace_prefix else None
+        self.trace_prefix = trace_prefix
+        # incremental: only queue files whose .rat is missing or out of date
+        self.incremental = incremental
+        # verify_hash: a source whose timestamp changed is compared by content before being queued
+        self.verify_hash = verify_hash
+        # use_manifest: keep a record of every conversion in the texture root (see ratManifest)
+        self.use_manifest = use_manifest
+        # dedupe: convert byte-identical sources once and link the result to the other locations
+        self.dedupe = dedupe
+        # exclude: glob patterns of files/folders to prune from the scan, e.g. ["_DAILIES"]
+        self.exclude = list(exclude or []) + [LEASE_DIR_NAME, STATUS_DIR_NAME]
+        # crawl_workers: directories listed concurrently during the scan
+        self.crawl_workers = crawl_workers
+        # cache_listings: do not list again folders whose mtime did not change since last run
+        # (their files are still stat-ed, see _iter_files)
+        self.cache_listings = cache_listings
+        # targets: ConversionTarget list, by default a .rat made by iconvert with extra_args
+        # (iconvert: executable to run, or command prefix list, for installs where it is not on the PATH)
+        self.targets = list(targets) if targets else [RatTarget(iconvert, extra_args)]
+        self._targets_by_name = {target.name: target for target in self.targets}
+        self.input_extensions = tuple({ext for target in self.targets for ext in target.extensions})
+        # distributed: share the root with other converters through lease files (see ratDistributed)
+        self.distributed = distributed
+        self.node_id = node_id
+        self.lease_ttl = lease_ttl
+        self.claimer = None
+        # backend "pool": convert in persistent processes running converter ("module:function",
+        # DEFAULT_CONVERTER by default), files the converter hands back are still converted by iconvert
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+        self.backend = backend
+        self.converter = converter or DEFAULT_CONVERTER
+        self.worker_python = worker_python
+        self.pool = None
+        # scratch_dir: convert in this local folder and copy the .rat files back in batches of
+        # writeback_batch, at most bandwidth_limit bytes/s to and from the share (see ratStaging)
+        self.scratch_dir = scratch_dir
+        self.bandwidth_limit = bandwidth_limit
+        self.writeback_batch = writeback_batch
+        self.stager = None
+        # retries: transient failures (network I/O) are retried with a backoff starting at retry_delay,
+        # failed_only: convert only the files that failed in previous runs (see ratFailures)
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.failed_only = failed_only
+        self.retried_count = 0
+        # failures of this run by output path, and outputs converted by it
+        self._failures = {}
+        self._succeeded = set()
+        self._failures_lock = threading.Lock()
+        # jobs cancel() took off the queue, failures of a missing tool (see _record_dropped)
+        self._dropped = []
+        # failure of the job running on the current thread: (kind, error), attempts
+        self._local = threading.local()
+        self.manifest = None
+        self.manifest_errors = 0
+        self.is_cancelled = False
+        self.cancel_requested_at = None
+        self.cancel_latency = None
+        # in-flight processes and the output each one is writing
+        self._active = {}
+        self._active_lock = threading.Lock()
+        self.queued_count = 0
+        self.skipped_count = 0
+        self.converted_count = 0
+        self.linked_count = 0
+        self.failed_count = 0
+        self.elsewhere_count = 0
+        self.tool_missing = False
+        # unexpected exceptions of the scanner and the converter threads
+        self.errors = []
+        self.elapsed = 0.0
+        self.progress = None
+        self.is_scanning = False
+        self._queue = None
+        self._events = None
+        self._digests = {}
+        # (normcased folder, normcased file names) of the folder being scanned, to see outputs without a stat
+        self._listing = None
+        # dedupe registry: (target, digest) -> output path once converted, or list of jobs waiting for it
+        self._contents = {}
+        self._contents_lock = threading.Lock()
+
+    def run(self):
+        # Scan root, convert, and return the summary of the run
+        start = time.time()
+        self.callbacks.status("Scanning for image files...")
+        if self.failed_only:
+            self.files = FailureLog(self.folder).sources()
+            self.scan_rest = False
+            self.callbacks.log(f"Rerunning {len(self.files)} failed files.")
+        if self.use_manifest:
+            try:
+                self.manifest = ConversionManifest(self.folder)
+                self.scheduler.cost_model = CostModel.from_history(self.manifest.durations())
+            except Exception as e:
+                self.callbacks.log(f"Conversion manifest unavailable, using file timestamps: {e}")
+        if self.distributed:
+            self.claimer = LeaseClaimer(self.folder, self.node_id, self.lease_ttl)
+            self.claimer.start()
+        if self.backend == "pool":
+            self._start_pool()
+        try:
+            if self.scratch_dir:
+                self._start_staging()
+            self._run_conversion()
+        finally:
+            if self.pool:
+                self.pool.stop()
+                self.pool = None
+            if self.stager:
+                # converted files are complete, write them back even after a cancel
+                self.stager.close()
+                if self.stager.failed_count:
+                    self.callbacks.log(f"{self.stager.failed_count} files were not written back, "
+                                       f"they stay in {self.stager.folder} for the next run.")
+                self.stager = None
+            self._close_manifest()
+            try:
+                FailureLog(self.folder).update(self._failures, self._succeeded)
+            except OSError as e:
+                self.callbacks.log(f"Could not save the failed files: {e}")
+            self.elapsed = time.time() - start
+            if self.tracer and self.trace_prefix:
+                try:
+                    paths = self.tracer.export_all(self.trace_prefix)
+                    self.callbacks.log(f"Trace written to {', '.join(paths)}")
+                except OSError as e:
+                    self.callbacks.log(f"Could not write the trace: {e}")
+            if self.claimer:
+                self.claimer.stop()
+                if self.progress:
+                    self.claimer.write_status(dict(self.progress.snapshot(), finished=True), force=True)
+                self.claimer = None
+        return self.summary()
+
+    def plan(self):
+        """
+        Dry run of run(): the ConversionPlan of the files it would convert,
+        without converting or writing anything (the manifest is only read).
+        - new: no output yet, stale: output out of date, up_to_date: left
+          alone, skipped: the target's tool is not installed.
+        - Conversion times come from the manifest's history, the wall clock
+          is estimated on max_workers (the upper bound in autotune mode).
+        """
+        if self.failed_only:
+            self.files = FailureLog(self.folder).sources()
+            self.scan_rest = False
+        cost_model = CostModel()
+        if self.use_manifest and os.path.exists(os.path.join(self.folder, MANIFEST_FILE_NAME)):
+            try:
+                self.manifest = ConversionManifest(self.folder)
+                cost_model = CostModel.from_history(self.manifest.durations())
+            except Exception as e:
+                self.callbacks.log(f"Conversion manifest unavailable, using file timestamps: {e}")
+        missing = {target.name for target in self.targets if not shutil.which(target.tool[0])}
+        plan = ConversionPlan(self.folder, self.max_workers, self.targets)
+        try:
+            for entry in self._iter_files():
+                if self.is_cancelled:
+                    break
+                for target in self.targets:
+                    if not target.accepts(entry.path):
+                        continue
+                    job = ConversionJob(entry.path, entry.st_size, entry.st_mtime, target)
+                    item = PlanItem(entry.path, target.output_path(entry.path), target.name, entry.st_size,
+                                    entry.st_mtime, 0.0, None)
+                    if target.name in missing:
+                        plan.add(SKIPPED, item._replace(reason=f"'{target.tool[0]}' not found"))
+                        continue
+                    if self.incremental:
+                        state = self._output_state(job, refresh=False)
+                    else:
+                        state = STALE if self._output_listed(item.output) else NEW
+                    if state == UP_TO_DATE:
+                        plan.sample_output(item)
+                    else:
+                        item = item._replace(seconds=cost_model.estimate(entry.path, entry.st_size))
+                    plan.add(state, item)
+        except OSError as e:
+            self.callbacks.status(f"Scan error: {e}")
+        finally:
+            self._close_manifest()
+        return plan
+
+    def _start_pool(self):
+        # the pool only replaces iconvert when it can do the same job, otherwise files are spawned
+        if not any(target.poolable and not target.args for target in self.targets):
+            self.callbacks.log("The pool converter does not take iconvert arguments, spawning iconvert per file.")
+            return
+        python = self.worker_python or default_python()
+        if self.converter == DEFAULT_CONVERTER and not os.path.basename(python).lower().startswith("hython"):
+            self.callbacks.log("The default pool converter runs in hython (set $HFS or the worker Python), "
+                               "spawning iconvert per file.")
+            return
+        pool = ConverterProcessPool(self.max_workers, self.converter, python)
+        try:
+            pool.start()
+        except Exception as e:
+            pool.stop()
+            self.callbacks.log(f"Converter pool unavailable, spawning iconvert per file: {e}")
+            return
+        self.pool = pool
+
+    def _start_staging(self):
+        self.stager = ScratchStager(self.folder, self.scratch_dir, self.bandwidth_limit, self.writeback_batch,
+                                    on_written=self._record_written, log=self.callbacks.log)
+        resumed = self.stager.resume()
+        if resumed:
+            self.callbacks.log(f"Wrote back {resumed} files converted by an interrupted run.")
+
+    def summary(self):
+        return {
+            "folder": self.folder,
+            "targets": [target.name for target in self.targets],
+            "queued": self.queued_count,
+            "skipped": self.skipped_count,
+            "converted": self.converted_count,
+            "linked": self.linked_count,
+            "failed": self.failed_count,
+            "elsewhere": self.elsewhere_count,
+            "cancelled": self.is_cancelled,
+            "cancel_latency": self.cancel_latency,
+            "tool_missing": self.tool_missing,
+            "manifest_errors": self.manifest_errors,
+            "errors": list(self.errors),
+            "retried": self.retried_count,
+            # failures of this run by kind: transient, corrupt, missing_tool, unknown
+            "failures": self._failure_counts(),
+            "elapsed": self.elapsed,
+            "schedule": self.schedule_report(),
+            "trace": self.tracer.summary() if self.tracer else None,
+            # (seconds into the run, concurrency, files/s) for every autotune decision
+            "concurrency_log": [
+                (round(t - self.progress.start_time, 2), limit, round(throughput, 2))
+                for t, limit, throughput, _ in (self.tuner.history if self.tuner and self.progress else [])
+            ],
+        }
+
+    def _failure_counts(self):
+        counts = {}
+        with self._failures_lock:
+            for entry in self._failures.values():
+                counts[entry["kind"]] = counts.get(entry["kind"], 0) + 1
+        return counts
+
+    def schedule_report(self):
+        # predicted vs. actual conversion time, actual measured from the first iconvert start
+        end = self._last_conversion_at or time.time()
+        actual = end - self._first_conversion_at if self._first_conversion_at is not None else 0.0
+        return self.scheduler.report(self.limiter.limit, actual)
+
+    def cancel(self):
+        # Stop the job now: drop queued files and terminate running iconvert processes.
+        # Safe to call from any thread while run() is going.
+        if self.is_cancelled:
+            return
+        self.cancel_requested_at = time.time()
+        self.is_cancelled = True
+        self._drain_queue()
+        if self.pool:
+            self.pool.terminate()
+        with self._active_lock:
+            processes = list(self._active)
+        for process in processes:
+            try:
+                process.terminate()
+            except OSError:
+                pass
+        if processes:
+            killer = threading.Timer(CANCEL_GRACE_PERIOD, self._kill_active)
+            killer.daemon = True
+            killer.start()
+
+    def _drain_queue(self):
+        if self._queue is None:
+            return
+        try:
+            while True:
+                job = self._queue.get_nowait()[-1]
+                if job is not None:
+                    self._dropped.append(job)
+        except queue.Empty:
+            pass
+
+    def _record_dropped(self):
+        # queued jobs of a target whose tool is missing failed all the same: log them so that
+        # --failed-only converts them once the tool is installed, the others were only cancelled
+        self._drain_queue()
+        dropped, self._dropped = self._dropped, []
+        with self._failures_lock:
+            for job in dropped:
+                if job.target.missing:
+                    output_path = job.target.output_path(job.path)
+                    self._failures[output_path] = failure_entry(job.path, job.target.name, MISSING_TOOL,
+                                                                f"'{job.target.tool[0]}' not found", 0)
+
+    def _kill_active(self):
+        with self._active_lock:
+            processes = list(self._active)
+        for process in processes:
+            try:
+                process.kill()
+            except OSError:
+                pass
+
+    def _run_conversion(self):
+        # The scanner feeds a bounded queue that the converters drain as soon as
+        # the first file is found. Pool threads tally into the progress aggregator
+        # and this thread forwards its snapshot at a fixed rate.
+        if self.scheduler.mode == "largest_first":
+            queue_size = self.lookahead
+        else:
+            queue_size = max(1, self.max_workers) * QUEUE_SIZE_PER_WORKER
+        self._queue = queue.PriorityQueue(maxsize=queue_size)
+        self._events = queue.Queue()
+        self.progress = ProgressAggregator()
+        if self.autotune:
+            self.tuner = ConcurrencyTuner(self.limiter, self.min_workers, self.max_workers, log=self.callbacks.log)
+        self.is_scanning = True
+        scanner = threading.Thread(target=self._scan, name="RatScanner", daemon=True)
+        scanner.start()
+
+        running = self.max_workers
+        next_tick = time.time()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            consumers = [executor.submit(self._consume) for _ in range(self.max_workers)]
+            while running:
+                try:
+                    event, value = self._events.get(timeout=max(0.0, next_tick - time.time()))
+                except queue.Empty:
+                    event = value = None
+                if event == "scanned":
+                    self.is_scanning = False
+                    self._emit_progress()
+                    self.callbacks.scan_complete(value)
+                elif event == "status":
+                    self.callbacks.status(value)
+                elif event == "exit":
+                    running -= 1
+                if time.time() >= next_tick:
+                    self._emit_progress()
+                    next_tick = time.time() + PROGRESS_INTERVAL
+        dead = [future.exception() for future in consumers if future.exception() is not None]
+        for error in dead:
+            self._error("Converter thread", error)
+        if dead and not self.is_cancelled:
+            # the scanner may be waiting on a queue nobody drains anymore
+            self.cancel()
+        scanner.join()
+        self._record_dropped()
+
+        stats = self._emit_progress()
+        if self._first_conversion_at is not None:
+            schedule = self.schedule_report()
+            self.callbacks.log(f"Predicted {format_duration(schedule['predicted_duration'])} of conversion, "
+                               f"took {format_duration(schedule['actual_duration'])}.")
+        if self.errors:
+            self.callbacks.status(f"Stopped on an error after {self.converted_count} files: {self.errors[0]}")
+        elif self.is_cancelled:
+            message = f"Cancelled. Processed {stats['done']} of {self.queued_count} files"
+            if self.cancel_requested_at is not None:
+                self.cancel_latency = time.time() - self.cancel_requested_at
+                message += f", stopped in {self.cancel_latency:.2f}s"
+            self.callbacks.status(message + ".")
+        elif not self.queued_count:
+            self.callbacks.status("No new image files found to convert.")
+        else:
+            message = f"Successfully converted {self.converted_count} files ({self.skipped_count} up to date"
+            if self.linked_count:
+                message += f", {self.linked_count} duplicates linked"
+            if self.failed_count:
+                message += f", {self.failed_count} failed"
+            self.callbacks.status(message + ").")
+
+    def _emit_progress(self):
+        # one batched update for everything that happened since the last tick
+        self.progress.set_scan(self.queued_count, self.skipped_count, self.is_scanning)
+        stats = self.progress.snapshot()
+        if self.tuner:
+            self.tuner.update(stats["done"])
+        stats["concurrency"] = self.limiter.limit
+        self.converted_count = stats["converted"]
+        self.linked_count = stats["linked"]
+        self.failed_count = stats["failed"]
+        self.elsewhere_count = stats["elsewhere"]
+        if self.claimer:
+            self.claimer.write_status(stats)
+        if self.is_scanning:
+            self.callbacks.scan_progress(self.queued_count)
+        self.callbacks.stats(stats)
+        return stats
+
+    def _scan(self):
+        # producer: walk the tree and queue a job per stale output as files are found
+        try:
+            for job, planned in self._iter_jobs():
+                if self.is_cancelled:
+                    return
+                output_path = job.target.output_path(job.path)
+                start = time.time()
+                stale = planned or not self.incremental or self._is_stale(job)
+                if self.tracer:
+                    self.tracer.span(output_path, "scan", start, time.time(), bytes_in=job.st_size,
+                                     status="ok" if stale else "skipped")
+                if not stale:
+                    self.skipped_count += 1
+                    continue
+                if self.tracer:
+                    self.tracer.enqueued(output_path)
+                if not self._put(self.scheduler.item(job)):
+                    return
+                self.queued_count += 1
+        except Exception as e:
+            # an incomplete scan fails the run, even on a file system error
+            self._error("Scan", e)
+            self._events.put(("status", f"Scan error: {e}"))
+        finally:
+            self._events.put(("scanned", self.queued_count))
+            for _ in range(self.max_workers):
+                self._put(self.scheduler.end_marker())
+
+    def _put(self, item):
+        # blocking put that gives up when the job is cancelled
+        while not self.is_cancelled:
+            try:
+                self._queue.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _consume(self):
+        # consumer: convert queued jobs until the scanner sends the end marker
+        try:
+            while not self.is_cancelled:
+                try:
+                    job = self._queue.get(timeout=0.2)[-1]
+                except queue.Empty:
+                    continue
+                if job is None:
+                    break
+                if self.tracer:
+                    self.tracer.dequeued(job.target.output_path(job.path))
+                try:
+                    self._process_file(job)
+                except Exception as e:
+                    # a bug or an unexpected error fails this file, the thread goes on with the next
+                    self.callbacks.log(f"Error converting {os.path.basename(job.path)}: {e!r}")
+                    self._fail(UNKNOWN, repr(e))
+                    self._report(job, False)
+        finally:
+            self._events.put(("exit", None))
+
+    def _error(self, where, error):
+        message = f"{where} error: {error!r}"
+        self.callbacks.log(message)
+        self.errors.append(message)
+
+    def _is_input(self, path):
+        lower = path.lower()
+        return lower.endswith(self.input_extensions) and not lower.endswith(output_suffixes())
+
+    def _iter_jobs(self):
+        # (job, planned): the jobs of the planned items, known to be stale, or a job per target of each scanned file
+        if self.planned is not None:
+            for item in self.planned:
+                target = self._targets_by_name.get(item.target)
+                if target is not None:
+                    yield ConversionJob(item.source, item.size, item.mtime, target), True
+            return
+        for entry in self._iter_files():
+            for target in self.targets:
+                if target.accepts(entry.path):
+                    yield ConversionJob(entry.path, entry.st_size, entry.st_mtime, target), False
+
+    def _iter_files(self):
+        # find files based on extension (with or without subfolder process)
+        seen = set()
+        if self.files is not None:
+            for path in self.files:
+                if not self._is_input(path):
+                    continue
+                try:
+                    st = os.stat(path)
+                except OSError as e:
+                    self.callbacks.log(f"Could not scan {path}: {e}")
+                    continue
+                seen.add(os.path.normcase(os.path.abspath(path)))
+                yield CrawlEntry(path, st.st_size, st.st_mtime)
+            if not self.scan_rest:
+                return
+        cache_path = os.path.join(self.folder, DIR_CACHE_FILE_NAME) if self.cache_listings else None
+        # cached listings save the folder listings, not the file stats: a texture overwritten
+        # in place keeps its folder's mtime, its own size and mtime are read again
+        crawler = DirCrawler(self.folder, recursive=self.use_subfolders, exclude=self.exclude,
+                             max_workers=self.crawl_workers, cache_path=cache_path, restat=True)
+        try:
+            for folder, entries, names in crawler.crawl_dirs():
+                self._listing = (os.path.normcase(folder), names)
+                for entry in entries:
+                    if self._is_input(entry.path):
+                        if seen and os.path.normcase(entry.path) in seen:
+                            continue
+                        yield entry
+        finally:
+            self._listing = None
+        for path, error in crawler.errors:
+            self.callbacks.log(f"Could not scan {path}: {error}")
+
+    def _is_stale(self, job):
+        return self._output_state(job) != UP_TO_DATE
+
+    def _output_state(self, job, refresh=True):
+        # NEW, STALE or UP_TO_DATE; the job's source size/mtime are the scan's, no stat needed.
+        # refresh: store what was learned from the disk in the manifest (not in a dry run)
+        image_path, target = job.path, job.target
+        output_path = target.output_path(image_path)
+        record = self._manifest_get(output_path)
+        if record is not None and record.args == target.signature:
+            # the manifest is trusted for the output's freshness, its presence comes from the folder listing
+            if not self._output_listed(output_path):
+                return NEW
+            if record.size == job.st_size and record.mtime == job.st_mtime:
+                return UP_TO_DATE
+            if self.verify_hash and record.digest and record.size == job.st_size:
+                digest = self._digest(image_path, output_path, job)
+                if digest == record.digest:
+                    # re-saved without changes, refresh the stored timestamp
+                    if refresh:
+                        self._manifest_record(image_path, output_path, job.st_size, job.st_mtime,
+                                              digest, record.args, record.duration)
+                    return UP_TO_DATE
+            return STALE
+        if record is not None:
+            # converted with another tool or other arguments
+            return STALE
+
+        # no history yet, fall back to the files on disk
+        try:
+            output_stat = os.stat(output_path)
+        except OSError:
+            return NEW
+        # an empty output is a leftover from an interrupted conversion
+        if output_stat.st_size == 0 or job.st_mtime > output_stat.st_mtime:
+            return STALE
+        if self.manifest and refresh:
+            digest = self._digest(image_path, output_path, job) if self.verify_hash else None
+            self._manifest_record(image_path, output_path, job.st_size, job.st_mtime, digest, target.signature)
+        return UP_TO_DATE
+
+    def _output_listed(self, output_path):
+        # whether an output exists, from the listing of the folder being scanned (no stat) when it is there
+        listing = self._listing
+        if listing is not None and os.path.normcase(os.path.dirname(output_path)) == listing[0]:
+            return os.path.normcase(os.path.basename(output_path)) in listing[1]
+        return os.path.exists(output_path)
+
+    def _manifest_get(self, output_path):
+        # manifest record of an output, None (the file timestamps decide) when the database cannot be read
+        if not self.manifest:
+            return None
+        try:
+            return self.manifest.get(output_path)
+        except sqlite3.Error as e:
+            self._manifest_failed(e)
+            return None
+
+    def _manifest_record(self, *args):
+        try:
+            self.manifest.record(*args)
+        except sqlite3.Error as e:
+            # the row stays buffered for the next commit
+            self._manifest_failed(e)
+
+    def _manifest_failed(self, error):
+        # logged once per run, the count goes in the summary
+        with self._failures_lock:
+            self.manifest_errors += 1
+            first = self.manifest_errors == 1
+        if first:
+            self.callbacks.log(f"Conversion manifest error, using file timestamps: {error}")
+
+    def _close_manifest(self):
+        if not self.manifest:
+            return
+        try:
+            self.manifest.close()
+        except sqlite3.Error as e:
+            self._manifest_failed(e)
+        self.manifest = None
+
+    def _digest(self, image_path, output_path, src_stat=None):
+        # digest of the source, reused from the manifest when the file is unchanged
+        if self.manifest:
+            record = self._manifest_get(output_path)
+            src_stat = src_stat or os.stat(image_path)
+            if (record is not None and record.digest and record.size == src_stat.st_size
+                    and record.mtime == src_stat.st_mtime):
+                return record.digest
+        return file_digest(image_path)
+
+    def _process_file(self, job):
+        if not self.claimer:
+            self._convert_entry(job)
+            return
+        # distributed: only convert what this node managed to claim, outputs are claimed one by one
+        claim_path = job.target.output_path(job.path)
+        if not self.claimer.claim(claim_path):
+            self.progress.file_elsewhere()
+            return
+        try:
+            if self._output_is_current(job):
+                # finished by another node since the scan
+                self.progress.file_elsewhere()
+            else:
+                self._convert_entry(job)
+                if self.stager:
+                    # other nodes check the output on the share once the lease is gone
+                    self.stager.flush()
+        finally:
+            self.claimer.release(claim_path)
+
+    def _output_is_current(self, job):
+        try:
+            src_stat = os.stat(job.path)
+            output_stat = os.stat(job.target.output_path(job.path))
+        except OSError:
+            return False
+        return output_stat.st_size > 0 and output_stat.st_mtime >= src_stat.st_mtime
+
+    def _convert_entry(self, job):
+        # convert one queued job, or link it to an identical content converted elsewhere
+        image_path, target = job.path, job.target
+        output_path = target.output_path(image_path)
+        if not self.dedupe:
+            self._report(job, self._convert_single_file(job))
+            return
+        try:
+            digest = self._digest(image_path, output_path)
+        except OSError:
+            self._report(job, self._convert_single_file(job))
+            return
+        self._digests[image_path] = digest
+
+        # contents are shared per target: a .tx is never linked to a .rat
+        key = (target.name, digest)
+        with self._contents_lock:
+            content = self._contents.get(key)
+            if content is None:
+                # first time this content is seen in the run, this thread owns it
+                self._contents[key] = []
+            elif isinstance(content, list):
+                # being converted by another thread, it will link this one when done
+                content.append(job)
+                return
+        if content is not None:
+            self._report(job, self._link_output(content, job), linked=True)
+            return
+
+        existing = self._find_existing_output(digest, job)
+        if existing:
+            ok = self._link_output(existing, job)
+        else:
+            ok = self._convert_single_file(job)
+            existing = output_path
+        if ok and self.stager:
+            # duplicates are linked to the output on the share
+            self.stager.flush()
+        with self._contents_lock:
+            waiting = self._contents.pop(key)
+            if ok:
+                self._contents[key] = existing
+        self._report(job, ok, linked=existing != output_path)
+        for duplicate in waiting:
+            if ok and not self.is_cancelled:
+                self._report(duplicate, self._link_output(existing, duplicate), linked=True)
+            else:
+                self._report(duplicate, False)
+
+    def _find_existing_output(self, digest, job):
+        # an output from a previous run converted from the same content by the same tool
+        if not self.manifest:
+            return None
+        output_path = job.target.output_path(job.path)
+        try:
+            records = self.manifest.find_by_digest(digest, job.target.signature)
+        except sqlite3.Error as e:
+            self._manifest_failed(e)
+            return None
+        for record in records:
+            if record.output_path != output_path and os.path.isfile(record.output_path):
+                return record.output_path
+        return None
+
+    def _report(self, job, ok, linked=False):
+        kind, error = getattr(self._local, "failure", None) or (UNKNOWN, "")
+        self._local.failure = None
+        output_path = job.target.output_path(job.path)
+        if not ok and self.is_cancelled:
+            # dropped by the cancel, not a failure, unless the cancel comes from the missing tool
+            if job.target.missing:
+                self._record_failure(job, output_path, MISSING_TOOL, error or f"'{job.target.tool[0]}' not found")
+            return
+        with self._failures_lock:
+            if ok:
+                self._succeeded.add(output_path)
+                self._failures.pop(output_path, None)
+        if not ok:
+            self._record_failure(job, output_path, kind, error)
+        self.progress.file_done(ok, job.st_size, linked)
+
+    def _record_failure(self, job, output_path, kind, error):
+        with self._failures_lock:
+            self._failures[output_path] = failure_entry(job.path, job.target.name, kind, error,
+                                                        getattr(self._local, "attempts", 1))
+
+    def _fail(self, kind, error):
+        # remember why the current thread's job failed, for the retries and the failure log
+        self._local.failure = (kind, error)
+
+    def _link_output(self, existing_output, job):
+        # hardlink the already converted output, copy when links are not supported (SMB, other volume)
+        output_path = job.target.output_path(job.path)
+        start = time.time()
+        try:
+            if os.path.lexists(output_path):
+                os.remove(output_path)
+            try:
+                os.link(existing_output, output_path)
+            except OSError:
+                shutil.copy2(existing_output, output_path)
+        except OSError as e:
+            self.callbacks.log(f"Error linking {os.path.basename(output_path)}: {e}")
+            self._fail(classify_failure(str(e)), str(e))
+            if self.tracer:
+                self.tracer.span(output_path, "link", start, time.time(), status="error", error=str(e))
+            return False
+        if self.tracer:
+            self.tracer.span(output_path, "link", start, time.time())
+        self._record_conversion(job.path, job.target, 0.0)
+        return True
+
+    def _record_conversion(self, image_path, target, duration):
+        if not self.manifest:
+            return
+        try:
+            src_stat = os.stat(image_path)
+            digest = self._digests.get(image_path)
+            if digest is None and (self.verify_hash or self.dedupe):
+                digest = file_digest(image_path)
+        except OSError:
+            return
+        self._manifest_record(image_path, target.output_path(image_path), src_stat.st_size, src_stat.st_mtime,
+                              digest, target.signature, duration)
+
+    def _record_written(self, image_path, output_path, duration, target_name):
+        # a staged output reached the share, possibly converted by an earlier run
+        target = self._targets_by_name.get(target_name)
+        if target is not None:
+            self._record_conversion(image_path, target, duration)
+
+    def _convert_single_file(self, job):
+        # convert, retrying transient failures, returns True when the output was written
+        attempt = 0
+        self._local.failure = None
+        self._local.attempts = 1
+        while not self._attempt_conversion(job):
+            failure = self._local.failure
+            if self.is_cancelled or failure is None or failure[0] != TRANSIENT or attempt >= self.retries:
+                return False
+            delay = retry_delay(attempt, self.retry_delay)
+            attempt += 1
+            self._local.attempts = attempt + 1
+            with self._failures_lock:
+                self.retried_count += 1
+            self.callbacks.log(f"Retrying {os.path.basename(job.path)} ({attempt}/{self.retries}) in {delay:.1f}s")
+            if not self._sleep(delay):
+                return False
+        return True
+
+    def _sleep(self, seconds):
+        # False when the job is cancelled meanwhile
+        end = time.time() + seconds
+        while time.time() < end:
+            if self.is_cancelled:
+                return False
+            time.sleep(min(0.2, max(0.0, end - time.time())))
+        return not self.is_cancelled
+
+    def _attempt_conversion(self, job):
+        # one conversion, returns True when the output was written
+        target = job.target
+        if target.missing:
+            self._fail(MISSING_TOOL, f"'{target.tool[0]}' not found")
+            return False
+        if self.is_cancelled:
+            return False
+        source, output_path = job.path, target.output_path(job.path)
+        if self.stager:
+            # read from and write to the local scratch copy
+            try:
+                source, output_path = self.stager.stage_in(job.path, output_path)
+            except OSError as e:
+                self.callbacks.log(f"Error staging {os.path.basename(job.path)}: {e}")
+                self._fail(TRANSIENT, f"staging: {e}")
+                return False
+        try:
+            # never write through a hardlink shared with a deduplicated copy
+            if os.stat(output_path).st_nlink > 1:
+                os.remove(output_path)
+        except OSError:
+            pass
+        try:
+            # the target's own limit first, so a saturated target does not hold engine slots
+            if not self._acquire(target.limiter):
+                return False
+            try:
+                # wait for a concurrency slot, the limit moves in autotune mode
+                if not self._acquire(self.limiter):
+                    return False
+                try:
+                    if self.pool and target.poolable and not target.args:
+                        ok = self._run_pooled(job, source, output_path)
+                        if ok is not None:
+                            return ok
+                    return self._run_process(job, output_path, target.command(source, output_path))
+                finally:
+                    self.limiter.release()
+            finally:
+                if target.limiter:
+                    target.limiter.release()
+        finally:
+            if source != job.path:
+                self.stager.discard(source)
+
+    def _acquire(self, limiter):
+        # True once a slot is held (or there is no limiter), False when cancelled while waiting
+        if limiter is None:
+            return True
+        while not limiter.acquire(timeout=0.2):
+            if self.is_cancelled:
+                return False
+        return True
+
+    def _run_pooled(self, job, source, output_path):
+        # convert in a persistent worker process, None when the converter leaves the file to the tool
+        start = time.time()
+        if self._first_conversion_at is None:
+            self._first_conversion_at = start
+        self.progress.conversion_started()
+        try:
+            result = self.pool.convert(source, output_path)
+        finally:
+            self._last_conversion_at = time.time()
+            self.progress.conversion_stopped()
+        if result["status"] == STATUS_FALLBACK:
+            return None
+        error = None if result["status"] == STATUS_OK else result["error"]
+        return self._finish_conversion(job, output_path, start, result["cpu"], error)
+
+    def _run_process(self, job, output_path, cmd):
+        start = time.time()
+        trace_path = job.target.output_path(job.path)
+        try:
+            creation_flags = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+            process = subprocess.Popen(cmd, creationflags=creation_flags, stdout=subprocess.DEVNULL,
+                                       stderr=subprocess.PIPE, text=True)
+        except FileNotFoundError:
+            # the other targets go on, the run stops once no tool is left
+            job.target.missing = True
+            self.tool_missing = True
+            self._fail(MISSING_TOOL, f"'{cmd[0]}' not found")
+            self.callbacks.status(f"'{cmd[0]}' not found")
+            if all(target.missing for target in self.targets):
+                self.cancel()
+            return False
+        if self._first_conversion_at is None:
+            self._first_conversion_at = start
+        with self._active_lock:
+            self._active[process] = output_path
+        if self.tracer:
+            self.tracer.span(trace_path, "spawn", start, time.time())
+        if self.is_cancelled:
+            # cancel() ran while the process was starting
+            process.terminate()
+        self.progress.conversion_started()
+        cpu = None
+        try:
+            if self.tracer:
+                stderr, cpu = self._wait_with_usage(process)
+            else:
+                _, stderr = process.communicate()
+        finally:
+            self._last_conversion_at = time.time()
+            self.progress.conversion_stopped()
+            with self._active_lock:
+                del self._active[process]
+        error = None
+        if process.returncode != 0:
+            error = (stderr or "").strip() or f"exit code {process.returncode}"
+        return self._finish_conversion(job, output_path, start, cpu, error)
+
+    def _finish_conversion(self, job, output_path, start, cpu=None, error=None):
+        # outcome of a spawned or pooled conversion, error is None when it succeeded.
+        # output_path is where it was written, the scratch copy when staging
+        end = time.time()
+        image_path, size = job.path, job.st_size
+        final_path = job.target.output_path(image_path)
+        if error is not None and self.is_cancelled:
+            # terminated mid-write, do not leave a truncated output behind
+            self._remove_partial(output_path)
+            if self.tracer:
+                self.tracer.span(final_path, "convert", start, end, bytes_in=size, cpu=cpu, status="cancelled")
+            return False
+        if error is not None:
+            self.callbacks.log(f"Error converting {os.path.basename(image_path)} to {job.target.name}: {error}")
+            self._fail(classify_failure(error), error)
+            if self.tracer:
+                self.tracer.span(final_path, "convert", start, end, bytes_in=size, cpu=cpu, status="error",
+                                 error=error[-500:])
+            return False
+        duration = end - start
+        if self.tracer:
+            try:
+                bytes_out = os.path.getsize(output_path)
+            except OSError:
+                bytes_out = None
+            self.tracer.span(final_path, "convert", start, end, bytes_in=size, bytes_out=bytes_out, cpu=cpu)
+        self.scheduler.observe(image_path, size, duration)
+        if self.stager:
+            # recorded in the manifest once written back
+            self.stager.commit(image_path, output_path, final_path, duration, job.target.name)
+        else:
+            self._record_conversion(image_path, job.target, duration)
+        return True
+
+    def _wait_with_usage(self, process):
+        # communicate() plus the child's CPU seconds, where os.wait4 exists (not Windows)
+        if not hasattr(os, "wait4"):
+            _, stderr = process.communicate()
+            return stderr, None
+        stderr = process.stderr.read()
+        process.stderr.close()
+        try:
+            _, status, usage = os.wait4(process.pid, 0)
+        except ChildProcessError:
+            # already reaped by a terminate() from cancel()
+            process.wait()
+            return stderr, None
+        process.returncode = os.waitstatus_to_exitcode(status)
+        return stderr, usage.ru_utime + usage.ru_stime
+
+    def _remove_partial(self, rat_path):
+        try:
+            os.remove(rat_path)
+        except OSError:
+            pass
+
+
+# COMMAND LINE
+class CommandLineCallbacks(ConversionCallbacks):
+    # progress on stderr (JSON lines with --json), stdout is kept for the summary
+    def __init__(self, json_output=False, interval=1.0):
+        self.json_output = json_output
+        self.interval = interval
+        self._last_stats = 0.0
+
+    def _write(self, kind, payload):
+        if self.json_output:
+            sys.stderr.write(json.dumps({"event": kind, "data": payload}) + "\n")
+        else:
+            sys.stderr.write(f"{payload}\n")
+        sys.stderr.flush()
+
+    def status(self, message):
+        self._write("status", message)
+
+    def scan_complete(self, queued):
+        self._write("scan_complete", queued if self.json_output else f"Scan complete: {queued} files queued.")
+
+    def stats(self, stats):
+        now = time.time()
+        if now - self._last_stats < self.interval:
+            return
+        self._last_stats = now
+        self._write("stats", stats if self.json_output else format_stats(stats))
+
+    def log(self, message):
+        self._write("log", message)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m ratEngine",
+        description="Convert the images of a texture folder to .rat with iconvert.",
+    )
+    parser.add_argument("folder", help="texture folder to convert")
+    parser.add_argument("--no-subfolders", action="store_true", help="do not search in subfolders")
+    parser.add_argument("-j", "--workers", default=str((os.cpu_count() or 2) // 2 or 1),
+                        help="concurrent iconvert processes, or 'auto' to tune it while running "
+                             "(default: half the cores)")
+    parser.add_argument("--min-workers", type=int, default=1, help="lower bound in auto mode")
+    parser.add_argument("--max-workers", type=int, default=(os.cpu_count() or 1) * 2,
+                        help="upper bound in auto mode (default: twice the cores)")
+    parser.add_argument("--full", action="store_true", help="convert every file, even up-to-date ones")
+    parser.add_argument("--verify-hash", action="store_true", help="compare changed sources by content")
+    parser.add_argument("--dedupe", action="store_true", help="convert identical sources only once")
+    parser.add_argument("--no-manifest", action="store_true", help="do not read or write the manifest")
+    parser.add_argument("--exclude", action="append", default=[], metavar="PATTERN",
+                        help="glob of files/folders to skip, can be repeated")
+    parser.add_argument("--cache-listings", action="store_true", help="reuse unchanged folder listings (files are still stat-ed)")
+    parser.add_argument("--iconvert", default="iconvert",
+                        help="iconvert executable, or a quoted command such as \"python stubIconvert.py\"")
+    parser.add_argument("--target", action="append", default=[], metavar="NAME",
+                        help=f"output to make, can be repeated: {', '.join(sorted(TARGETS))} (default: rat)")
+    parser.add_argument("--target-limit", action="append", default=[], metavar="NAME=N",
+                        help="at most N conversions of this target at once, e.g. tx=2")
+    parser.add_argument("--tool", action="append", default=[], metavar="NAME=COMMAND",
+                        help="tool of a target, e.g. tx=/opt/oiio/bin/maketx (rat uses --iconvert)")
+    parser.add_argument("--schedule", choices=("largest_first", "fifo"), default="largest_first",
+                        help="conversion order (default: largest estimated cost first)")
+    parser.add_argument("--priority", action="append", default=[], metavar="PATH",
+                        help="convert files under this path before the others, can be repeated")
+    parser.add_argument("--plan", action="store_true",
+                        help="dry run: list the new, stale, up-to-date and skipped files with the estimated "
+                             "output size and duration, convert nothing")
+    parser.add_argument("--failed-only", action="store_true",
+                        help="convert only the files that failed in previous runs")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES,
+                        help="retries of a transient (network) failure")
+    parser.add_argument("--retry-delay", type=float, default=DEFAULT_RETRY_DELAY,
+                        help="first retry delay in seconds, doubled at each retry")
+    parser.add_argument("--distributed", action="store_true",
+                        help="share the folder with other converters through lease files")
+    parser.add_argument("--node-id", help="name of this converter in distributed mode (default: host-pid)")
+    parser.add_argument("--lease-ttl", type=float, default=DEFAULT_LEASE_TTL,
+                        help="seconds before the lease of a dead converter is taken over")
+    parser.add_argument("--backend", choices=BACKENDS, default="spawn",
+                        help="'pool' converts in persistent processes running --converter (default: spawn)")
+    parser.add_argument("--converter", metavar="MODULE:FUNCTION", default=DEFAULT_CONVERTER,
+                        help=f"in-process converter of the pool backend (default: {DEFAULT_CONVERTER}, a COP "
+                             "network that needs hython workers, iconvert is spawned without it; "
+                             "stubIconvert:convert_from_env for tests)")
+    parser.add_argument("--worker-python", help="interpreter of the pool processes (default: this one, or hython)")
+    parser.add_argument("--scratch", nargs="?", const=default_scratch_dir(), metavar="DIR",
+                        help="convert in a local scratch folder and write back in batches "
+                             f"(default folder: {default_scratch_dir()})")
+    parser.add_argument("--bandwidth", type=float, metavar="MB_PER_SEC",
+                        help="cap the copies to and from the share in scratch mode")
+    parser.add_argument("--writeback-batch", type=int, default=DEFAULT_WRITEBACK_BATCH,
+                        help="converted files copied back together in scratch mode")
+    parser.add_argument("--trace", metavar="PREFIX",
+                        help="record per-file spans and write PREFIX.csv, PREFIX.jsonl and PREFIX.trace.json")
+    parser.add_argument("--json", action="store_true", help="print the summary (and progress) as JSON")
+    return parser
+
+
+def parse_assignments(values):
+    # ["tx=2", "proxy=1"] -> {"tx": "2", "proxy": "1"}
+    result = {}
+    for value in values:
+        name, sep, setting = value.partition("=")
+        if not sep:
+            raise ValueError(f"expected NAME=VALUE, got '{value}'")
+        result[name.strip()] = setting
+    return result
+
+
+def build_targets(args):
+    tools = parse_assignments(args.tool)
+    tools.setdefault("rat", args.iconvert)
+    limits = {name: int(limit) for name, limit in parse_assignments(args.target_limit).items()}
+    targets = []
+    for name in args.target or ["rat"]:
+        tool = tools.get(name)
+        targets.append(create_target(name, tool=shlex.split(tool, posix=os.name != "nt") if tool else None,
+                                     max_concurrency=limits.get(name)))
+    return targets
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not os.path.isdir(args.folder):
+        sys.stderr.write(f"Not a directory: {args.folder}\n")
+        return EXIT_USAGE
+    autotune = args.workers == "auto"
+    try:
+        max_workers = args.max_workers if autotune else int(args.workers)
+    except ValueError:
+        sys.stderr.write("--workers must be a number or 'auto'\n")
+        return EXIT_USAGE
+    if max_workers < 1 or args.min_workers < 1:
+        sys.stderr.write("worker counts must be at least 1\n")
+        return EXIT_USAGE
+    try:
+        targets = build_targets(args)
+    except ValueError as e:
+        sys.stderr.write(f"{e}\n")
+        return EXIT_USAGE
+
+    engine = ConversionEngine(
+        folder=args.folder,
+        use_subfolders=not args.no_subfolders,
+        max_workers=max_workers,
+        autotune=autotune,
+        schedule=args.schedule,
+        priority_paths=args.priority,
+        min_workers=args.min_workers,
+        incremental=not args.full,
+        verify_hash=args.verify_hash,
+        use_manifest=not args.no_manifest,
+        dedupe=args.dedupe,
+        exclude=args.exclude,
+        cache_listings=args.cache_listings,
+        targets=targets,
+        distributed=args.distributed,
+        node_id=args.node_id,
+        lease_ttl=args.lease_ttl,
+        trace_prefix=args.trace,
+        backend=args.backend,
+        converter=args.converter,
+        worker_python=args.worker_python,
+        scratch_dir=args.scratch,
+        bandwidth_limit=args.bandwidth * 1024 * 1024 if args.bandwidth else None,
+        writeback_batch=args.writeback_batch,
+        retries=args.retries,
+        retry_delay=args.retry_delay,
+        failed_only=args.failed_only,
+        callbacks=CommandLineCallbacks(json_output=args.json),
+    )
+    if args.plan:
+        summary = engine.plan().summary()
+        print(json.dumps(summary, indent=4) if args.json else format_plan(summary))
+        return EXIT_OK
+    # The engine runs in a thread so Ctrl+C and the farm's SIGTERM can cancel it cleanly
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, lambda *_: engine.cancel())
+    result = {}
+    failure = []
+
+    def run():
+        try:
+            result.update(engine.run())
+        except Exception as e:
+            failure.append(e)
+
+    runner = threading.Thread(target=run, name="RatEngine")
+    runner.start()
+    while runner.is_alive():
+        try:
+            runner.join(0.2)
+        except KeyboardInterrupt:
+            engine.cancel()
+
+    if failure:
+        sys.stderr.write(f"Conversion stopped on an error: {failure[0]}\n")
+        return EXIT_ERROR
+    if args.json:
+        print(json.dumps(result, indent=4))
+    else:
+        print(f"Converted {result['converted']} files, {result['skipped']} up to date, "
+              f"{result['elsewhere']} handled by other nodes, "
+              f"{result['failed']} failed in {format_duration(result['elapsed'])}.")
+
+    if result["tool_missing"]:
+        return EXIT_TOOL_MISSING
+    if result["errors"]:
+        return EXIT_FAILURES
+    if result["cancelled"]:
+        return EXIT_CANCELLED
+    if result["failed"]:
+        return EXIT_FAILURES
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+import json
+import socket
+import os
+import random
+import re
+import time
+
+from ratDistributed import write_json_atomic
+
+FAILURES_FILE_NAME = ".ratconverter_failures.json"
+# Held by the run merging its failures into the file: the nodes of a farm finish at the same time
+LOCK_TIMEOUT = 30.0
+# A lock older than this was left by a crashed run
+STALE_LOCK_AGE = 120.0
+
+# Failure kinds
+TRANSIENT = "transient"
+CORRUPT = "corrupt"
+MISSING_TOOL = "missing_tool"
+UNKNOWN = "unknown"
+
+# Retries of a transient failure, and the backoff between them
+DEFAULT_RETRIES = 3
+DEFAULT_RETRY_DELAY = 1.0
+MAX_RETRY_DELAY = 30.0
+
+# Matched against the tool's error output, case insensitive
+TRANSIENT_PATTERNS = [
+    r"input/output error", r"stale (nfs )?file handle", r"resource temporarily unavailable",
+    r"connection (reset|refused|timed out)", r"timed? ?out", r"network", r"broken pipe",
+    r"no such device", r"device (is )?not ready", r"semaphore timeout", r"too many open files",
+    r"text file busy", r"being used by another process", r"sharing violation", r"\beio\b",
+]
+CORRUPT_PATTERNS = [
+    r"corrupt", r"truncat", r"premature end", r"unexpected end", r"invalid", r"not a valid",
+    r"unsupported", r"unknown (file )?format", r"bad (magic|header|data)", r"unable to (read|decode)",
+    r"failed to (read|decode)", r"crc",
+]
+_TRANSIENT = re.compile("|".join(TRANSIENT_PATTERNS), re.IGNORECASE)
+_CORRUPT = re.compile("|".join(CORRUPT_PATTERNS), re.IGNORECASE)
+
+
+def classify_failure(error):
+    # kind of a conversion error from its message; I/O trouble wins over a decode error it caused
+    if _TRANSIENT.search(error or ""):
+        return TRANSIENT
+    if _CORRUPT.search(error or ""):
+        return CORRUPT
+    return UNKNOWN
+
+
+def retry_delay(attempt, base=DEFAULT_RETRY_DELAY, maximum=MAX_RETRY_DELAY):
+    # exponential backoff with jitter, so the nodes of a farm do not retry in step
+    return min(maximum, base * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+class FailureLog(object):
+    """
+    Failed outputs of a texture root, kept between runs in FAILURES_FILE_NAME
+    so a later run can convert just those ("rerun failed only").
+    Entries are keyed by output path:
+    {"source", "target", "kind", "error", "attempts", "failed_at"}.
+    update() merges a run into the file: new failures are added, outputs
+    converted since and deleted sources are removed. The merge holds a lock
+    file (exclusive create, like the leases of ratDistributed) so runs on
+    several machines do not drop each other's entries.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.path = os.path.join(self.root, FAILURES_FILE_NAME)
+        self.lock_path = f"{self.path}.lock"
+
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def sources(self):
+        # failed source images, each once even if several of its targets failed
+        return sorted({entry["source"] for entry in self.load().values()})
+
+    def update(self, failures, succeeded):
+        self._lock()
+        try:
+            entries = self.load()
+            for output_path in succeeded:
+                entries.pop(output_path, None)
+            entries.update(failures)
+            # sources deleted since they failed have nothing left to rerun
+            entries = {output: entry for output, entry in entries.items() if os.path.exists(entry["source"])}
+            if entries:
+                write_json_atomic(self.path, entries)
+            elif os.path.exists(self.path):
+                os.remove(self.path)
+        finally:
+            self._unlock()
+        return entries
+
+    def _lock(self):
+        # raises TimeoutError (an OSError) when another run holds the lock for too long
+        deadline = time.time() + LOCK_TIMEOUT
+        while True:
+            try:
+                fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.lock_path) > STALE_LOCK_AGE:
+                        os.remove(self.lock_path)
+                        continue
+                except OSError:
+                    # released meanwhile
+                    continue
+                if time.time() > deadline:
+                    raise TimeoutError(f"{self.lock_path} is held by another run")
+                time.sleep(random.uniform(0.02, 0.1))
+                continue
+            with os.fdopen(fd, "w") as f:
+                f.write(f"{socket.gethostname()}-{os.getpid()}")
+            return
+
+    def _unlock(self):
+        try:
+            os.remove(self.lock_path)
+        except OSError:
+            pass
+
+
+def failure_entry(source, target, kind, error, attempts):
+    return {"source": source, "target": target, "kind": kind, "error": (error or "")[-500:],
+            "attempts": attempts, "failed_at": time.time()}
@@ -0,0 +1,59 @@
+import os
+
+# Inputs the COP File node reads the way iconvert does, the others are left to iconvert
+SUPPORTED_EXTENSIONS = (".exr", ".tif", ".tiff", ".png", ".jpg", ".jpeg")
+# COP network built in /img of each worker process
+NETWORK_NAME = "mke_ratconvert"
+
+# (file COP, composite ROP) of this process, built on the first conversion
+_nodes = None
+
+
+def _network():
+    # File COP -> Composite ROP, built once and reused for every file the worker converts
+    global _nodes
+    if _nodes is None:
+        import hou
+        img = hou.node("/img")
+        network = img.node(NETWORK_NAME)
+        if network is not None:
+            network.destroy()
+        network = img.createNode("img", NETWORK_NAME)
+        file_node = network.createNode("file", "source")
+        rop = network.createNode("rop_comp", "output")
+        rop.setFirstInput(file_node)
+        # the current frame only, the File COP holds a single image
+        rop.parm("trange").set(0)
+        _nodes = (file_node, rop)
+    return _nodes
+
+
+def convert(src, dst):
+    """
+    In-process .rat conversion for the pool backend of ratEngine
+    ("ratHouConverter:convert"), run by hython workers (see ratWorkerPool).
+    - The image is read by a File COP and written by a Composite ROP, the
+      .rat extension of dst selects the RAT format.
+    - Raises NotImplementedError, so the file is spawned to iconvert, when
+      hou cannot be imported (plain Python), for other inputs and outputs.
+    - Each worker is one hython process and holds one Houdini license.
+    """
+    if not dst.lower().endswith(".rat") or not src.lower().endswith(SUPPORTED_EXTENSIONS):
+        raise NotImplementedError(src)
+    try:
+        import hou
+    except ImportError:
+        raise NotImplementedError("hou is not available, run the workers with hython")
+    file_node, rop = _network()
+    file_node.parm("filename1").set(src)
+    tmp_path = f"{os.path.splitext(dst)[0]}.{os.getpid()}.tmp.rat"
+    rop.parm("copoutput").set(tmp_path)
+    try:
+        rop.render()
+        if rop.errors():
+            raise hou.OperationFailed("; ".join(rop.errors()))
+        # readers never see a half written .rat
+        os.replace(tmp_path, dst)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
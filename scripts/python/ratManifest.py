@@ -0,0 +1,165 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+# One database per texture root, next to the textures it describes
+MANIFEST_FILE_NAME = ".ratconverter.db"
+# Rows written by pool threads are buffered and committed together, once this many are
+# waiting or the oldest has waited COMMIT_INTERVAL seconds
+COMMIT_BATCH_SIZE = 200
+COMMIT_INTERVAL = 2.0
+
+ManifestRecord = namedtuple(
+    "ManifestRecord",
+    ["source_path", "output_path", "size", "mtime", "digest", "args", "duration", "converted_at"],
+)
+
+COLUMNS = ", ".join(ManifestRecord._fields)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversions (
+    output_path TEXT PRIMARY KEY,
+    source_path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    digest TEXT,
+    args TEXT NOT NULL,
+    duration REAL,
+    converted_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS conversions_source ON conversions (source_path);
+CREATE INDEX IF NOT EXISTS conversions_digest ON conversions (digest);
+"""
+
+
+class ConversionManifest(object):
+    """
+    Durable record of past conversions for one texture root, stored in SQLite.
+    - Rows are keyed by output path, so one source can feed several outputs.
+    - Paths are stored relative to the root so the index survives remounts.
+    - Writes are buffered in memory and committed in batches through one
+      connection, each batch in one short transaction: other processes
+      (farm nodes, ratWatch, the UI) only wait for that commit, never for
+      a transaction left open between conversions.
+    - SQLite errors (database locked past the timeout, share gone) are
+      raised as sqlite3.Error; rows that could not be committed stay
+      buffered for the next commit.
+    The default rollback journal is used because WAL is not safe on SMB/NFS;
+    pass journal_mode="WAL" when the manifest lives on a local disk.
+    """
+
+    def __init__(self, root, path=None, journal_mode="DELETE", timeout=30.0):
+        self.root = os.path.abspath(root)
+        self.path = path or os.path.join(self.root, MANIFEST_FILE_NAME)
+        self._lock = threading.RLock()
+        # relative output path -> row to write, or None to delete it
+        self._pending = {}
+        self._pending_since = None
+        self._conn = sqlite3.connect(self.path, timeout=timeout, check_same_thread=False)
+        self._conn.execute(f"PRAGMA journal_mode={journal_mode}")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _rel(self, path):
+        return os.path.relpath(os.path.abspath(path), self.root).replace(os.sep, "/")
+
+    def _abs(self, rel_path):
+        return os.path.normpath(os.path.join(self.root, rel_path))
+
+    def _to_record(self, row):
+        if row is None:
+            return None
+        record = ManifestRecord(*row)
+        return record._replace(source_path=self._abs(record.source_path), output_path=self._abs(record.output_path))
+
+    def get(self, output_path):
+        # record of the last conversion that wrote output_path, or None
+        rel_path = self._rel(output_path)
+        with self._lock:
+            if rel_path in self._pending:
+                row = self._pending[rel_path]
+            else:
+                row = self._conn.execute(
+                    f"SELECT {COLUMNS} FROM conversions WHERE output_path = ?", (rel_path,)
+                ).fetchone()
+        return self._to_record(row)
+
+    def find_by_digest(self, digest, args=None):
+        # every recorded output produced from a source with this content
+        query = f"SELECT {COLUMNS} FROM conversions WHERE digest = ?"
+        params = [digest]
+        if args is not None:
+            query += " AND args = ?"
+            params.append(args)
+        with self._lock:
+            self._commit()
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._to_record(row) for row in rows]
+
+    def durations(self, limit=5000):
+        # (source path, size, seconds) of the most recent timed conversions
+        with self._lock:
+            self._commit()
+            rows = self._conn.execute(
+                "SELECT source_path, size, duration FROM conversions WHERE duration > 0 "
+                "ORDER BY converted_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [(self._abs(source), size, duration) for source, size, duration in rows]
+
+    def record(self, source_path, output_path, size, mtime, digest, args, duration=None):
+        rel_path = self._rel(output_path)
+        row = (self._rel(source_path), rel_path, size, mtime, digest, args, duration, time.time())
+        self._buffer(rel_path, row)
+
+    def forget(self, output_path):
+        self._buffer(self._rel(output_path), None)
+
+    def count(self):
+        with self._lock:
+            self._commit()
+            return self._conn.execute("SELECT COUNT(*) FROM conversions").fetchone()[0]
+
+    def _buffer(self, rel_path, row):
+        with self._lock:
+            self._pending[rel_path] = row
+            if self._pending_since is None:
+                self._pending_since = time.time()
+            if len(self._pending) >= COMMIT_BATCH_SIZE or time.time() - self._pending_since >= COMMIT_INTERVAL:
+                self._commit()
+
+    def _commit(self):
+        # write the buffered rows in one transaction, kept when it fails
+        if not self._pending:
+            return
+        rows = [row for row in self._pending.values() if row is not None]
+        deleted = [(rel_path,) for rel_path, row in self._pending.items() if row is None]
+        with self._conn:
+            if rows:
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO conversions ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            if deleted:
+                self._conn.executemany("DELETE FROM conversions WHERE output_path = ?", deleted)
+        self._pending = {}
+        self._pending_since = None
+
+    def flush(self):
+        with self._lock:
+            self._commit()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._commit()
+                finally:
+                    self._conn.close()
+                    self._conn = None
@@ -0,0 +1,146 @@
+import heapq
+import os
+from collections import namedtuple
+
+from ratProgress import format_duration
+from ratScheduler import source_format
+
+# Plan status of an output
+NEW = "new"
+STALE = "stale"
+UP_TO_DATE = "up_to_date"
+SKIPPED = "skipped"
+STATUSES = (NEW, STALE, UP_TO_DATE, SKIPPED)
+# Outputs already on disk stat-ed per target and format to learn their size ratio
+RATIO_SAMPLES = 50
+# Files of each status listed by format_plan
+LISTED_FILES = 10
+
+# size/mtime: the source's stat at planning time; seconds: estimated conversion time, 0 for the
+# files not converted; reason: why a file is skipped
+PlanItem = namedtuple("PlanItem", ["source", "output", "target", "size", "mtime", "seconds", "reason"])
+
+
+def makespan(durations, workers):
+    # wall clock of the durations on this many workers, longest first to the least busy worker
+    workers = max(1, workers)
+    loads = [0.0] * min(workers, len(durations))
+    if not loads:
+        return 0.0
+    for duration in sorted(durations, reverse=True):
+        heapq.heapreplace(loads, loads[0] + duration)
+    return max(loads)
+
+
+class ConversionPlan(object):
+    """
+    What a conversion run would do, built by ConversionEngine.plan() without
+    converting anything.
+    - items: PlanItem lists by status (new, stale, up_to_date, skipped).
+    - Output sizes come from the targets' size ratios, replaced per target
+      and format by the ratio of the outputs already on disk.
+    - The wall clock is the makespan of the estimated conversion times
+      (CostModel, fitted on the manifest's history) on the run's worker count.
+    """
+
+    def __init__(self, folder, workers, targets):
+        self.folder = folder
+        self.workers = workers
+        self.targets = {target.name: target for target in targets}
+        self.items = {status: [] for status in STATUSES}
+        # (target, format) -> [source bytes, output bytes, samples] of the outputs on disk
+        self._ratios = {}
+
+    def add(self, status, item):
+        self.items[status].append(item)
+
+    def sample_output(self, item):
+        # learn the output size ratio from an up-to-date output, a stat for the first RATIO_SAMPLES of each format
+        key = (item.target, source_format(item.source))
+        sample = self._ratios.setdefault(key, [0, 0, 0])
+        if sample[2] >= RATIO_SAMPLES or item.size <= 0:
+            return
+        try:
+            output_size = os.stat(item.output).st_size
+        except OSError:
+            return
+        sample[0] += item.size
+        sample[1] += output_size
+        sample[2] += 1
+
+    def output_size(self, item):
+        sample = self._ratios.get((item.target, source_format(item.source)))
+        if sample and sample[0]:
+            return int(item.size * sample[1] / sample[0])
+        return self.targets[item.target].output_size(item.source, item.size)
+
+    @property
+    def to_convert(self):
+        # the items a run converts, see the planned option of ConversionEngine
+        return self.items[NEW] + self.items[STALE]
+
+    def summary(self, include_files=True, listed=None):
+        """
+        Counts, bytes and time of the plan, a dict for JSON and the UI.
+        With include_files, "files" lists the items by status: all of them,
+        or the first listed of each status.
+        """
+        work = self.to_convert
+        by_format = {}
+        for item in work:
+            fmt = by_format.setdefault(source_format(item.source), {"files": 0, "bytes": 0, "seconds": 0.0})
+            fmt["files"] += 1
+            fmt["bytes"] += item.size
+            fmt["seconds"] += item.seconds
+        for fmt in by_format.values():
+            fmt["seconds"] = round(fmt["seconds"], 2)
+            fmt["mb_per_sec"] = round(fmt["bytes"] / 1048576.0 / fmt["seconds"], 2) if fmt["seconds"] else None
+        summary = {
+            "folder": self.folder,
+            "workers": self.workers,
+            "counts": {status: len(items) for status, items in self.items.items()},
+            "input_bytes": sum(item.size for item in work),
+            "predicted_output_bytes": sum(self.output_size(item) for item in work),
+            "conversion_seconds": round(sum(item.seconds for item in work), 2),
+            "predicted_duration": round(makespan([item.seconds for item in work], self.workers), 2),
+            "formats": by_format,
+        }
+        if include_files:
+            summary["files"] = {status: [item._asdict() for item in items[:listed]]
+                                for status, items in self.items.items()}
+        return summary
+
+
+def format_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024.0
+
+
+def format_plan(summary, listed=LISTED_FILES):
+    # multi-line report of a plan summary, for the console and the confirmation dialog
+    counts = summary["counts"]
+    lines = [
+        f"{counts[NEW]} new, {counts[STALE]} stale, {counts[UP_TO_DATE]} up to date, {counts[SKIPPED]} skipped",
+        f"Input {format_size(summary['input_bytes'])}, predicted output {format_size(summary['predicted_output_bytes'])}",
+        f"Estimated {format_duration(summary['predicted_duration'])} on {summary['workers']} workers "
+        f"({format_duration(summary['conversion_seconds'])} of conversion)",
+    ]
+    for fmt, stats in sorted(summary["formats"].items()):
+        lines.append(f"  {fmt}: {stats['files']} files, {format_size(stats['bytes'])}, "
+                     f"{format_duration(stats['seconds'])}")
+    files = summary.get("files") or {}
+    for status in (NEW, STALE, SKIPPED):
+        items = files.get(status, [])
+        if not items or not listed:
+            continue
+        lines.append(f"{status.replace('_', ' ').capitalize()}:")
+        shown = items[:listed]
+        for item in shown:
+            reason = f" ({item['reason']})" if item["reason"] else ""
+            lines.append(f"  {os.path.relpath(item['output'], summary['folder'])}{reason}")
+        # the summary may list only the first files, the counts have them all
+        if counts[status] > len(shown):
+            lines.append(f"  ... {counts[status] - len(shown)} more")
+    return "\n".join(lines)
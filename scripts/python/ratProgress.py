@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import deque
+
+# Throughput is measured over the last few seconds so it follows the current pace
+RATE_WINDOW = 5.0
+
+
+def format_duration(seconds):
+    if seconds is None:
+        return "--:--"
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes:02d}:{seconds:02d}"
+
+
+def format_stats(stats):
+    # one-line summary for status labels and logs
+    text = (f"{stats['done']}/{stats['queued']} files | {stats['files_per_sec']:.1f} files/s | "
+            f"{stats['mb_per_sec']:.1f} MB/s | ETA {format_duration(stats['eta'])} | "
+            f"{stats['active']} active")
+    if stats["scanning"]:
+        text += " | scanning"
+    if stats["failed"]:
+        text += f" | {stats['failed']} failed"
+    return text
+
+
+class ProgressAggregator(object):
+    """
+    Thread-safe tally of a conversion run.
+    Pool threads report conversions here instead of emitting a signal per
+    file; the owner reads snapshot() at a fixed rate and forwards it to the UI.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._recent = deque()
+        self.start_time = time.time()
+        self.queued = 0
+        self.skipped = 0
+        self.scanning = True
+        self.active = 0
+        self.done = 0
+        self.converted = 0
+        self.linked = 0
+        self.failed = 0
+        # handled by another node in distributed mode
+        self.elsewhere = 0
+        self.bytes_done = 0
+
+    def set_scan(self, queued, skipped, scanning=True):
+        with self._lock:
+            self.queued = queued
+            self.skipped = skipped
+            self.scanning = scanning
+
+    def conversion_started(self):
+        with self._lock:
+            self.active += 1
+
+    def conversion_stopped(self):
+        with self._lock:
+            self.active -= 1
+
+    def file_done(self, ok, size=0, linked=False):
+        with self._lock:
+            self.done += 1
+            if ok:
+                self.converted += 1
+                self.linked += int(linked)
+            else:
+                self.failed += 1
+            self.bytes_done += size
+            self._recent.append((time.time(), size))
+
+    def file_elsewhere(self):
+        with self._lock:
+            self.done += 1
+            self.elsewhere += 1
+
+    def snapshot(self):
+        now = time.time()
+        with self._lock:
+            while self._recent and now - self._recent[0][0] > RATE_WINDOW:
+                self._recent.popleft()
+            elapsed = now - self.start_time
+            window = min(RATE_WINDOW, elapsed) or 1e-6
+            files_per_sec = len(self._recent) / window
+            mb_per_sec = sum(size for _, size in self._recent) / window / (1024 * 1024)
+            remaining = max(self.queued - self.done, 0)
+            if not remaining:
+                eta = 0.0 if not self.scanning else None
+            else:
+                eta = remaining / files_per_sec if files_per_sec else None
+            return {
+                "queued": self.queued,
+                "skipped": self.skipped,
+                "scanning": self.scanning,
+                "active": self.active,
+                "done": self.done,
+                "converted": self.converted,
+                "linked": self.linked,
+                "failed": self.failed,
+                "elsewhere": self.elsewhere,
+                "bytes_done": self.bytes_done,
+                "elapsed": elapsed,
+                "files_per_sec": files_per_sec,
+                "mb_per_sec": mb_per_sec,
+                # lower bound while the scan is still running
+                "eta": eta,
+            }
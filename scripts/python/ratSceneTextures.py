@@ -0,0 +1,152 @@
+import os
+import re
+from collections import namedtuple
+
+from ratEngine import VALID_EXTENSIONS
+
+# Scene variables expanded in references, read from the scene before the environment
+SCENE_VARIABLES = ("HIP", "JOB", "CACHE")
+UDIM_TOKENS = ("<UDIM>", "<udim>", "%(UDIM)d", "%(udim)d")
+_VARIABLE = re.compile(r"\$\{(\w+)\}|\$(\w+)")
+
+# files: source images to convert, unresolved: (owner, raw path) found on no disk,
+# outside: images outside the texture folder
+SceneTextures = namedtuple("SceneTextures", ["files", "unresolved", "outside"])
+
+
+# SOURCES
+class ParmSource(object):
+    """
+    Where the texture references of a scene come from.
+    - references: (owner, raw path) pairs, owner names the parameter in reports.
+    - variables: scene values of SCENE_VARIABLES.
+    """
+
+    def references(self):
+        raise NotImplementedError
+
+    def variables(self):
+        return {}
+
+
+class HouParmSource(ParmSource):
+    # the scene open in Houdini, call it from the main thread
+    def references(self):
+        import hou
+        for parm, path in hou.fileReferences():
+            yield (parm.path() if parm is not None else "", path)
+
+    def variables(self):
+        import hou
+        values = {}
+        for name in SCENE_VARIABLES:
+            value = hou.getenv(name)
+            if value:
+                values[name] = value
+        return values
+
+
+class FakeParmSource(ParmSource):
+    # fixed references, to test the collection without a hou session
+    def __init__(self, references, variables=None):
+        self._references = list(references)
+        self._variables = dict(variables or {})
+
+    def references(self):
+        return iter(self._references)
+
+    def variables(self):
+        return dict(self._variables)
+
+
+# EXPANSION
+def expand_variables(path, variables):
+    # $VAR and ${VAR} from the scene, then the environment, unknown ones are kept
+    def replace(match):
+        name = match.group(1) or match.group(2)
+        value = variables.get(name, os.environ.get(name))
+        return value if value is not None else match.group(0)
+    return _VARIABLE.sub(replace, path)
+
+
+def has_udim(path):
+    return any(token in path for token in UDIM_TOKENS)
+
+
+class _Listings(object):
+    # one listing per folder, however many references point into it
+    def __init__(self):
+        self._names = {}
+
+    def names(self, folder):
+        if folder not in self._names:
+            try:
+                self._names[folder] = sorted(os.listdir(folder))
+            except OSError:
+                self._names[folder] = []
+        return self._names[folder]
+
+
+def expand_udim(path, listings):
+    # every tile on disk matching a UDIM path, the path itself when it has no token
+    if not has_udim(path):
+        return [path] if os.path.isfile(path) else []
+    folder, name = os.path.split(path)
+    pattern = re.escape(name)
+    for token in UDIM_TOKENS:
+        pattern = pattern.replace(re.escape(token), r"(1\d{3})")
+    tile = re.compile(pattern + r"\Z")
+    return [os.path.join(folder, n) for n in listings.names(folder) if tile.match(n)]
+
+
+def source_images(path, listings):
+    # images a reference stands for: itself, or the sources of a .rat
+    stem, ext = os.path.splitext(path)
+    ext = ext.lower()
+    if ext in VALID_EXTENSIONS:
+        return expand_udim(path, listings)
+    if ext != ".rat":
+        return []
+    sources = []
+    for image_ext in VALID_EXTENSIONS:
+        sources.extend(expand_udim(stem + image_ext, listings))
+    return sources
+
+
+def collect_scene_textures(source, folder=None):
+    """
+    Source images referenced by a scene, in reference order and without duplicates.
+    - $HIP, $JOB, $CACHE and environment variables are expanded.
+    - UDIM tokens (<UDIM>, %(UDIM)d) expand to every tile on disk.
+    - A reference to a .rat stands for the image of the same name next to it.
+    - With folder, images outside it are listed in outside, not in files.
+    Other references (geometry, caches) are ignored.
+    """
+    variables = source.variables()
+    listings = _Listings()
+    root = os.path.normcase(os.path.abspath(folder)) if folder else None
+    files, unresolved, outside = [], [], []
+    seen = set()
+    for owner, raw in source.references():
+        path = expand_variables(raw, variables)
+        if os.path.splitext(path)[1].lower() not in VALID_EXTENSIONS + (".rat",):
+            continue
+        images = source_images(os.path.abspath(path), listings)
+        if not images:
+            unresolved.append((owner, raw))
+            continue
+        for image in images:
+            key = os.path.normcase(image)
+            if key in seen:
+                continue
+            seen.add(key)
+            if root and not key.startswith(root.rstrip(os.sep) + os.sep):
+                outside.append(image)
+            else:
+                files.append(image)
+    return SceneTextures(files, unresolved, outside)
+
+
+def scene_engine_options(textures, include_rest=False):
+    # ConversionEngine / RatConversionWorker options converting the scene textures first
+    return {"files": list(textures.files), "scan_rest": include_rest, "priority_paths": list(textures.files)}
@@ -0,0 +1,159 @@
+import itertools
+import os
+import threading
+
+# Conversion seconds = overhead + bytes * seconds_per_byte, per source format.
+# Rough starting points, replaced by the history found in the manifest.
+DEFAULT_OVERHEAD = 0.05
+DEFAULT_SECONDS_PER_BYTE = {
+    ".exr": 1.5e-8,
+    ".tif": 1.2e-8,
+    ".tiff": 1.2e-8,
+    ".png": 3.0e-8,
+    ".jpg": 4.0e-8,
+    ".jpeg": 4.0e-8,
+}
+FALLBACK_SECONDS_PER_BYTE = 2.0e-8
+# Samples needed before a fitted format replaces the defaults
+MIN_SAMPLES = 5
+# Weight of a new observation in the running estimates
+LEARNING_RATE = 0.05
+
+SCHEDULES = ("fifo", "largest_first")
+
+
+def source_format(path):
+    return os.path.splitext(path)[1].lower()
+
+
+class CostModel(object):
+    """
+    Estimated conversion seconds of a file from its format and size.
+    Fitted by least squares on past conversions, then nudged by every
+    conversion of the current run.
+    """
+
+    def __init__(self):
+        self.overhead = {}
+        self.seconds_per_byte = dict(DEFAULT_SECONDS_PER_BYTE)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_history(cls, samples):
+        # samples: iterable of (source path, size, seconds)
+        model = cls()
+        by_format = {}
+        for path, size, seconds in samples:
+            by_format.setdefault(source_format(path), []).append((size, seconds))
+        for fmt, points in by_format.items():
+            if len(points) >= MIN_SAMPLES:
+                model.overhead[fmt], model.seconds_per_byte[fmt] = cls._fit(points)
+        return model
+
+    @staticmethod
+    def _fit(points):
+        # least squares line through (size, seconds), kept physically sensible
+        n = float(len(points))
+        mean_x = sum(x for x, _ in points) / n
+        mean_y = sum(y for _, y in points) / n
+        var_x = sum((x - mean_x) ** 2 for x, _ in points)
+        if var_x > 0:
+            slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x
+        else:
+            slope = 0.0
+        if slope <= 0:
+            # all sizes alike: treat the average as pure per-byte cost
+            slope = mean_y / mean_x if mean_x else FALLBACK_SECONDS_PER_BYTE
+            return 0.0, slope
+        return max(mean_y - slope * mean_x, 0.0), slope
+
+    def estimate(self, path, size):
+        fmt = source_format(path)
+        with self._lock:
+            return (self.overhead.get(fmt, DEFAULT_OVERHEAD)
+                    + size * self.seconds_per_byte.get(fmt, FALLBACK_SECONDS_PER_BYTE))
+
+    def observe(self, path, size, seconds):
+        if size <= 0:
+            return
+        fmt = source_format(path)
+        with self._lock:
+            overhead = self.overhead.get(fmt, DEFAULT_OVERHEAD)
+            measured = max(seconds - overhead, 0.0) / size
+            current = self.seconds_per_byte.get(fmt, FALLBACK_SECONDS_PER_BYTE)
+            self.seconds_per_byte[fmt] = current + LEARNING_RATE * (measured - current)
+
+
+class ConversionScheduler(object):
+    """
+    Orders the conversion queue and keeps predicted vs. actual costs.
+    - fifo: files in discovery order.
+    - largest_first: most expensive estimated files first, so a few big
+      UDIMs found late do not keep one thread busy after the others finished.
+      Ordering covers what is waiting in the queue, so the engine gives this
+      mode a deep queue.
+    Files under priority_paths always go first ("interactive first").
+    Items are tuples for a queue.PriorityQueue.
+    """
+
+    def __init__(self, mode="fifo", priority_paths=None, cost_model=None):
+        if mode not in SCHEDULES:
+            raise ValueError(f"Unknown schedule '{mode}', expected one of {SCHEDULES}")
+        self.mode = mode
+        # a set, looked up for the path and each of its parent folders
+        self.priority_paths = {os.path.normcase(os.path.abspath(p)).rstrip(os.sep) for p in priority_paths or []}
+        self.cost_model = cost_model or CostModel()
+        self.predicted_total = 0.0
+        self.predicted_longest = 0.0
+        self.predicted_count = 0
+        self.actual_total = 0.0
+        self.actual_count = 0
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def is_priority(self, path):
+        if not self.priority_paths:
+            return False
+        path = os.path.normcase(os.path.abspath(path))
+        while True:
+            if path in self.priority_paths:
+                return True
+            parent = os.path.dirname(path)
+            if parent == path:
+                return False
+            path = parent
+
+    def item(self, entry):
+        cost = self.cost_model.estimate(entry.path, entry.st_size)
+        with self._lock:
+            self.predicted_total += cost
+            self.predicted_longest = max(self.predicted_longest, cost)
+            self.predicted_count += 1
+        tier = 0 if self.is_priority(entry.path) else 1
+        order = -cost if self.mode == "largest_first" else 0.0
+        return (tier, order, next(self._counter), entry)
+
+    def end_marker(self):
+        # sorts after every file so workers only stop once the queue is empty
+        return (2, 0.0, next(self._counter), None)
+
+    def observe(self, path, size, seconds):
+        self.cost_model.observe(path, size, seconds)
+        with self._lock:
+            self.actual_total += seconds
+            self.actual_count += 1
+
+    def predicted_duration(self, workers):
+        # lower bound of the makespan of the queued files on this many workers
+        if not self.predicted_count:
+            return 0.0
+        return max(self.predicted_total / max(workers, 1), self.predicted_longest)
+
+    def report(self, workers, actual_duration):
+        return {
+            "schedule": self.mode,
+            "predicted_duration": round(self.predicted_duration(workers), 2),
+            "actual_duration": round(actual_duration, 2),
+            "predicted_conversion_seconds": round(self.predicted_total, 2),
+            "actual_conversion_seconds": round(self.actual_total, 2),
+        }
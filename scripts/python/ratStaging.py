@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+COPY_CHUNK_SIZE = 1024 * 1024
+# Converted files held locally before they are copied back together
+DEFAULT_WRITEBACK_BATCH = 32
+JOURNAL_FILE_NAME = "journal.jsonl"
+# Suffix of an output being copied back, renamed over the real name once complete
+PARTIAL_SUFFIX = ".ratpart"
+
+
+def default_scratch_dir():
+    return os.path.join(tempfile.gettempdir(), "ratconverter_scratch")
+
+
+class BandwidthLimiter(object):
+    """
+    Token bucket shared by every copy thread, bytes_per_second on average
+    with bursts of up to one second worth of data.
+    """
+
+    def __init__(self, bytes_per_second):
+        self.rate = float(bytes_per_second)
+        self._allowance = self.rate
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, size):
+        with self._lock:
+            now = time.monotonic()
+            self._allowance = min(self.rate, self._allowance + (now - self._last) * self.rate)
+            self._last = now
+            # reserve now, wait outside the lock: the next caller queues behind this one
+            self._allowance -= size
+            wait = -self._allowance / self.rate if self._allowance < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+
+
+def copy_file(src, dst, limiter=None):
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        for chunk in iter(lambda: fsrc.read(COPY_CHUNK_SIZE), b""):
+            if limiter:
+                limiter.consume(len(chunk))
+            fdst.write(chunk)
+
+
+class ScratchStager(object):
+    """
+    Converts through a local scratch folder instead of writing on the share.
+    - stage_in copies a source to scratch, one copy per output so targets of a
+      source never share it; the conversion writes its output there.
+    - commit queues the local output; batches of batch_size are copied back to
+      a temp name next to the source and renamed over the output, so the share
+      never holds a truncated .rat.
+    - Copies in both directions share bandwidth (bytes/s, None = unlimited).
+    - A journal in the scratch folder lists converted and written-back files:
+      resume() copies back what an interrupted run converted but did not write.
+    on_written(source, output, duration, target) is called for every output written back.
+    """
+
+    def __init__(self, root, scratch_dir=None, bandwidth=None, batch_size=DEFAULT_WRITEBACK_BATCH,
+                 on_written=None, log=print):
+        root = os.path.abspath(root)
+        key = hashlib.sha1(os.path.normcase(root).encode("utf-8")).hexdigest()[:12]
+        # one folder per texture root, so runs on different roots never mix
+        self.folder = os.path.join(scratch_dir or default_scratch_dir(), key)
+        self.limiter = BandwidthLimiter(bandwidth) if bandwidth else None
+        self.batch_size = max(1, batch_size)
+        self.on_written = on_written
+        self.log = log
+        self.journal_path = os.path.join(self.folder, JOURNAL_FILE_NAME)
+        self.written_count = 0
+        self.failed_count = 0
+        self.resumed_count = 0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._journal_lock = threading.Lock()
+        os.makedirs(self.folder, exist_ok=True)
+
+    def _local_path(self, path):
+        # stable across runs for the journal, unique per source/output
+        name = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.folder, f"{name}_{os.path.basename(path)}")
+
+    def stage_in(self, image_path, output_path):
+        # (local source, local output); the source copy is named from the output,
+        # so targets converting one source at once each read and discard their own
+        local_output = self._local_path(output_path)
+        local_src = f"{os.path.splitext(local_output)[0]}.src{os.path.splitext(image_path)[1]}"
+        copy_file(image_path, local_src, self.limiter)
+        return local_src, local_output
+
+    def discard(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def commit(self, image_path, local_output, output_path, duration, target=None):
+        # the local output is complete: journal it and copy it back with the next batch
+        try:
+            src_stat = os.stat(image_path)
+        except OSError:
+            # source deleted meanwhile, nothing to write back for
+            self.discard(local_output)
+            return
+        entry = {"state": "converted", "source": image_path, "output": output_path, "local": local_output,
+                 "size": src_stat.st_size, "mtime": src_stat.st_mtime, "duration": duration, "target": target}
+        self._journal(entry)
+        with self._lock:
+            self._pending.append(entry)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        # copy back everything converted so far
+        with self._lock:
+            batch, self._pending = self._pending, []
+        for entry in batch:
+            self._write_back(entry)
+
+    def _write_back(self, entry):
+        tmp_path = entry["output"] + PARTIAL_SUFFIX
+        try:
+            copy_file(entry["local"], tmp_path, self.limiter)
+            os.replace(tmp_path, entry["output"])
+        except OSError as e:
+            # kept in scratch and in the journal, the next run tries again
+            self.log(f"Error writing back {os.path.basename(entry['output'])}: {e}")
+            self.discard(tmp_path)
+            with self._lock:
+                self.failed_count += 1
+            return False
+        self.discard(entry["local"])
+        self._journal({"state": "written", "output": entry["output"]})
+        with self._lock:
+            self.written_count += 1
+        if self.on_written:
+            self.on_written(entry["source"], entry["output"], entry["duration"], entry.get("target"))
+        return True
+
+    def _journal(self, entry):
+        with self._journal_lock:
+            with open(self.journal_path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def resume(self):
+        # write back what a previous run converted, unless its source changed since
+        entries = {}
+        try:
+            with open(self.journal_path, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # last line cut by the crash
+                        continue
+                    entries[entry["output"]] = entry
+        except OSError:
+            return 0
+        for entry in entries.values():
+            if entry["state"] != "converted":
+                continue
+            try:
+                src_stat = os.stat(entry["source"])
+                current = (src_stat.st_size == entry["size"] and src_stat.st_mtime == entry["mtime"]
+                           and os.path.isfile(entry["local"]))
+            except OSError:
+                current = False
+            if not current:
+                self.discard(entry["local"])
+                continue
+            with self._lock:
+                self._pending.append(entry)
+        with self._lock:
+            self.resumed_count = len(self._pending)
+        self.flush()
+        return self.resumed_count
+
+    def close(self):
+        # flush, and forget the journal once nothing is left to write back
+        self.flush()
+        if not self.failed_count:
+            with self._journal_lock:
+                self.discard(self.journal_path)
@@ -0,0 +1,129 @@
+import os
+
+from ratAutotune import ConcurrencyLimiter
+
+# Inputs of every built-in target
+IMAGE_EXTENSIONS = (".exr", ".tif", ".tiff", ".png", ".jpg", ".jpeg")
+# Longest edge of the proxy JPEGs
+DEFAULT_PROXY_SIZE = 1024
+# Output bytes per input byte of the mipmapped formats by input format, rough: compressed
+# 8-bit inputs grow the most. The dry-run planner prefers the ratio of outputs on disk.
+MIPMAP_SIZE_RATIOS = {".exr": 1.4, ".tif": 1.4, ".tiff": 1.4, ".png": 3.0, ".jpg": 8.0, ".jpeg": 8.0}
+
+
+# REGISTRY
+TARGETS = {}
+
+
+def register_target(target_class):
+    # make a ConversionTarget subclass available by name, e.g. to the command line
+    TARGETS[target_class.name] = target_class
+    return target_class
+
+
+def create_target(name, **options):
+    if name not in TARGETS:
+        raise ValueError(f"Unknown target '{name}', expected one of {sorted(TARGETS)}")
+    return TARGETS[name](**options)
+
+
+def output_suffixes():
+    # outputs of every registered target, never scanned as inputs (a proxy JPEG is not a source)
+    return tuple(target_class.suffix.lower() for target_class in TARGETS.values())
+
+
+class ConversionTarget(object):
+    """
+    One kind of output made from the scanned images.
+    - extensions: input extensions it converts.
+    - suffix: output naming, replaces the input extension.
+    - max_concurrency: conversions of this target running at once, on top of
+      the engine's own limit (None: only the engine's).
+    - signature: tool and arguments, stored in the manifest so a change of
+      either makes the outputs stale.
+    - size_ratios: output bytes per input byte by input extension, for
+      output_size() estimates.
+    Subclasses set the class attributes and build the command line.
+    """
+
+    name = None
+    tool_name = None
+    suffix = None
+    extensions = IMAGE_EXTENSIONS
+    # can be converted by the in-process converter of ratWorkerPool
+    poolable = False
+    size_ratios = {}
+    default_size_ratio = 1.0
+
+    def __init__(self, tool=None, args=None, max_concurrency=None, extensions=None, suffix=None):
+        tool = tool or self.tool_name
+        self.tool = [tool] if isinstance(tool, str) else list(tool)
+        self.args = list(args or [])
+        self.extensions = tuple(e.lower() for e in (extensions or self.extensions))
+        self.suffix = suffix or self.suffix
+        self.max_concurrency = max_concurrency
+        self.limiter = ConcurrencyLimiter(max_concurrency) if max_concurrency else None
+        self.signature = " ".join([self.tool_name] + self.args)
+        # set when the tool is not installed, its files then fail without trying
+        self.missing = False
+
+    def accepts(self, path):
+        lower = path.lower()
+        return lower.endswith(self.extensions) and not lower.endswith(self.suffix.lower())
+
+    def output_path(self, source):
+        return f"{os.path.splitext(source)[0]}{self.suffix}"
+
+    def command(self, source, output):
+        return self.tool + self.args + [source, output]
+
+    def output_size(self, source, size):
+        # estimated bytes of the output of a source of this size
+        ratio = self.size_ratios.get(os.path.splitext(source)[1].lower(), self.default_size_ratio)
+        return int(size * ratio)
+
+
+@register_target
+class RatTarget(ConversionTarget):
+    # Mantra/Karma .rat through iconvert
+    name = "rat"
+    tool_name = "iconvert"
+    suffix = ".rat"
+    poolable = True
+    size_ratios = MIPMAP_SIZE_RATIOS
+    default_size_ratio = 1.4
+
+
+@register_target
+class TxTarget(ConversionTarget):
+    # OpenImageIO .tx through maketx
+    name = "tx"
+    tool_name = "maketx"
+    suffix = ".tx"
+    size_ratios = MIPMAP_SIZE_RATIOS
+    default_size_ratio = 1.4
+
+    def command(self, source, output):
+        return self.tool + self.args + [source, "-o", output]
+
+
+@register_target
+class ProxyTarget(ConversionTarget):
+    # downsized JPEG for viewports and reviews, through Houdini's oiiotool
+    name = "proxy"
+    tool_name = "hoiiotool"
+    suffix = "_proxy.jpg"
+
+    def __init__(self, tool=None, args=None, max_concurrency=None, extensions=None, suffix=None,
+                 size=DEFAULT_PROXY_SIZE):
+        if args is None:
+            args = ["--fit", f"{size}x{size}", "--ch", "R,G,B"]
+        super(ProxyTarget, self).__init__(tool, args, max_concurrency, extensions, suffix)
+        self.size = size
+
+    def command(self, source, output):
+        return self.tool + [source] + self.args + ["-o", output]
+
+    def output_size(self, source, size):
+        # about a third of a byte per pixel of the fitted JPEG, never more than the source
+        return min(size, self.size * self.size // 3)
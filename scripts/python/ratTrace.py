@@ -0,0 +1,121 @@
+import csv
+import json
+import os
+import threading
+import time
+
+# Columns of the CSV export, also the keys of every span
+SPAN_FIELDS = ["path", "phase", "start", "end", "duration", "thread", "bytes_in", "bytes_out", "cpu",
+               "status", "error"]
+# Phases shown as async events in the trace viewer: they overlap on a thread
+ASYNC_PHASES = ("queue",)
+
+
+class ConversionTracer(object):
+    """
+    Opt-in record of what happened to every file of a conversion run.
+    One span per file and phase:
+    - scan: staleness check of the file by the scanner.
+    - queue: time between being queued and picked by a worker.
+    - spawn: starting the iconvert process.
+    - convert: the iconvert process, with bytes read/written and child CPU
+      seconds where the OS reports them (cpu close to duration = CPU bound).
+    - link: hardlink/copy of a deduplicated output.
+    Exports to CSV, JSON Lines and the Chrome trace-event format
+    (chrome://tracing, Perfetto).
+    """
+
+    def __init__(self):
+        self.start_time = time.time()
+        self.spans = []
+        self._queued_at = {}
+        self._lock = threading.Lock()
+
+    def span(self, path, phase, start, end, bytes_in=None, bytes_out=None, cpu=None, status="ok", error=None):
+        record = {
+            "path": path,
+            "phase": phase,
+            "start": start,
+            "end": end,
+            "duration": end - start,
+            "thread": threading.current_thread().name,
+            "bytes_in": bytes_in,
+            "bytes_out": bytes_out,
+            "cpu": cpu,
+            "status": status,
+            "error": error,
+        }
+        with self._lock:
+            self.spans.append(record)
+
+    def enqueued(self, path):
+        with self._lock:
+            self._queued_at[path] = time.time()
+
+    def dequeued(self, path):
+        with self._lock:
+            start = self._queued_at.pop(path, None)
+        if start is not None:
+            self.span(path, "queue", start, time.time())
+
+    def export_csv(self, path):
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=SPAN_FIELDS)
+            writer.writeheader()
+            writer.writerows(self.spans)
+
+    def export_jsonl(self, path):
+        with open(path, "w") as f:
+            for record in self.spans:
+                f.write(json.dumps(record) + "\n")
+
+    def export_chrome(self, path):
+        # complete events per thread, async events for the overlapping queue waits
+        pid = os.getpid()
+        thread_ids = {}
+        events = []
+        for index, record in enumerate(self.spans):
+            tid = thread_ids.setdefault(record["thread"], len(thread_ids) + 1)
+            ts = (record["start"] - self.start_time) * 1e6
+            args = {key: record[key] for key in ("path", "bytes_in", "bytes_out", "cpu", "status", "error")
+                    if record[key] is not None}
+            name = os.path.basename(record["path"])
+            if record["phase"] in ASYNC_PHASES:
+                common = {"name": name, "cat": record["phase"], "id": index, "pid": pid, "tid": tid}
+                events.append(dict(common, ph="b", ts=ts, args=args))
+                events.append(dict(common, ph="e", ts=(record["end"] - self.start_time) * 1e6))
+            else:
+                events.append({"name": name, "cat": record["phase"], "ph": "X", "ts": ts,
+                               "dur": record["duration"] * 1e6, "pid": pid, "tid": tid, "args": args})
+        for thread, tid in thread_ids.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread}})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def export_all(self, prefix):
+        # write <prefix>.csv, <prefix>.jsonl and <prefix>.trace.json, return their paths
+        paths = [f"{prefix}.csv", f"{prefix}.jsonl", f"{prefix}.trace.json"]
+        self.export_csv(paths[0])
+        self.export_jsonl(paths[1])
+        self.export_chrome(paths[2])
+        return paths
+
+    def summary(self, top=10):
+        # per-phase totals, the slowest conversions and every error
+        phases = {}
+        for record in self.spans:
+            phase = phases.setdefault(record["phase"], {"count": 0, "total": 0.0, "max": 0.0})
+            phase["count"] += 1
+            phase["total"] += record["duration"]
+            phase["max"] = max(phase["max"], record["duration"])
+        for phase in phases.values():
+            phase["mean"] = phase["total"] / phase["count"]
+        converts = [r for r in self.spans if r["phase"] == "convert" and r["status"] == "ok"]
+        slowest = sorted(converts, key=lambda r: r["duration"], reverse=True)[:top]
+        return {
+            "phases": phases,
+            "slowest": [{"path": r["path"], "duration": r["duration"], "bytes_in": r["bytes_in"], "cpu": r["cpu"]}
+                        for r in slowest],
+            "errors": [{"path": r["path"], "phase": r["phase"], "error": r["error"]}
+                       for r in self.spans if r["status"] == "error"],
+        }
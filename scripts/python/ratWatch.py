@@ -0,0 +1,489 @@
+import argparse
+import ctypes
+import ctypes.util
+import errno
+import json
+import os
+import queue
+import select
+import shlex
+import signal
+import struct
+import sys
+import threading
+import time
+
+from dirCrawler import DirCrawler
+from ratDistributed import LEASE_DIR_NAME, STATUS_DIR_NAME
+from ratEngine import VALID_EXTENSIONS, CommandLineCallbacks, ConversionCallbacks, ConversionEngine
+
+# Seconds a file must stay unchanged before it is converted
+DEBOUNCE_SECONDS = 1.0
+# Polling fallback: directories are stat-ed this often, every file this often
+POLL_INTERVAL = 2.0
+FULL_SWEEP_INTERVAL = 60.0
+# Files handed to one engine run
+MAX_BATCH = 1000
+# Seconds between two status lines of the command line
+STATUS_INTERVAL = 10.0
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_ONLYDIR
+EVENT_HEADER = struct.Struct("iIII")
+READ_SIZE = 64 * 1024
+
+
+def is_texture(path):
+    return path.lower().endswith(VALID_EXTENSIONS)
+
+
+# WATCHERS
+class InotifyWatcher(object):
+    """
+    Linux inotify through ctypes, one watch per directory: a change costs an
+    event, never a scan. Directories created or moved in are watched and
+    listed on arrival, since files can land in them before the watch exists.
+    poll() returns (changed paths, overflowed); after an overflow the kernel
+    dropped events and the caller has to rescan.
+    """
+
+    name = "inotify"
+
+    def __init__(self, root, is_excluded, log=print):
+        self.root = os.path.abspath(root)
+        self.is_excluded = is_excluded
+        self.log = log
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # watch descriptor -> directory
+        self._dirs = {}
+        self._limit_reached = False
+
+    def start(self):
+        self._add_tree(self.root)
+        if self._limit_reached:
+            self.close()
+            raise OSError(errno.ENOSPC, "inotify watch limit reached, raise fs.inotify.max_user_watches")
+
+    def _add_tree(self, top):
+        # watch top and everything below, return the files found on the way
+        files = []
+        stack = [top]
+        while stack:
+            folder = stack.pop()
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(folder), WATCH_MASK)
+            if wd < 0:
+                if ctypes.get_errno() == errno.ENOSPC and not self._limit_reached:
+                    self._limit_reached = True
+                    self.log(f"inotify watch limit reached, {folder} and below are not watched")
+                continue
+            self._dirs[wd] = folder
+            try:
+                with os.scandir(folder) as it:
+                    for entry in it:
+                        if self.is_excluded(entry.path):
+                            continue
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        else:
+                            files.append(entry.path)
+            except OSError:
+                continue
+        return files
+
+    def poll(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return [], False
+        try:
+            data = os.read(self.fd, READ_SIZE)
+        except BlockingIOError:
+            return [], False
+        changed = []
+        overflowed = False
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                overflowed = True
+                continue
+            if mask & IN_IGNORED:
+                # directory deleted
+                self._dirs.pop(wd, None)
+                continue
+            folder = self._dirs.get(wd)
+            if folder is None or not name:
+                continue
+            path = os.path.join(folder, name)
+            if self.is_excluded(path):
+                continue
+            if not mask & IN_ISDIR:
+                changed.append(path)
+            elif mask & (IN_CREATE | IN_MOVED_TO):
+                changed.extend(self._add_tree(path))
+        return changed, overflowed
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingWatcher(object):
+    """
+    Portable fallback: every interval each known directory is stat-ed and
+    only the ones whose mtime moved are listed again. Overwriting a file in
+    place does not touch its directory, so every full_interval all file
+    sizes/mtimes are compared as well.
+    """
+
+    name = "polling"
+
+    def __init__(self, root, is_excluded, interval=POLL_INTERVAL, full_interval=FULL_SWEEP_INTERVAL):
+        self.root = os.path.abspath(root)
+        self.is_excluded = is_excluded
+        self.interval = interval
+        self.full_interval = full_interval
+        # directory -> mtime, directory -> {file: (size, mtime)}
+        self._dirs = {}
+        self._files = {}
+        self._next_poll = 0.0
+        self._next_full = 0.0
+
+    def start(self):
+        self._scan_dir(self.root, [], True)
+        now = time.time()
+        self._next_poll = now + self.interval
+        self._next_full = now + self.full_interval
+
+    def _scan_dir(self, folder, changed, full):
+        try:
+            mtime = os.stat(folder).st_mtime
+        except OSError:
+            # deleted, its subdirectories fail the same way
+            self._dirs.pop(folder, None)
+            self._files.pop(folder, None)
+            return
+        if not full and self._dirs.get(folder) == mtime:
+            return
+        self._dirs[folder] = mtime
+        files = {}
+        subdirs = []
+        try:
+            with os.scandir(folder) as it:
+                for entry in it:
+                    if self.is_excluded(entry.path):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                        continue
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    files[entry.path] = (st.st_size, st.st_mtime)
+        except OSError:
+            return
+        old = self._files.get(folder, {})
+        changed.extend(path for path, signature in files.items() if old.get(path) != signature)
+        self._files[folder] = files
+        for subdir in subdirs:
+            if subdir not in self._dirs:
+                # new directory: everything in it is new
+                self._scan_dir(subdir, changed, True)
+
+    def poll(self, timeout):
+        now = time.time()
+        if now < self._next_poll:
+            time.sleep(min(timeout, self._next_poll - now))
+            return [], False
+        full = now >= self._next_full
+        changed = []
+        for folder in list(self._dirs):
+            self._scan_dir(folder, changed, full)
+        now = time.time()
+        self._next_poll = now + self.interval
+        if full:
+            self._next_full = now + self.full_interval
+        return changed, False
+
+    def close(self):
+        pass
+
+
+class Debouncer(object):
+    """
+    Holds changed files until they stop changing: a file is ready once no
+    event arrived for quiet seconds and its size/mtime did not move since the
+    previous check. Files being copied in are never converted half written.
+    Fed by the watch thread and read by status() from other threads, every
+    method holds the debouncer's lock.
+    """
+
+    def __init__(self, quiet=DEBOUNCE_SECONDS):
+        self.quiet = quiet
+        self._last_event = {}
+        self._first_event = {}
+        self._signature = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._last_event)
+
+    def touch(self, path, now):
+        with self._lock:
+            self._last_event[path] = now
+            self._first_event.setdefault(path, now)
+
+    def oldest(self):
+        with self._lock:
+            return min(self._first_event.values()) if self._first_event else None
+
+    def snapshot(self):
+        # (files debouncing, time of the oldest first event or None), consistent with each other
+        with self._lock:
+            return len(self._last_event), min(self._first_event.values()) if self._first_event else None
+
+    def _drop(self, path):
+        self._last_event.pop(path, None)
+        self._signature.pop(path, None)
+        return self._first_event.pop(path, None)
+
+    def ready(self, now):
+        # [(path, time of its first event)] of the files that settled
+        settled = []
+        with self._lock:
+            for path, last in list(self._last_event.items()):
+                if now - last < self.quiet:
+                    continue
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    # deleted or renamed away before it settled
+                    self._drop(path)
+                    continue
+                signature = (st.st_size, st.st_mtime)
+                if self._signature.get(path) == signature:
+                    settled.append((path, self._drop(path)))
+                else:
+                    self._signature[path] = signature
+                    self._last_event[path] = now
+        return settled
+
+
+# WATCH LOOP
+class TextureWatcher(object):
+    """
+    Long-running conversion of the textures dropped in a folder, e.g. IN/TEXTURES.
+    - Changes come from inotify on Linux, from polling elsewhere or when
+      inotify is unavailable or out of watches.
+    - Settled files are converted in batches by a ConversionEngine limited
+      to those files, in a background thread, while new events keep coming.
+      The engine is incremental, so files whose .rat is current are skipped.
+    - initial_scan converts what changed while nobody was watching.
+    - status(): files debouncing, queued and converting, lag of the oldest
+      change not converted yet and latency of the last batch.
+    engine_options are passed to every ConversionEngine.
+    """
+
+    def __init__(self, folder, engine_options=None, debounce=DEBOUNCE_SECONDS, poll_interval=POLL_INTERVAL,
+                 full_sweep_interval=FULL_SWEEP_INTERVAL, use_inotify=None, initial_scan=True, callbacks=None):
+        self.folder = os.path.abspath(folder)
+        self.engine_options = dict(engine_options or {})
+        self.callbacks = callbacks or ConversionCallbacks()
+        self.poll_interval = poll_interval
+        self.full_sweep_interval = full_sweep_interval
+        # None: inotify where available
+        self.use_inotify = sys.platform.startswith("linux") if use_inotify is None else use_inotify
+        self.initial_scan = initial_scan
+        exclude = list(self.engine_options.get("exclude") or []) + [LEASE_DIR_NAME, STATUS_DIR_NAME]
+        self.is_excluded = DirCrawler(self.folder, exclude=exclude).is_excluded
+        self.debouncer = Debouncer(debounce)
+        self.watcher = None
+        self.engine = None
+        self.converted_count = 0
+        self.failed_count = 0
+        self.batch_count = 0
+        self.last_latency = None
+        # batches waiting for the converter thread, None asks for a full incremental scan
+        self._batches = queue.Queue()
+        self._queued = []
+        self._active = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _make_watcher(self):
+        if self.use_inotify:
+            try:
+                watcher = InotifyWatcher(self.folder, self.is_excluded, log=self.callbacks.log)
+                watcher.start()
+                return watcher
+            except (OSError, AttributeError) as e:
+                self.callbacks.log(f"inotify unavailable, polling instead: {e}")
+        watcher = PollingWatcher(self.folder, self.is_excluded, self.poll_interval, self.full_sweep_interval)
+        watcher.start()
+        return watcher
+
+    def run(self):
+        # watch until stop() is called
+        self.watcher = self._make_watcher()
+        self.callbacks.status(f"Watching {self.folder} ({self.watcher.name})")
+        converter = threading.Thread(target=self._convert_loop, name="RatWatchConverter", daemon=True)
+        converter.start()
+        if self.initial_scan:
+            self._batches.put(None)
+        try:
+            while not self._stop.is_set():
+                changed, overflowed = self.watcher.poll(0.5)
+                now = time.time()
+                for path in changed:
+                    if is_texture(path):
+                        self.debouncer.touch(path, now)
+                if overflowed:
+                    self.callbacks.log("Too many changes at once, rescanning the folder.")
+                    self._batches.put(None)
+                settled = self.debouncer.ready(now)
+                for index in range(0, len(settled), MAX_BATCH):
+                    batch = settled[index:index + MAX_BATCH]
+                    with self._lock:
+                        self._queued.extend(batch)
+                    self._batches.put(batch)
+        finally:
+            self._batches.put(False)
+            if self.engine:
+                self.engine.cancel()
+            converter.join()
+            self.watcher.close()
+
+    def stop(self):
+        # safe from any thread or signal handler
+        self._stop.set()
+        engine = self.engine
+        if engine:
+            engine.cancel()
+
+    def _convert_loop(self):
+        while True:
+            batch = self._batches.get()
+            if batch is False or self._stop.is_set():
+                break
+            with self._lock:
+                if batch:
+                    del self._queued[:len(batch)]
+                self._active = batch or []
+            files = [path for path, _ in batch] if batch else None
+            self.engine = ConversionEngine(self.folder, files=files, callbacks=self.callbacks, **self.engine_options)
+            summary = self.engine.run()
+            with self._lock:
+                self.engine = None
+                self._active = []
+                self.batch_count += 1
+                self.converted_count += summary["converted"]
+                self.failed_count += summary["failed"]
+                if batch:
+                    self.last_latency = time.time() - min(first for _, first in batch)
+
+    def status(self):
+        now = time.time()
+        with self._lock:
+            waiting = [first for _, first in self._queued + self._active]
+            queued = len(self._queued)
+            converting = len(self._active)
+        debouncing, oldest = self.debouncer.snapshot()
+        if oldest is not None:
+            waiting.append(oldest)
+        return {
+            "watcher": self.watcher.name if self.watcher else None,
+            "debouncing": debouncing,
+            "queued": queued,
+            "converting": converting,
+            "queue_depth": debouncing + queued + converting,
+            # seconds since the oldest change that is not converted yet
+            "lag": round(now - min(waiting), 2) if waiting else 0.0,
+            "last_latency": round(self.last_latency, 2) if self.last_latency is not None else None,
+            "converted": self.converted_count,
+            "failed": self.failed_count,
+            "batches": self.batch_count,
+        }
+
+
+# COMMAND LINE
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m ratWatch",
+        description="Convert new and modified textures of a folder to .rat as they arrive.",
+    )
+    parser.add_argument("folder", help="texture folder to watch, e.g. $JOB/IN/TEXTURES")
+    parser.add_argument("-j", "--workers", type=int, default=(os.cpu_count() or 2) // 2 or 1,
+                        help="concurrent conversions (default: half the cores)")
+    parser.add_argument("--iconvert", default="iconvert", help="iconvert executable or quoted command")
+    parser.add_argument("--exclude", action="append", default=[], metavar="PATTERN",
+                        help="glob of files/folders to ignore, can be repeated")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE_SECONDS,
+                        help="seconds a file must stay unchanged before it is converted")
+    parser.add_argument("--poll", action="store_true", help="poll the folder instead of using inotify")
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL)
+    parser.add_argument("--no-initial-scan", action="store_true",
+                        help="only convert changes made after the start")
+    parser.add_argument("--json", action="store_true", help="print status lines as JSON")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not os.path.isdir(args.folder):
+        sys.stderr.write(f"Not a directory: {args.folder}\n")
+        return 2
+    callbacks = CommandLineCallbacks(json_output=args.json, interval=STATUS_INTERVAL)
+    watcher = TextureWatcher(
+        args.folder,
+        engine_options={
+            "max_workers": max(1, args.workers),
+            "iconvert": shlex.split(args.iconvert, posix=os.name != "nt"),
+            "exclude": args.exclude,
+        },
+        debounce=args.debounce,
+        poll_interval=args.poll_interval,
+        use_inotify=False if args.poll else None,
+        initial_scan=not args.no_initial_scan,
+        callbacks=callbacks,
+    )
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, lambda *_: watcher.stop())
+    runner = threading.Thread(target=watcher.run, name="RatWatch")
+    runner.start()
+    last = None
+    while runner.is_alive():
+        try:
+            runner.join(STATUS_INTERVAL)
+        except KeyboardInterrupt:
+            watcher.stop()
+            continue
+        status = watcher.status()
+        if status != last and runner.is_alive():
+            if args.json:
+                sys.stderr.write(json.dumps({"event": "watch", "data": status}) + "\n")
+            else:
+                sys.stderr.write(f"Watch: {status['queue_depth']} waiting, lag {status['lag']:.1f}s, "
+                                 f"{status['converted']} converted, {status['failed']} failed\n")
+            sys.stderr.flush()
+            last = status
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
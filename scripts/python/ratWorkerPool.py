@@ -0,0 +1,198 @@
+import importlib
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+
+# Seconds a worker gets to exit after its stdin is closed
+STOP_TIMEOUT = 5.0
+
+STATUS_OK = "ok"
+STATUS_ERROR = "error"
+# The in-process converter cannot handle this file: spawn iconvert instead
+STATUS_FALLBACK = "fallback"
+
+
+def load_converter(spec):
+    # "module:function" -> callable(src, dst)
+    module_name, _, function_name = spec.partition(":")
+    if not module_name or not function_name:
+        raise ValueError(f"Converter must look like 'module:function', got '{spec}'")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def default_python():
+    # Inside Houdini sys.executable is the application, not an interpreter
+    name = os.path.basename(sys.executable).lower()
+    if name.startswith(("python", "hython")):
+        return sys.executable
+    hfs = os.environ.get("HFS")
+    if hfs:
+        return os.path.join(hfs, "bin", "hython.exe" if sys.platform == "win32" else "hython")
+    return sys.executable
+
+
+class WorkerProcessError(Exception):
+    pass
+
+
+class _WorkerProcess(object):
+    # one long-lived converter process and its JSON-lines pipe
+    def __init__(self, python, converter):
+        creation_flags = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+        env = dict(os.environ)
+        # the worker imports the converter module from this folder; not our whole sys.path,
+        # a hython worker would pick up the stdlib of the Python running the CLI
+        paths = [os.path.dirname(os.path.abspath(__file__))]
+        if env.get("PYTHONPATH"):
+            paths.append(env["PYTHONPATH"])
+        env["PYTHONPATH"] = os.pathsep.join(paths)
+        self.process = subprocess.Popen(
+            [python, "-u", os.path.abspath(__file__), converter],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, creationflags=creation_flags, env=env,
+        )
+
+    def request(self, files):
+        try:
+            self.process.stdin.write(json.dumps({"files": files}) + "\n")
+            self.process.stdin.flush()
+            line = self.process.stdout.readline()
+        except (OSError, ValueError) as e:
+            raise WorkerProcessError(str(e))
+        if not line:
+            raise WorkerProcessError(f"worker exited with code {self.process.poll()}")
+        return json.loads(line)["results"]
+
+    def stop(self):
+        try:
+            self.process.stdin.close()
+            self.process.wait(STOP_TIMEOUT)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+
+    def kill(self):
+        try:
+            self.process.kill()
+        except OSError:
+            pass
+
+
+class ConverterProcessPool(object):
+    """
+    Long-lived converter processes that convert files in-process, so the cost
+    of starting a process is paid once per worker instead of once per file.
+    - converter: "module:function" called as function(src, dst) in the
+      workers. It raises NotImplementedError for files it cannot handle,
+      which come back as STATUS_FALLBACK for the caller to spawn iconvert.
+    - Requests carry a list of (src, dst) pairs, one file or a batch.
+    - A worker that dies is replaced on the next request.
+    ratHouConverter:convert is the production converter (a COP network, in
+    hython workers); stubIconvert:convert_from_env is a Houdini-free one for
+    tests and benchmarks.
+    """
+
+    def __init__(self, size, converter, python=None):
+        self.size = max(1, size)
+        self.converter = converter
+        self.python = python or default_python()
+        self._idle = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._stopped = False
+
+    def start(self):
+        # fail early when the converter cannot be imported here
+        load_converter(self.converter)
+        for _ in range(self.size):
+            self._idle.put(self._spawn())
+
+    def _spawn(self):
+        worker = _WorkerProcess(self.python, self.converter)
+        with self._lock:
+            self._workers.append(worker)
+        return worker
+
+    def _retire(self, worker):
+        worker.kill()
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+
+    def _failed(self, files, error):
+        return [{"status": STATUS_ERROR, "error": error, "seconds": 0.0, "cpu": None} for _ in files]
+
+    def convert_batch(self, files):
+        # [(src, dst)] -> [{"status", "error", "seconds", "cpu"}], in order
+        worker = None
+        while worker is None:
+            if self._stopped:
+                return self._failed(files, "converter pool stopped")
+            try:
+                worker = self._idle.get(timeout=0.2)
+            except queue.Empty:
+                continue
+        try:
+            results = worker.request([list(pair) for pair in files])
+        except WorkerProcessError as e:
+            self._retire(worker)
+            if not self._stopped:
+                worker = self._spawn()
+                self._idle.put(worker)
+            return self._failed(files, f"converter process failed: {e}")
+        self._idle.put(worker)
+        return results
+
+    def convert(self, src, dst):
+        return self.convert_batch([(src, dst)])[0]
+
+    def terminate(self):
+        # cancel: kill every worker, the callers get STATUS_ERROR back
+        self._stopped = True
+        with self._lock:
+            workers = list(self._workers)
+        for worker in workers:
+            worker.kill()
+
+    def stop(self):
+        self._stopped = True
+        with self._lock:
+            workers = list(self._workers)
+            self._workers = []
+        for worker in workers:
+            worker.stop()
+
+
+def serve(converter_spec, stdin=None, stdout=None):
+    # worker side: read {"files": [[src, dst], ...]} lines, answer {"results": [...]} lines
+    stdin = stdin or sys.stdin
+    protocol = stdout or sys.stdout
+    # anything the converter prints must not corrupt the protocol
+    sys.stdout = sys.stderr
+    convert = load_converter(converter_spec)
+    for line in stdin:
+        if not line.strip():
+            continue
+        results = []
+        for src, dst in json.loads(line)["files"]:
+            start = time.time()
+            cpu_start = time.process_time()
+            result = {"status": STATUS_OK, "error": None}
+            try:
+                convert(src, dst)
+            except NotImplementedError:
+                result["status"] = STATUS_FALLBACK
+            except Exception as e:
+                result = {"status": STATUS_ERROR, "error": f"{type(e).__name__}: {e}"}
+            result["seconds"] = time.time() - start
+            result["cpu"] = time.process_time() - cpu_start
+            results.append(result)
+        protocol.write(json.dumps({"results": results}) + "\n")
+        protocol.flush()
+
+
+if __name__ == "__main__":
+    serve(sys.argv[1])
@@ -1,27 +1,34 @@
-import hou
-import re
-import os
-
-# Get current .hip file path
-current_path = hou.hipFile.path()
-
-# If the scene is unsaved, ask for a location
-if current_path == "untitled.hip":
-    hou.ui.displayMessage("Veuillez d'abord enregistrer la scène.")
-else:
-    # Split path and extension
-    base, ext = os.path.splitext(current_path)
-    # Regex to find _v#### at the end
-    match = re.search(r'_v(\d{4})$', base)
-    if match:
-        # Increment version
-        version = int(match.group(1)) + 1
-        new_base = re.sub(r'_v\d{4}$', f'_v{version:04d}', base)
-    else:
-        # Add _v0001
-        new_base = base + "_v0001"
-    new_path = new_base + ext
+from versionAllocator import release, reserve_next_version
+
+
+def main():
+    # shelf entry point
+    import hou
+
+    # Get current .hip file path
+    current_path = hou.hipFile.path()
+
+    # If the scene is unsaved, ask for a location
+    if current_path == "untitled.hip":
+        hou.ui.displayMessage("Veuillez d'abord enregistrer la scène.")
+        return
+
+    # Next free _v#### of the scene (_v0001 if unversioned), after the versions saved
+    # by anyone in the folder, reserved so a colleague saving at the same time gets another one
+    try:
+        new_path = reserve_next_version(current_path)
+    except OSError as e:
+        hou.ui.displayMessage(f"Erreur lors de la réservation de la version : {str(e)}")
+        return
 
     # Save the scene with the new version
-    if new_path:
-        hou.hipFile.save(new_path)
\ No newline at end of file
+    try:
+        hou.hipFile.save(new_path)
+    except hou.OperationFailed as e:
+        release(new_path)
+        hou.ui.displayMessage(f"Erreur lors de la sauvegarde du fichier .hip : {str(e)}")
+
+
+# Old shelf definitions still exec() the file
+if __name__ == "__main__":
+    main()
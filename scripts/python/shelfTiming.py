@@ -0,0 +1,131 @@
+import argparse
+import compileall
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+# Shelf tools of toolbar/mke_utils.shelf and the module each one imports
+TOOLS = {
+    "Project Setup": "projectSetup",
+    "Save Up": "saveUp",
+    "Houdini VSC": "houdiniVSC",
+    "RAT Converter": "ui.ratConverterUI",
+}
+DEFAULT_RUNS = 5
+
+# Imports a module in a fresh interpreter and prints the time it took
+_IMPORT_SNIPPET = (
+    "import sys, time\n"
+    "sys.path.insert(0, {path!r})\n"
+    "start = time.perf_counter()\n"
+    "import {module}\n"
+    "print(time.perf_counter() - start)\n"
+)
+
+
+def module_file(module):
+    return os.path.join(SCRIPTS_DIR, *module.split(".")) + ".py"
+
+
+def exec_cost(module, runs=DEFAULT_RUNS):
+    # read + compile of the source, what exec(open(script).read()) paid on every click (running it aside)
+    path = module_file(module)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        with open(path, "r", encoding="utf-8") as f:
+            compile(f.read(), path, "exec")
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def import_cost(module, runs=DEFAULT_RUNS, bytecode=True, python=None):
+    """
+    Median time to import a module in a new interpreter, None with the error when it cannot be imported.
+    - bytecode: with the __pycache__ .pyc files, otherwise every module, the
+      standard library included, is compiled from source (an empty pycache_prefix
+      and no writing): the worst case of a read-only share without .pyc files.
+    """
+    cmd = [python or sys.executable]
+    if not bytecode:
+        cmd += ["-B", "-X", f"pycache_prefix={tempfile.mkdtemp(prefix='shelfTiming_')}"]
+    cmd += ["-c", _IMPORT_SNIPPET.format(path=SCRIPTS_DIR, module=module)]
+    times = []
+    for _ in range(runs):
+        process = subprocess.run(cmd, capture_output=True, text=True)
+        if process.returncode != 0:
+            lines = process.stderr.strip().splitlines()
+            return None, lines[-1] if lines else f"exit code {process.returncode}"
+        times.append(float(process.stdout.strip().splitlines()[-1]))
+    return statistics.median(times), None
+
+
+def reimport_cost(module):
+    # later clicks: the module is in sys.modules, None when it cannot be imported here
+    try:
+        __import__(module)
+    except Exception:
+        return None
+    start = time.perf_counter()
+    __import__(module)
+    return time.perf_counter() - start
+
+
+def measure(tools=None, runs=DEFAULT_RUNS, python=None):
+    results = {}
+    for label, module in (tools or TOOLS).items():
+        cached, error = import_cost(module, runs, True, python)
+        source, _ = import_cost(module, runs, False, python) if error is None else (None, None)
+        results[label] = {
+            "module": module,
+            "exec_compile": exec_cost(module, runs),
+            "import_pyc": cached,
+            "import_source": source,
+            "reimport": reimport_cost(module) if error is None else None,
+            "error": error,
+        }
+    return results
+
+
+def format_results(results):
+    def ms(value):
+        return "-" if value is None else f"{value * 1000:.1f}"
+    lines = [f"{'tool':<16}{'exec compile':>14}{'import .pyc':>14}{'import .py':>14}{'re-import':>12}   (ms)"]
+    for label, result in results.items():
+        line = (f"{label:<16}{ms(result['exec_compile']):>14}{ms(result['import_pyc']):>14}"
+                f"{ms(result['import_source']):>14}{ms(result['reimport']):>12}")
+        if result["error"]:
+            line += f"   {result['error']}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Startup cost of each MKE shelf tool: the old exec() compile, a first import "
+                    "with and without bytecode, and the later clicks. Run it with hython for the "
+                    "tools that need PySide2.")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="runs per measure, the median is shown")
+    parser.add_argument("--python", help="interpreter of the imports, this one by default")
+    parser.add_argument("--compile", action="store_true",
+                        help="write the .pyc files of scripts/python first, e.g. after deploying to a share")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.compile:
+        compileall.compile_dir(SCRIPTS_DIR, quiet=1)
+    results = measure(runs=args.runs, python=args.python)
+    print(json.dumps(results, indent=4) if args.json else format_results(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
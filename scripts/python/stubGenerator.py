@@ -0,0 +1,223 @@
+import builtins
+import importlib
+import inspect
+import keyword
+import os
+import re
+import sys
+
+# Dunder methods kept in the stubs, the others are inherited from object
+KEPT_DUNDERS = {
+    "__init__", "__call__", "__len__", "__iter__", "__next__", "__getitem__", "__setitem__", "__delitem__",
+    "__contains__", "__enter__", "__exit__", "__eq__", "__ne__", "__lt__", "__le__", "__gt__", "__ge__",
+    "__hash__", "__bool__", "__int__", "__float__", "__add__", "__sub__", "__mul__", "__truediv__",
+}
+# Values typed by their own type in the stubs, anything else is Any
+PLAIN_TYPES = (bool, int, float, complex, str, bytes)
+# Longest docstring written, the stubs of modules like hou stay a few MB
+MAX_DOC_LENGTH = 2000
+# Nested classes deeper than this are typed Any
+MAX_CLASS_DEPTH = 4
+_DOTTED_NAME = re.compile(r"^[A-Za-z_]\w*(\.[A-Za-z_]\w*)*$")
+
+
+def default_cache_dir():
+    # per user, outside any project: the stubs of a Houdini build are shared by all workspaces
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "mketools", "stubs")
+
+
+def module_version(module):
+    """
+    Version the stubs of a module are cached under:
+    hou.applicationVersionString(), __version__, or the Python version and
+    the module file's mtime for the standard library and other modules.
+    """
+    if module.__name__ == "hou" and hasattr(module, "applicationVersionString"):
+        return module.applicationVersionString()
+    version = getattr(module, "__version__", None)
+    if isinstance(version, str):
+        return version
+    version = f"py{sys.version_info[0]}.{sys.version_info[1]}"
+    path = getattr(module, "__file__", None)
+    if path and os.path.exists(path):
+        version += f"-{int(os.path.getmtime(path))}"
+    return version
+
+
+def stub_folder(cache_dir, modules):
+    # one folder per set of module versions, the IDE's stubPath
+    key = "_".join(f"{module.__name__}-{module_version(module)}" for module in modules)
+    return os.path.join(cache_dir, re.sub(r"[^\w.\-]+", "_", key))
+
+
+def write_stubs(module_names, cache_dir=None):
+    """
+    .pyi stubs of importable modules, generated once per module version.
+    Returns the folder holding them (for python.analysis.stubPath);
+    modules that cannot be imported raise ImportError.
+    """
+    modules = [importlib.import_module(name) for name in module_names]
+    folder = stub_folder(cache_dir or default_cache_dir(), modules)
+    os.makedirs(folder, exist_ok=True)
+    for module in modules:
+        path = os.path.join(folder, *module.__name__.split(".")) + ".pyi"
+        if os.path.exists(path):
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(generate_stub(module))
+        os.replace(tmp_path, path)
+    return folder
+
+
+# GENERATION
+def generate_stub(module):
+    """
+    Stub source of a module, from introspection only: works on compiled and
+    SWIG modules (hou) without their sources.
+    - Public functions, classes (methods, properties, nested classes) and constants.
+    - Signatures come from inspect, (*args, **kwargs) when unavailable;
+      defaults are written as ... and annotations are dropped.
+    - Docstrings are kept for the IDE's hover, cut to MAX_DOC_LENGTH.
+    """
+    lines = [f"# Stubs of {module.__name__} {module_version(module)}, generated by stubGenerator",
+             "from typing import Any", ""]
+    doc = _docstring(module, "")
+    if doc:
+        lines[1:1] = doc
+    for name, value in _members(module):
+        if inspect.isclass(value) and _defined_in(value, module):
+            lines.extend(_class_stub(name, value, module, "", 0))
+        elif _is_function(value):
+            lines.extend(_function_stub(name, value, "", method=False))
+        elif not inspect.ismodule(value) and not inspect.isclass(value):
+            lines.append(f"{name}: {_type_name(value, module)}")
+    return "\n".join(lines) + "\n"
+
+
+def _members(obj):
+    names = getattr(obj, "__all__", None) if inspect.ismodule(obj) else None
+    if not isinstance(names, (list, tuple)):
+        names = sorted(n for n in dir(obj) if not n.startswith("_") or n in KEPT_DUNDERS)
+    for name in names:
+        if not name.isidentifier() or keyword.iskeyword(name):
+            continue
+        try:
+            value = inspect.getattr_static(obj, name)
+        except AttributeError:
+            continue
+        yield name, value
+
+
+def _defined_in(cls, module):
+    # classes local to a function ("f.<locals>.C") cannot be referred to from the stub
+    return getattr(cls, "__module__", None) == module.__name__ and _DOTTED_NAME.match(cls.__qualname__) is not None
+
+
+def _is_function(value):
+    return inspect.isroutine(value) or isinstance(value, (staticmethod, classmethod))
+
+
+def _type_name(value, module):
+    value_type = type(value)
+    if value is None:
+        return "None"
+    if isinstance(value, PLAIN_TYPES):
+        return value_type.__name__
+    if _defined_in(value_type, module):
+        return value_type.__qualname__
+    return "Any"
+
+
+def _docstring(obj, indent):
+    doc = obj.__doc__ if isinstance(getattr(obj, "__doc__", None), str) else None
+    if not doc or not doc.strip():
+        return []
+    doc = inspect.cleandoc(doc)[:MAX_DOC_LENGTH].replace("\\", "\\\\").replace('"""', '\\"\\"\\"')
+    if doc.endswith('"'):
+        # would merge with the closing quotes
+        doc = doc[:-1] + '\\"'
+    return [f'{indent}"""{doc}"""'.replace("\n", "\n" + indent) if "\n" in doc else f'{indent}"""{doc}"""']
+
+
+def _class_stub(name, cls, module, indent, depth):
+    bases = [base.__qualname__ for base in cls.__bases__
+             if base is not object and (_defined_in(base, module) or getattr(builtins, base.__name__, None) is base)]
+    header = f"{indent}class {name}({', '.join(bases)}):" if bases else f"{indent}class {name}:"
+    body_indent = indent + "    "
+    body = _docstring(cls, body_indent)
+    for member_name, value in _members(cls):
+        if member_name not in cls.__dict__:
+            # inherited, written in the base class
+            continue
+        if inspect.isclass(value):
+            if depth < MAX_CLASS_DEPTH and _defined_in(value, module):
+                body.extend(_class_stub(member_name, value, module, body_indent, depth + 1))
+            else:
+                body.append(f"{body_indent}{member_name}: Any")
+        elif isinstance(value, property) or inspect.isdatadescriptor(value) or inspect.isgetsetdescriptor(value):
+            body.append(f"{body_indent}@property")
+            body.append(f"{body_indent}def {member_name}(self) -> Any: ...")
+        elif _is_function(value):
+            body.extend(_function_stub(member_name, value, body_indent, method=True))
+        else:
+            body.append(f"{body_indent}{member_name}: {_type_name(value, module)}")
+    return [header] + (body or [f"{body_indent}..."]) + ([""] if not indent else [])
+
+
+def _function_stub(name, value, indent, method):
+    decorator = None
+    if isinstance(value, staticmethod):
+        decorator, value, method = "@staticmethod", value.__func__, False
+    elif isinstance(value, classmethod) or inspect.ismethoddescriptor(value) and type(value).__name__ == "classmethod_descriptor":
+        decorator, value = "@classmethod", getattr(value, "__func__", value)
+    parameters = _parameters(value, method, "cls" if decorator == "@classmethod" else "self")
+    lines = [f"{indent}{decorator}"] if decorator else []
+    doc = _docstring(value, indent + "    ")
+    if doc:
+        lines.append(f"{indent}def {name}({parameters}) -> Any:")
+        lines.extend(doc)
+    else:
+        lines.append(f"{indent}def {name}({parameters}) -> Any: ...")
+    return lines
+
+
+def _parameters(function, method, first):
+    try:
+        signature = inspect.signature(function)
+    except (TypeError, ValueError):
+        return f"{first}, *args, **kwargs" if method else "*args, **kwargs"
+    parts, star_seen, positional_only, default_seen = [], False, False, False
+    for parameter in signature.parameters.values():
+        if not parameter.name.isidentifier() or keyword.iskeyword(parameter.name):
+            return f"{first}, *args, **kwargs" if method else "*args, **kwargs"
+        if parameter.kind == parameter.POSITIONAL_ONLY:
+            positional_only = True
+        elif positional_only:
+            parts.append("/")
+            positional_only = False
+        if parameter.kind == parameter.VAR_POSITIONAL:
+            parts.append(f"*{parameter.name}")
+            star_seen = True
+        elif parameter.kind == parameter.VAR_KEYWORD:
+            parts.append(f"**{parameter.name}")
+        else:
+            if parameter.kind == parameter.KEYWORD_ONLY and not star_seen:
+                parts.append("*")
+                star_seen = True
+            has_default = parameter.default is not parameter.empty
+            # some builtins declare a required parameter after an optional one, invalid in a def
+            default_seen = default_seen or has_default and not star_seen
+            default = "=..." if has_default or default_seen and not star_seen else ""
+            parts.append(f"{parameter.name}{default}")
+    if positional_only:
+        parts.append("/")
+    if method and (not parts or parts[0] in ("/", "*") or parts[0].startswith("*")):
+        # builtin methods do not always show their self
+        parts.insert(0, first)
+    return ", ".join(parts)
@@ -0,0 +1,73 @@
+import argparse
+import fnmatch
+import os
+import random
+import shutil
+import sys
+import time
+
+
+def burn_cpu(seconds):
+    end = time.process_time() + seconds
+    while time.process_time() < end:
+        pass
+
+
+def convert(src, dst, latency=0.0, cpu=0.0, fail_rate=0.0, fail_pattern=None):
+    """
+    Stand-in for iconvert: copies src to dst after simulating the cost of a
+    conversion, so the converter can be exercised without Houdini.
+    - latency: seconds spent waiting (process start, disk, network).
+    - cpu: seconds of busy CPU work.
+    - fail_rate: probability of failing with an error.
+    - fail_pattern: glob of the source names that always fail, for tests.
+    """
+    if latency:
+        time.sleep(latency)
+    if cpu:
+        burn_cpu(cpu)
+    if fail_pattern and fnmatch.fnmatch(os.path.basename(src), fail_pattern):
+        raise RuntimeError(f"stub failure on {src}")
+    if fail_rate and random.random() < fail_rate:
+        raise RuntimeError(f"stub failure on {src}")
+    tmp_path = f"{dst}.stubtmp"
+    shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dst)
+
+
+def convert_from_env(src, dst):
+    # convert() with the STUB_ICONVERT_* settings, for ratWorkerPool ("stubIconvert:convert_from_env")
+    settings = env_settings()
+    convert(src, dst, settings["latency"], settings["cpu"], settings["fail_rate"], settings["fail_pattern"])
+
+
+def env_settings():
+    return {
+        "latency": float(os.environ.get("STUB_ICONVERT_LATENCY", 0.0)),
+        "cpu": float(os.environ.get("STUB_ICONVERT_CPU", 0.0)),
+        "fail_rate": float(os.environ.get("STUB_ICONVERT_FAIL_RATE", 0.0)),
+        "fail_pattern": os.environ.get("STUB_ICONVERT_FAIL_PATTERN"),
+    }
+
+
+def main(argv=None):
+    # same call shape as iconvert: [options] infile outfile
+    parser = argparse.ArgumentParser(prog="stubIconvert", description="Fake iconvert for tests and benchmarks.")
+    settings = env_settings()
+    parser.add_argument("--latency", type=float, default=settings["latency"])
+    parser.add_argument("--cpu", type=float, default=settings["cpu"])
+    parser.add_argument("--fail-rate", type=float, default=settings["fail_rate"])
+    parser.add_argument("--fail-pattern", default=settings["fail_pattern"])
+    parser.add_argument("infile")
+    parser.add_argument("outfile")
+    args, _ = parser.parse_known_args(argv)
+    try:
+        convert(args.infile, args.outfile, args.latency, args.cpu, args.fail_rate, args.fail_pattern)
+    except (OSError, RuntimeError) as e:
+        sys.stderr.write(f"{e}\n")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,7 +4,23 @@ import sys
 from PySide2 import QtWidgets, QtCore, QtGui
 
 # Import the backend worker logic from the other file
-from worker import RatConversionWorker
+from ratConverter import RatConversionWorker, RatPlanWorker
+from ratFailures import FailureLog
+from ratPlanner import NEW, SKIPPED, STALE, UP_TO_DATE, format_plan
+from ratProgress import format_stats
+from ratSceneTextures import HouParmSource, collect_scene_textures, scene_engine_options
+from ratTargets import create_target
+
+# Longest time closing the window blocks on a cancelled conversion
+CLOSE_TIMEOUT_MS = 5000
+# Upper bound of the "Auto" thread count, I/O bound jobs benefit from more threads than cores
+AUTO_MAX_WORKERS = (os.cpu_count() or 1) * 2
+# Texture scope choices: the whole folder, or the textures of the open scene first / only
+SCOPE_FOLDER = "Whole Folder"
+SCOPE_SCENE_FIRST = "Scene Textures First"
+SCOPE_SCENE_ONLY = "Scene Textures Only"
+# Output checkboxes: (label, ratTargets name, checked by default)
+OUTPUT_CHOICES = [("RAT", "rat", True), ("TX", "tx", False), ("Proxy JPG", "proxy", False)]
 
 # STYLESHEET gemini
 UI_STYLESHEET = """
@@ -97,6 +113,10 @@ class RatGeneratorUI(QtWidgets.QDialog):
         self.setMinimumSize(600, 250)
         self.thread = None
         self.worker = None
+        # dry run shown before a conversion starts, and the options it was made with
+        self.plan_thread = None
+        self.planner = None
+        self.pending_options = None
 
         self.main_layout = QtWidgets.QVBoxLayout(self)
         self.main_layout.setContentsMargins(20, 20, 20, 20)
@@ -112,16 +132,34 @@ class RatGeneratorUI(QtWidgets.QDialog):
         options_layout = QtWidgets.QHBoxLayout()
         self.subfolders_checkbox = QtWidgets.QCheckBox("Search in Subfolders")
         self.subfolders_checkbox.setChecked(True)
+        self.incremental_checkbox = QtWidgets.QCheckBox("Skip Up-to-date RATs")
+        self.incremental_checkbox.setChecked(True)
+        self.scope_combo = QtWidgets.QComboBox()
+        self.scope_combo.addItems([SCOPE_FOLDER, SCOPE_SCENE_FIRST, SCOPE_SCENE_ONLY])
         self.batch_label = QtWidgets.QLabel("Threads:")
         self.batch_spinbox = QtWidgets.QSpinBox()
-        self.batch_spinbox.setMinimum(1)
+        # 0 shows as "Auto": the worker tunes the thread count while it runs
+        self.batch_spinbox.setMinimum(0)
+        self.batch_spinbox.setSpecialValueText("Auto")
         self.batch_spinbox.setValue(os.cpu_count() // 2 or 1)
         self.batch_spinbox.setMaximum(os.cpu_count() or 1)
         options_layout.addWidget(self.subfolders_checkbox)
+        options_layout.addWidget(self.incremental_checkbox)
+        options_layout.addWidget(self.scope_combo)
         options_layout.addStretch()
         options_layout.addWidget(self.batch_label)
         options_layout.addWidget(self.batch_spinbox)
         
+        outputs_layout = QtWidgets.QHBoxLayout()
+        outputs_layout.addWidget(QtWidgets.QLabel("Outputs:"))
+        self.output_checkboxes = {}
+        for label, name, checked in OUTPUT_CHOICES:
+            checkbox = QtWidgets.QCheckBox(label)
+            checkbox.setChecked(checked)
+            self.output_checkboxes[name] = checkbox
+            outputs_layout.addWidget(checkbox)
+        outputs_layout.addStretch()
+
         self.progress_bar = QtWidgets.QProgressBar()
         self.progress_bar.setVisible(False)
         self.status_label = QtWidgets.QLabel("Ready to start.")
@@ -130,16 +168,23 @@ class RatGeneratorUI(QtWidgets.QDialog):
         
         self.generate_button = QtWidgets.QPushButton("Generate RATs")
         self.generate_button.setObjectName("generate_button")
+        # converts only the files that failed in the previous runs on the folder
+        self.rerun_button = QtWidgets.QPushButton("Rerun Failed")
+        buttons_layout = QtWidgets.QHBoxLayout()
+        buttons_layout.addWidget(self.generate_button, 1)
+        buttons_layout.addWidget(self.rerun_button)
         
         self.main_layout.addLayout(dir_layout)
         self.main_layout.addLayout(options_layout)
+        self.main_layout.addLayout(outputs_layout)
         self.main_layout.addSpacing(10)
         self.main_layout.addWidget(self.status_label)
         self.main_layout.addWidget(self.progress_bar)
-        self.main_layout.addWidget(self.generate_button)
+        self.main_layout.addLayout(buttons_layout)
 
         self.browse_button.clicked.connect(self.browse_for_directory)
         self.generate_button.clicked.connect(self.start_conversion)
+        self.rerun_button.clicked.connect(lambda: self.start_conversion(failed_only=True))
         
     def browse_for_directory(self):
         # Directory
@@ -147,8 +192,9 @@ class RatGeneratorUI(QtWidgets.QDialog):
         if directory:
             self.dir_line_edit.setText(directory)
 
-    def start_conversion(self):
-        # start worker 
+    def start_conversion(self, failed_only=False):
+        # plan the conversion (on the previously failed files only with failed_only),
+        # it starts once the plan is confirmed
         folder = self.dir_line_edit.text()
         if not os.path.isdir(folder):
             # Assumes 'hou' module is available in the execution environment (e.g., Houdini)
@@ -158,35 +204,141 @@ class RatGeneratorUI(QtWidgets.QDialog):
             except ImportError:
                 print("Error: Please select a valid directory first.")
             return
+        targets = [create_target(name) for name, checkbox in self.output_checkboxes.items() if checkbox.isChecked()]
+        if not targets:
+            self.status_label.setText("Select at least one output.")
+            return
+        if failed_only:
+            if not FailureLog(folder).sources():
+                self.status_label.setText("No failed files recorded for this folder.")
+                return
+            scene_options = {}
+        else:
+            scene_options = self.scene_options(folder)
+            if scene_options is None:
+                return
 
+        autotune = self.batch_spinbox.value() == 0
+        self.pending_options = dict(
+            folder=folder,
+            use_subfolders=self.subfolders_checkbox.isChecked(),
+            max_workers=AUTO_MAX_WORKERS if autotune else self.batch_spinbox.value(),
+            incremental=self.incremental_checkbox.isChecked(),
+            autotune=autotune,
+            targets=targets,
+            failed_only=failed_only,
+            **scene_options
+        )
+
+        # the scan runs in a thread, large folders on a share take a while: it can be cancelled
+        self.set_ui_enabled(False)
+        self.set_cancel_action(self.cancel_planning)
+        self.status_label.setText("Planning the conversion...")
+        self.plan_thread = QtCore.QThread()
+        self.planner = RatPlanWorker(**self.pending_options)
+        self.planner.moveToThread(self.plan_thread)
+        self.planner.finished.connect(self.on_plan_ready)
+        self.plan_thread.started.connect(self.planner.run)
+        self.plan_thread.start()
+
+    @QtCore.Slot(dict, list)
+    def on_plan_ready(self, summary, planned):
+        # show what the conversion will do and how long it should take, then start it if confirmed
+        if self.pending_options is None:
+            # the window was closed while planning
+            return
+        cancelled = self.planner.is_cancelled
+        self.plan_thread.quit()
+        self.plan_thread.wait()
+        self.plan_thread = None
+        self.planner = None
+        options, self.pending_options = self.pending_options, None
+        self.set_ui_enabled(True)
+        self.set_generate_action()
+        if cancelled:
+            # a partial plan, nothing to start from
+            self.status_label.setText("Planning cancelled.")
+            return
+        counts = summary["counts"]
+        if not counts[NEW] and not counts[STALE]:
+            self.status_label.setText(f"Nothing to convert: {counts[UP_TO_DATE]} up to date, "
+                                      f"{counts[SKIPPED]} skipped.")
+            return
+        answer = QtWidgets.QMessageBox.question(
+            self, "Conversion Plan", f"{format_plan(summary)}\n\nStart the conversion?",
+            QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No)
+        if answer != QtWidgets.QMessageBox.Yes:
+            self.status_label.setText("Ready to start.")
+            return
+        # the planned outputs only, with the plan's stats: the folder is not scanned a second time
+        self.run_conversion(dict(options, planned=planned, failed_only=False))
+
+    def run_conversion(self, options):
+        # start worker
         self.set_ui_enabled(False)
         self.progress_bar.setVisible(True)
         self.progress_bar.setValue(0)
-        self.generate_button.setText("Cancel")
-        self.generate_button.clicked.disconnect()
-        self.generate_button.clicked.connect(self.cancel_conversion)
+        self.set_cancel_action(self.cancel_conversion)
 
         # multithread assignment
         self.thread = QtCore.QThread()
-        self.worker = RatConversionWorker( # This class is now imported from worker.py
-            folder=folder,
-            use_subfolders=self.subfolders_checkbox.isChecked(),
-            max_workers=self.batch_spinbox.value()
-        )
+        self.worker = RatConversionWorker(**options)
         self.worker.moveToThread(self.thread)
 
+        self.worker.signals.scan_progress.connect(self.on_scan_progress)
         self.worker.signals.scan_complete.connect(self.on_scan_complete)
         self.worker.signals.progress_update.connect(self.update_progress)
         self.worker.signals.status_update.connect(self.update_status)
+        self.worker.signals.stats_update.connect(self.update_stats)
         self.worker.signals.finished.connect(self.on_conversion_finished)
         self.thread.started.connect(self.worker.run)
 
         self.thread.start()
 
+    def scene_options(self, folder):
+        # engine options of the chosen scope, None when there is nothing to convert
+        scope = self.scope_combo.currentText()
+        if scope == SCOPE_FOLDER:
+            return {}
+        try:
+            # hou is only safe from this (the main) thread
+            textures = collect_scene_textures(HouParmSource(), folder)
+        except ImportError:
+            self.status_label.setText("Scene textures need a Houdini session.")
+            return None
+        for owner, path in textures.unresolved:
+            print(f"Texture not found: {path} ({owner})")
+        if textures.outside:
+            print(f"{len(textures.outside)} scene textures are outside {folder} and are not converted.")
+        if not textures.files and scope == SCOPE_SCENE_ONLY:
+            self.status_label.setText("The scene references no texture in this folder.")
+            return None
+        return scene_engine_options(textures, include_rest=scope == SCOPE_SCENE_FIRST)
+
+    def set_cancel_action(self, cancel):
+        # the generate button cancels what is running
+        self.generate_button.setText("Cancel")
+        self.generate_button.setEnabled(True)
+        self.generate_button.clicked.disconnect()
+        self.generate_button.clicked.connect(cancel)
+
+    def set_generate_action(self):
+        self.generate_button.setText("Generate RATs")
+        self.generate_button.setEnabled(True)
+        self.generate_button.clicked.disconnect()
+        self.generate_button.clicked.connect(self.start_conversion)
+
+    def cancel_planning(self):
+        # the plan stops at the next file, on_plan_ready then restores the window
+        self.status_label.setText("Cancelling...")
+        if self.planner:
+            self.planner.cancel()
+        self.generate_button.setEnabled(False)
+
     def cancel_conversion(self):
         self.status_label.setText("Cancelling...")
         if self.worker:
-            self.worker.is_cancelled = True
+            self.worker.cancel()
         self.generate_button.setEnabled(False)
 
     def on_conversion_finished(self):
@@ -200,7 +352,18 @@ class RatGeneratorUI(QtWidgets.QDialog):
         self.dir_line_edit.setEnabled(is_enabled)
         self.browse_button.setEnabled(is_enabled)
         self.subfolders_checkbox.setEnabled(is_enabled)
+        self.incremental_checkbox.setEnabled(is_enabled)
+        self.scope_combo.setEnabled(is_enabled)
+        for checkbox in self.output_checkboxes.values():
+            checkbox.setEnabled(is_enabled)
         self.batch_spinbox.setEnabled(is_enabled)
+        self.rerun_button.setEnabled(is_enabled)
+
+    @QtCore.Slot(int)
+    def on_scan_progress(self, queued_files):
+        # Grow the progress bar while the scan is still running
+        self.progress_bar.setMaximum(max(queued_files, 1))
+        self.status_label.setText(f"Still scanning... {queued_files} files queued so far.")
 
     @QtCore.Slot(int)
     def on_scan_complete(self, total_files):
@@ -216,15 +379,29 @@ class RatGeneratorUI(QtWidgets.QDialog):
         # progress set value
         self.progress_bar.setValue(current_value)
 
+    @QtCore.Slot(dict)
+    def update_stats(self, stats):
+        # throughput, ETA, active workers and failures, refreshed at the worker's fixed rate
+        if stats["done"] or not stats["scanning"]:
+            self.status_label.setText(format_stats(stats))
+
     @QtCore.Slot(str)
     def update_status(self, text):
         self.status_label.setText(text)
 
     def closeEvent(self, event):
+        if self.plan_thread and self.plan_thread.isRunning():
+            # the plan queued after closing must not show its dialog or start a conversion
+            self.planner.finished.disconnect(self.on_plan_ready)
+            self.pending_options = None
+            self.planner.cancel()
+            self.plan_thread.quit()
+            self.plan_thread.wait(CLOSE_TIMEOUT_MS)
         if self.thread and self.thread.isRunning():
             self.cancel_conversion()
             self.thread.quit()
-            self.thread.wait()
+            # cancel() terminates iconvert, so the worker stops within the grace period
+            self.thread.wait(CLOSE_TIMEOUT_MS)
         event.accept()
 
 # MAIN - This block runs the UI.
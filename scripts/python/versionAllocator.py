@@ -0,0 +1,147 @@
+import os
+import re
+import threading
+import time
+
+from dirCrawler import MTIME_GRANULARITY
+
+# scene_v0012.hip -> ("scene", 12, ".hip"), at least 4 digits are written
+VERSION_PATTERN = re.compile(r"^(?P<stem>.*)_v(?P<version>\d+)$")
+VERSION_DIGITS = 4
+# Versions tried past a taken one before giving up on a reservation
+MAX_RESERVE_ATTEMPTS = 100
+
+
+def split_version(path):
+    # "/x/scene_v0012.hip" -> ("/x/scene", 12, ".hip"), version is None when unversioned
+    base, ext = os.path.splitext(path)
+    match = VERSION_PATTERN.match(base)
+    if match:
+        return match.group("stem"), int(match.group("version")), ext
+    return base, None, ext
+
+
+def version_path(stem, version, ext):
+    return f"{stem}_v{version:0{VERSION_DIGITS}d}{ext}"
+
+
+class VersionIndex(object):
+    """
+    Versions of every scene of a folder, from one listing.
+    - Indexed by scene name (the file name without _vNNNN and extension),
+      all extensions share the numbers: scene_v0003.hiplc takes v0003 of
+      scene_v0003.hip as well.
+    - latest() and next_version() are dict lookups.
+    """
+
+    def __init__(self, folder, mtime=None):
+        self.folder = folder
+        self.mtime = mtime
+        self.scanned_at = time.time()
+        # normcased scene name -> (highest version, its file name)
+        self._latest = {}
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        self.add(entry.name)
+        except OSError:
+            pass
+
+    def add(self, name):
+        stem, version, _ = split_version(name)
+        if version is None:
+            return
+        key = os.path.normcase(stem)
+        if version > self._latest.get(key, (0, None))[0]:
+            self._latest[key] = (version, name)
+
+    def latest(self, stem):
+        # (version, file name) of the highest version of a scene, None when it has none
+        return self._latest.get(os.path.normcase(stem))
+
+    def next_version(self, stem):
+        latest = self.latest(stem)
+        return latest[0] + 1 if latest else 1
+
+
+# CACHE
+_indexes = {}
+_lock = threading.Lock()
+
+
+def folder_index(folder):
+    """
+    Cached VersionIndex of a folder, listed again only when the folder's
+    mtime changed (a file was added, removed or renamed) or when the cached
+    listing is within MTIME_GRANULARITY of that mtime.
+    """
+    folder = os.path.abspath(folder)
+    try:
+        mtime = os.stat(folder).st_mtime
+    except OSError:
+        return VersionIndex(folder)
+    with _lock:
+        index = _indexes.get(folder)
+        if index is not None and index.mtime == mtime and index.scanned_at - mtime > MTIME_GRANULARITY:
+            return index
+    index = VersionIndex(folder, mtime)
+    with _lock:
+        _indexes[folder] = index
+    return index
+
+
+def latest_version(path):
+    """
+    Highest saved version of the scene of path (any version of it, or its
+    unversioned name): (version, full path), None when it has none.
+    """
+    stem, _, _ = split_version(path)
+    folder = os.path.dirname(os.path.abspath(path))
+    latest = folder_index(folder).latest(os.path.basename(stem))
+    if latest is None:
+        return None
+    return latest[0], os.path.join(folder, latest[1])
+
+
+def next_version_path(path):
+    # path of the next free version, not reserved: another machine may take it first
+    stem, _, ext = split_version(os.path.abspath(path))
+    index = folder_index(os.path.dirname(stem))
+    return version_path(stem, index.next_version(os.path.basename(stem)), ext)
+
+
+def reserve_next_version(path):
+    """
+    Reserve the next free version of the scene of path and return its path.
+    The version file is created empty with an exclusive create (O_EXCL,
+    honoured by SMB and NFSv3+), so two machines saving at once get two
+    different versions; a version taken meanwhile is skipped. The caller
+    saves over the reserved file, or calls release() if the save fails.
+    """
+    stem, _, ext = split_version(os.path.abspath(path))
+    folder, name = os.path.split(stem)
+    index = folder_index(folder)
+    version = index.next_version(name)
+    for _ in range(MAX_RESERVE_ATTEMPTS):
+        new_path = version_path(stem, version, ext)
+        try:
+            fd = os.open(new_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            # saved by someone after the listing
+            version += 1
+            continue
+        os.close(fd)
+        with _lock:
+            index.add(os.path.basename(new_path))
+        return new_path
+    raise OSError(f"No free version of {name} found after v{version - 1:0{VERSION_DIGITS}d}")
+
+
+def release(path):
+    # give back a reserved version that was not saved, only while the file is still the empty placeholder
+    try:
+        if os.path.getsize(path) == 0:
+            os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,156 @@
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts", "python")
+sys.path.insert(0, SCRIPTS_DIR)
+
+from ratDistributed import (LEASE_DIR_NAME, STATUS_DIR_NAME, STATUS_FILE_NAME, LeaseClaimer,  # noqa: E402
+                            aggregate_status)
+from ratFailures import FAILURES_FILE_NAME, UNKNOWN  # noqa: E402
+
+NODES = 3
+FILES = 60
+# Sources the stub converter always fails on
+FAILING = ("bad_1.png", "bad_2.png")
+NODE_TIMEOUT = 120
+
+
+class DistributedConversionTest(unittest.TestCase):
+    """
+    Several ratEngine processes started on one temp root with the stub
+    converter, as farm nodes sharing a texture share would be.
+    """
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="ratDistributed_")
+        self.sources = []
+        for i in range(FILES):
+            self.sources.append(self._write(f"img_{i:03d}.png", os.urandom(512 + i)))
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _write(self, name, data):
+        path = os.path.join(self.root, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def run_nodes(self, count=NODES):
+        # (exit code, JSON summary) of each node, all started at once
+        stub = [sys.executable, os.path.join(SCRIPTS_DIR, "stubIconvert.py"), "--latency", "0.02",
+                "--fail-pattern", "bad_*"]
+        processes = []
+        for node in range(count):
+            cmd = [sys.executable, "-m", "ratEngine", self.root, "--distributed", "--node-id", f"node{node}",
+                   "-j", "2", "--retries", "0", "--json", "--iconvert",
+                   subprocess.list2cmdline(stub) if os.name == "nt" else shlex.join(stub)]
+            processes.append(subprocess.Popen(cmd, cwd=SCRIPTS_DIR, stdout=subprocess.PIPE,
+                                              stderr=subprocess.DEVNULL, text=True))
+        results = []
+        for process in processes:
+            stdout, _ = process.communicate(timeout=NODE_TIMEOUT)
+            results.append((process.returncode, json.loads(stdout)))
+        return results
+
+    def outputs(self):
+        return sorted(name for name in os.listdir(self.root) if name.endswith(".rat"))
+
+    def test_each_file_converted_once(self):
+        results = self.run_nodes()
+        self.assertEqual([code for code, _ in results], [0] * NODES)
+        summaries = [summary for _, summary in results]
+        self.assertEqual(sum(summary["converted"] for summary in summaries), FILES)
+        for summary in summaries:
+            self.assertEqual(summary["failed"], 0)
+            self.assertEqual(summary["errors"], [])
+            # what a node did not convert was handled by another one
+            self.assertEqual(summary["converted"] + summary["elsewhere"], summary["queued"])
+        self.assertEqual(len(self.outputs()), FILES)
+        for source in self.sources:
+            with open(source, "rb") as src, open(source[:-4] + ".rat", "rb") as dst:
+                self.assertEqual(src.read(), dst.read())
+
+        self.assertEqual(os.listdir(os.path.join(self.root, LEASE_DIR_NAME)), [])
+        self.assertFalse(os.path.exists(os.path.join(self.root, FAILURES_FILE_NAME)))
+        status_names = sorted(os.listdir(os.path.join(self.root, STATUS_DIR_NAME)))
+        self.assertEqual(status_names, [f"node{node}.json" for node in range(NODES)])
+        for name in status_names:
+            with open(os.path.join(self.root, STATUS_DIR_NAME, name)) as f:
+                self.assertTrue(json.load(f)["finished"])
+        self.assertTrue(os.path.exists(os.path.join(self.root, STATUS_FILE_NAME)))
+        status = aggregate_status(self.root)
+        self.assertEqual(status["done"], FILES)
+        self.assertEqual(status["running_nodes"], 0)
+
+        # the manifest written by every node makes the next run a no-op
+        code, summary = self.run_nodes(count=1)[0]
+        self.assertEqual(code, 0)
+        self.assertEqual(summary["converted"], 0)
+        self.assertEqual(summary["skipped"], FILES)
+
+    def test_failures_logged_once(self):
+        for name in FAILING:
+            self._write(name, b"broken")
+        results = self.run_nodes()
+        summaries = [summary for _, summary in results]
+        # only the nodes that got a failing file report failures
+        for code, summary in results:
+            self.assertEqual(code, 1 if summary["failed"] else 0)
+            self.assertEqual(summary["errors"], [])
+        self.assertEqual(sum(summary["failed"] for summary in summaries), len(FAILING))
+        self.assertEqual(sum(summary["converted"] for summary in summaries), FILES)
+        self.assertEqual(len(self.outputs()), FILES)
+
+        # every node merged its failures into the one file
+        with open(os.path.join(self.root, FAILURES_FILE_NAME)) as f:
+            failures = json.load(f)
+        self.assertEqual(sorted(os.path.basename(entry["source"]) for entry in failures.values()), list(FAILING))
+        for output_path, entry in failures.items():
+            self.assertEqual(output_path, entry["source"][:-4] + ".rat")
+            self.assertEqual(entry["kind"], UNKNOWN)
+            self.assertEqual(entry["target"], "rat")
+        self.assertFalse(os.path.exists(os.path.join(self.root, FAILURES_FILE_NAME + ".lock")))
+        self.assertEqual(aggregate_status(self.root)["failed"], len(FAILING))
+
+    def test_expired_lease_taken_over_once(self):
+        path = self.sources[0]
+        dead, node_a, node_b = (LeaseClaimer(self.root, node, lease_ttl=60) for node in ("dead", "nodeA", "nodeB"))
+        self.assertTrue(dead.claim(path))
+        lease_path = dead._lease_path(path)
+        old = time.time() - 120
+        os.utime(lease_path, (old, old))
+
+        is_expired = node_b._is_expired
+
+        def stale_check(checked_path):
+            expired = is_expired(checked_path)
+            if checked_path == lease_path:
+                # node A takes the lease over between node B's check and its rename
+                self.assertTrue(node_a.claim(path))
+            return expired
+
+        node_b._is_expired = stale_check
+        self.assertFalse(node_b.claim(path))
+        node_b._is_expired = is_expired
+        self.assertEqual((node_a.expired_count, node_b.expired_count), (1, 0))
+        # node A's lease is back in place, no tombstone left
+        self.assertEqual(os.listdir(node_a.lease_dir), [os.path.basename(lease_path)])
+        with open(lease_path) as f:
+            self.assertEqual(json.load(f)["node"], "nodeA")
+        self.assertFalse(node_b.claim(path))
+
+        node_a.release(path)
+        self.assertEqual(os.listdir(node_a.lease_dir), [])
+        self.assertTrue(node_b.claim(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
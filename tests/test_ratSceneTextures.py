@@ -0,0 +1,103 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts", "python"))
+
+from ratSceneTextures import FakeParmSource, collect_scene_textures, scene_engine_options  # noqa: E402
+
+
+class CollectSceneTexturesTest(unittest.TestCase):
+    """
+    collect_scene_textures on a temp job folder, with the references of a
+    scene given by FakeParmSource instead of hou.
+    """
+
+    def setUp(self):
+        self.job = tempfile.mkdtemp(prefix="ratSceneTextures_")
+        self.textures = os.path.join(self.job, "tex")
+        self.hip = os.path.join(self.job, "hip")
+        os.makedirs(self.textures)
+        os.makedirs(self.hip)
+
+    def tearDown(self):
+        shutil.rmtree(self.job, ignore_errors=True)
+
+    def touch(self, *parts):
+        path = os.path.join(*parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, "wb").close()
+        return path
+
+    def collect(self, references, folder=None):
+        source = FakeParmSource(references, {"HIP": self.hip, "JOB": self.job})
+        return collect_scene_textures(source, folder)
+
+    def test_variables_expanded(self):
+        wood = self.touch(self.textures, "wood.exr")
+        plate = self.touch(self.hip, "plate.jpg")
+        result = self.collect([("/obj/geo/shop/diffuse", "$JOB/tex/wood.exr"),
+                               ("/img/comp/file1/filename1", "${HIP}/plate.jpg")])
+        self.assertEqual(result.files, [wood, plate])
+        self.assertEqual(result.unresolved, [])
+
+    def test_environment_after_scene_variables(self):
+        stone = self.touch(self.textures, "stone.png")
+        os.environ["RATSCENE_TEST_TEX"] = self.textures
+        try:
+            result = self.collect([("/mat/stone/basecolor", "$RATSCENE_TEST_TEX/stone.png")])
+        finally:
+            del os.environ["RATSCENE_TEST_TEX"]
+        self.assertEqual(result.files, [stone])
+
+    def test_udim_tokens(self):
+        tiles = [self.touch(self.textures, f"skin.{tile}.exr") for tile in (1001, 1002, 1011)]
+        # not tiles: wrong number and another name
+        self.touch(self.textures, "skin.0999.exr")
+        self.touch(self.textures, "skin_spec.1001.exr")
+        for token in ("<UDIM>", "%(UDIM)d"):
+            result = self.collect([("/mat/skin/basecolor", f"$JOB/tex/skin.{token}.exr")])
+            self.assertEqual(result.files, tiles, token)
+
+    def test_rat_reference_maps_to_source(self):
+        source = self.touch(self.textures, "metal.tif")
+        self.touch(self.textures, "metal.rat")
+        tiles = [self.touch(self.textures, f"cloth.{tile}.png") for tile in (1001, 1002)]
+        result = self.collect([("/mat/metal/rough", "$JOB/tex/metal.rat"),
+                               ("/mat/cloth/basecolor", "$JOB/tex/cloth.<UDIM>.rat")])
+        self.assertEqual(result.files, [source] + tiles)
+
+    def test_duplicates_and_other_files_ignored(self):
+        wood = self.touch(self.textures, "wood.exr")
+        self.touch(self.textures, "wood.rat")
+        result = self.collect([("/mat/a/basecolor", "$JOB/tex/wood.exr"),
+                               ("/mat/b/basecolor", "$JOB/tex/wood.rat"),
+                               ("/obj/geo/file1/file", "$JOB/geo/tree.bgeo.sc")])
+        self.assertEqual(result.files, [wood])
+        self.assertEqual(result.unresolved, [])
+
+    def test_outside_and_unresolved(self):
+        inside = self.touch(self.textures, "wood.exr")
+        outside = self.touch(self.hip, "plate.jpg")
+        result = self.collect([("/mat/wood/basecolor", "$JOB/tex/wood.exr"),
+                               ("/img/comp/file1/filename1", "$HIP/plate.jpg"),
+                               ("/mat/gone/basecolor", "$JOB/tex/missing.exr"),
+                               ("/mat/tiles/basecolor", "$JOB/tex/none.<UDIM>.exr"),
+                               ("/mat/unset/basecolor", "$RATSCENE_UNSET_VARIABLE/a.exr")],
+                              folder=self.textures)
+        self.assertEqual(result.files, [inside])
+        self.assertEqual(result.outside, [outside])
+        self.assertEqual(result.unresolved, [("/mat/gone/basecolor", "$JOB/tex/missing.exr"),
+                                             ("/mat/tiles/basecolor", "$JOB/tex/none.<UDIM>.exr"),
+                                             ("/mat/unset/basecolor", "$RATSCENE_UNSET_VARIABLE/a.exr")])
+
+    def test_engine_options(self):
+        wood = self.touch(self.textures, "wood.exr")
+        options = scene_engine_options(self.collect([("/mat/wood/basecolor", "$JOB/tex/wood.exr")]), True)
+        self.assertEqual(options, {"files": [wood], "scan_rest": True, "priority_paths": [wood]})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts", "python"))
+
+from ratStaging import ScratchStager  # noqa: E402
+from ratTargets import create_target  # noqa: E402
+
+
+class ScratchStagerTest(unittest.TestCase):
+    """
+    ScratchStager on a temp root and a temp scratch folder.
+    """
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="ratStaging_root_")
+        self.scratch = tempfile.mkdtemp(prefix="ratStaging_scratch_")
+        self.stager = ScratchStager(self.root, self.scratch, log=lambda message: None)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+        shutil.rmtree(self.scratch, ignore_errors=True)
+
+    def test_one_source_for_two_targets(self):
+        source = os.path.join(self.root, "wood.png")
+        data = os.urandom(4096)
+        with open(source, "wb") as f:
+            f.write(data)
+        staged = [self.stager.stage_in(source, create_target(name).output_path(source)) for name in ("rat", "tx")]
+        (rat_src, rat_out), (tx_src, tx_out) = staged
+        self.assertNotEqual(rat_src, tx_src)
+        self.assertNotEqual(rat_out, tx_out)
+        self.assertEqual(len({rat_src, tx_src, rat_out, tx_out}), 4)
+        for local_src, _ in staged:
+            # the converter picks the input format from the extension
+            self.assertTrue(local_src.endswith(".png"))
+            self.assertTrue(local_src.startswith(self.stager.folder))
+
+        # the rat target finishing first leaves the tx copy whole
+        self.stager.discard(rat_src)
+        self.assertFalse(os.path.exists(rat_src))
+        with open(tx_src, "rb") as f:
+            self.assertEqual(f.read(), data)
+        # staging again for one target does not truncate the other's copy
+        self.stager.stage_in(source, rat_out)
+        with open(tx_src, "rb") as f:
+            self.assertEqual(f.read(), data)
+
+    def test_commit_writes_back(self):
+        source = os.path.join(self.root, "stone.exr")
+        with open(source, "wb") as f:
+            f.write(b"exr")
+        output_path = create_target("rat").output_path(source)
+        local_src, local_out = self.stager.stage_in(source, output_path)
+        with open(local_out, "wb") as f:
+            f.write(b"rat")
+        self.stager.discard(local_src)
+        self.stager.commit(source, local_out, output_path, 0.1, "rat")
+        self.stager.close()
+        with open(output_path, "rb") as f:
+            self.assertEqual(f.read(), b"rat")
+        self.assertEqual(self.stager.written_count, 1)
+        self.assertEqual(os.listdir(self.stager.folder), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
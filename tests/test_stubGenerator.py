@@ -0,0 +1,115 @@
+import ast
+import os
+import shutil
+import sys
+import tempfile
+import types
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts", "python"))
+
+from stubGenerator import generate_stub, write_stubs  # noqa: E402
+
+# Pure Python and compiled modules of the standard library, standing in for hou
+STDLIB_MODULES = ("json", "collections", "datetime", "math", "itertools", "re", "sqlite3", "threading")
+
+
+def _fake_module():
+    # the cases builtins and SWIG modules throw at the generator, in a module of our own
+    module = types.ModuleType("stubgen_fake", 'Module doc with "quotes" and a \\ backslash"')
+    exec(
+        "VALUE = 3\n"
+        "NAME = 'x'\n"
+        "def positional(a, b=1, /, c=2, *, d, **kwargs):\n"
+        "    'Ends with a quote\"'\n"
+        "class Node(object):\n"
+        "    '''Node doc'''\n"
+        "    class Parm(object):\n"
+        "        pass\n"
+        "    def __init__(self, path):\n"
+        "        pass\n"
+        "    @staticmethod\n"
+        "    def find(path):\n"
+        "        pass\n"
+        "    @classmethod\n"
+        "    def create(cls, parent):\n"
+        "        pass\n"
+        "    @property\n"
+        "    def path(self):\n"
+        "        return ''\n"
+        "class Geometry(Node):\n"
+        "    pass\n"
+        "DEFAULT_NODE = Node('/obj')\n"
+        "def factory():\n"
+        "    class Local(object):\n"
+        "        pass\n"
+        "    return Local\n"
+        "LOCAL = factory()\n",
+        module.__dict__,
+    )
+    return module
+
+
+class GenerateStubTest(unittest.TestCase):
+    """
+    generate_stub on modules importable without Houdini.
+    """
+
+    def test_stdlib_stubs_parse(self):
+        for name in STDLIB_MODULES:
+            module = __import__(name)
+            source = generate_stub(module)
+            try:
+                ast.parse(source, f"{name}.pyi")
+            except SyntaxError as e:
+                self.fail(f"stub of {name} does not parse: {e}")
+
+    def test_members(self):
+        source = generate_stub(_fake_module())
+        tree = ast.parse(source)
+        names = {node.name if hasattr(node, "name") else node.target.id for node in tree.body
+                 if isinstance(node, (ast.FunctionDef, ast.ClassDef, ast.AnnAssign))}
+        self.assertEqual(names, {"VALUE", "NAME", "positional", "Node", "Geometry", "DEFAULT_NODE", "factory"})
+        self.assertIn("VALUE: int", source)
+        self.assertIn("DEFAULT_NODE: Node", source)
+        # a class local to a function cannot be named in the stub
+        self.assertNotIn("Local", source)
+        self.assertIn("class Geometry(Node):", source)
+        self.assertIn("def positional(a, b=..., /, c=..., *, d, **kwargs) -> Any:", source)
+        node = next(n for n in tree.body if isinstance(n, ast.ClassDef) and n.name == "Node")
+        methods = {n.name: [d.id for d in n.decorator_list] for n in node.body if isinstance(n, ast.FunctionDef)}
+        self.assertEqual(methods, {"__init__": [], "find": ["staticmethod"], "create": ["classmethod"],
+                                   "path": ["property"]})
+        self.assertTrue(any(isinstance(n, ast.ClassDef) and n.name == "Parm" for n in node.body))
+
+
+class WriteStubsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp(prefix="stubGenerator_")
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_written_once_per_version(self):
+        folder = write_stubs(["json", "json.decoder", "math"], self.cache_dir)
+        paths = [os.path.join(folder, "json.pyi"), os.path.join(folder, "json", "decoder.pyi"),
+                 os.path.join(folder, "math.pyi")]
+        for path in paths:
+            with open(path, encoding="utf-8") as f:
+                ast.parse(f.read(), path)
+        mtimes = [os.path.getmtime(path) for path in paths]
+        os.utime(paths[0], (0, 0))
+        self.assertEqual(write_stubs(["json", "json.decoder", "math"], self.cache_dir), folder)
+        # cached stubs are not generated again
+        self.assertEqual(os.path.getmtime(paths[0]), 0)
+        self.assertEqual([os.path.getmtime(path) for path in paths[1:]], mtimes[1:])
+        self.assertEqual([name for name in os.listdir(folder) if name.endswith(".tmp")], [])
+
+    def test_missing_module(self):
+        with self.assertRaises(ImportError):
+            write_stubs(["stubgen_no_such_module"], self.cache_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()